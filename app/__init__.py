@@ -1,37 +1,44 @@
 # app/__init__.py
 import os
+import time
+import uuid
 import logging
 from datetime import timedelta
-from flask import Flask, request, jsonify
+from flask import Flask, g, request, jsonify
 
 from config import Config
 from .extensions import cors, jwt, socketio, init_logging, init_db
-from .metrics import init_metrics
-
-# Blueprints
-from .blueprints.auth import auth_bp
-from .blueprints.games import games_bp
-from .blueprints.analytics import analytics_bp
-from .blueprints.feedback import feedback_bp
-from .blueprints.friends import friends_bp
-
-# Socket.IO
-from .sockets import register_socketio_handlers
+from .metrics import init_metrics, route_template
+from .ratelimit import init_proxy_fix
+from .startup import Startup
+from .jsonprovider import FastJSONProvider, SocketJSON
 
 # JWT-Utils
 from flask_jwt_extended import (
-    verify_jwt_in_request,
-    get_jwt,
     create_access_token,
     decode_token,
 )
+from flask_jwt_extended.exceptions import NoAuthorizationError
+from .jwtctx import current_claims, verify_error
 
 def create_app() -> Flask:
-    init_logging()
+    """
+    Baut die App ohne Netzwerk-Zugriff: Mongo verbindet lazy (connect=False),
+    Indizes laufen gemäß STARTUP_INDEXES im Hintergrund oder per CLI.
+    Jede Phase wird gemessen und am Ende als startup-report geloggt.
+    Schwere Module (eventlet über pwpool, Duelle, Indizes …) werden erst in
+    ihrer Phase importiert → `import app` bleibt billig.
+    """
+    startup = Startup()
+    with startup.phase("logging"):
+        init_logging()
+        from .logpipe import should_log
     log = logging.getLogger(__name__)
 
     app = Flask(__name__)
     app.config.from_object(Config)
+    # orjson (falls installiert) + ObjectId/datetime/BSON für alle Responses
+    app.json = FastJSONProvider(app)
 
     # --- JWT Secret aus ENV setzen (oder DEV-Default) ---
     secret_from_env = os.environ.get("JWT_SECRET_KEY")
@@ -41,28 +48,21 @@ def create_app() -> Flask:
     app.config["JWT_SECRET_KEY"] = secret_from_env
     log.info(f"🔑 JWT_SECRET_KEY length={len(secret_from_env)}")
 
-    # --- Konsistenz-Check mit .jwt_secret ---
+    # --- Konsistenz-Check mit .jwt_secret (nur lesen, falls vorhanden) ---
     secret_file = os.path.join(os.path.dirname(__file__), "..", ".jwt_secret")
     if os.path.exists(secret_file):
         try:
             with open(secret_file, "r", encoding="utf-8") as f:
                 expected_secret = f.read().strip()
+        except Exception as e:
+            log.warning(f"⚠️ Konnte .jwt_secret nicht lesen: {e}")
+        else:
             if expected_secret != secret_from_env:
                 log.critical(
-                    "❌ JWT_SECRET_KEY MISMATCH!\n"
-                    f"ENV:  {secret_from_env}\n"
-                    f"FILE: {expected_secret}"
+                    "❌ JWT_SECRET_KEY MISMATCH! ENV len=%d, .jwt_secret len=%d",
+                    len(secret_from_env), len(expected_secret),
                 )
                 raise SystemExit("JWT_SECRET_KEY mismatch – Server stoppt!")
-        except Exception as e:
-            log.warning(f"⚠️ Konnte .jwt_secret nicht lesen: {e}")
-    else:
-        try:
-            with open(secret_file, "w", encoding="utf-8") as f:
-                f.write(secret_from_env)
-            log.info("📝 .jwt_secret erstellt.")
-        except Exception as e:
-            log.warning(f"⚠️ Konnte .jwt_secret nicht schreiben: {e}")
 
     # --- CORS (vor Register der Blueprints ok) ---
     origins_env = os.environ.get("CORS_ORIGINS", "").strip()
@@ -95,24 +95,30 @@ def create_app() -> Flask:
     # --- JWT MANAGER INITIALISIEREN (muss vor Startup-Test passieren!) ---
     jwt.init_app(app)
 
-    # --- Mongo verbinden ---
-    init_db(app)
+    # --- Mongo-Client anlegen (verbindet erst beim ersten Kommando) ---
+    with startup.phase("mongo_client"):
+        init_db(app)
 
-    # --- JWT Startup-Test (jetzt mit init_app + App-Kontext) ---
-    from flask import current_app
-    with app.app_context():
-        try:
-            test_token = create_access_token(
-                identity="startup-check",
-                expires_delta=timedelta(seconds=30),
-            )
-            decoded = decode_token(test_token)
-            if decoded.get("sub") != "startup-check":
-                raise ValueError("Decoded Token-Sub mismatch")
-            log.info("✅ JWT Startup-Test erfolgreich – Secret stimmt und Token verifizierbar.")
-        except Exception as e:
-            log.critical(f"❌ JWT Startup-Test fehlgeschlagen: {e}")
-            raise SystemExit("JWT Startup-Test fehlgeschlagen – Server stoppt!")
+    # --- Argon2id-Hasher mit den festen ARGON2_*-Parametern ---
+    with startup.phase("credentials"):
+        from . import credentials
+        credentials.init_credentials(app)
+
+    # --- JWT Startup-Test (optional, JWT_SELFTEST=true) ---
+    if os.environ.get("JWT_SELFTEST", "false").lower() == "true":
+        with startup.phase("jwt_selftest"), app.app_context():
+            try:
+                test_token = create_access_token(
+                    identity="startup-check",
+                    expires_delta=timedelta(seconds=30),
+                )
+                decoded = decode_token(test_token)
+                if decoded.get("sub") != "startup-check":
+                    raise ValueError("Decoded Token-Sub mismatch")
+                log.info("✅ JWT Startup-Test erfolgreich – Secret stimmt und Token verifizierbar.")
+            except Exception as e:
+                log.critical(f"❌ JWT Startup-Test fehlgeschlagen: {e}")
+                raise SystemExit("JWT Startup-Test fehlgeschlagen – Server stoppt!")
 
     # --- Feedback-Admins loggen (nur Info) ---
     app.config["FEEDBACK_ADMINS"] = os.environ.get("FEEDBACK_ADMINS", "")
@@ -125,53 +131,89 @@ def create_app() -> Flask:
     except Exception as e:
         log.warning(f"⚠️ Konnte Prometheus-Metriken nicht initialisieren: {e}")
 
-    # --- Blueprints registrieren ---
-    app.register_blueprint(auth_bp)
-    app.register_blueprint(games_bp)
-    app.register_blueprint(analytics_bp)
-    app.register_blueprint(feedback_bp, url_prefix="/feedback")
-    app.register_blueprint(friends_bp)
-
+    # --- Blueprints registrieren (Import erst hier → `import app` bleibt billig) ---
+    with startup.phase("blueprints"):
+        from .blueprints.auth import auth_bp
+        from .blueprints.games import games_bp
+        from .blueprints.analytics import analytics_bp
+        from .blueprints.feedback import feedback_bp
+        from .blueprints.friends import friends_bp
+        from .blueprints.admin import admin_bp
+        from .blueprints.chat import chat_bp
 
+        app.register_blueprint(auth_bp)
+        app.register_blueprint(games_bp)
+        app.register_blueprint(analytics_bp)
+        app.register_blueprint(feedback_bp, url_prefix="/feedback")
+        app.register_blueprint(friends_bp)
+        app.register_blueprint(admin_bp)
+        app.register_blueprint(chat_bp)
 
     # --- Socket.IO ---
-    socketio.init_app(
-        app,
-        cors_allowed_origins="*",
-        async_mode="eventlet",
-        ping_timeout=25,
-        ping_interval=10,
-    )
-    register_socketio_handlers(socketio)
-
-    # --- Request/Response Logging + sanfte JWT-Validierung ---
+    with startup.phase("socketio"):
+        from .sockets import register_socketio_handlers
+
+        socketio.init_app(
+            app,
+            cors_allowed_origins="*",
+            async_mode="eventlet",
+            ping_timeout=25,
+            ping_interval=10,
+            json=SocketJSON,
+        )
+        register_socketio_handlers(socketio)
+
+    # --- Reverse-Proxy: echte Client-IP für Rate-Limits/Logs (außen um Flask + Socket.IO) ---
+    if init_proxy_fix(app):
+        log.info("🔁 ProxyFix aktiv (PROXY_FIX_X_FOR=%s)", os.environ.get("PROXY_FIX_X_FOR"))
+
+    # --- Hintergrund-Tasks: Indizes, Token-Blocklist, Slow-Query-Log, Readiness, Duelle ---
+    with startup.phase("background"):
+        from . import columnar, duels, indexes, readiness, revocation, slowlog
+
+        indexes.register_cli(app)
+        credentials.register_cli(app)
+        columnar.register_cli(app)
+        indexes.start(app, socketio)
+        revocation.start_sync(app, socketio)
+        slowlog.recorder.start(app, socketio)
+        readiness.start(app, socketio)
+        duels.manager.start(app, socketio)
+
+    # --- Request-Logging: eine strukturierte, gesampelte Zeile pro Request ---
     @app.before_request
     def _log_req():
-        lg = logging.getLogger("req")
-        ah = request.headers.get("Authorization", "")
-        tok_preview = ah.split()[1][:15] + "..." if ah.startswith("Bearer ") else None
-        lg.info(
-            "⇢ %s %s  auth=%s token=%s",
-            request.method, request.path,
-            ("yes" if tok_preview else "no"),
-            tok_preview,
-        )
-        try:
-            verify_jwt_in_request(optional=True)
-            payload = get_jwt()
-            if payload:
-                lg.info(
-                    "JWT ok: sub=%s type=%s exp=%s",
-                    payload.get("sub"),
-                    payload.get("type"),
-                    payload.get("exp"),
-                )
-        except Exception as e:
-            lg.warning("JWT verification failed: %s", e)
+        g.request_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex[:16]
+        g.request_started = time.perf_counter()
 
     @app.after_request
     def _log_resp(resp):
-        logging.getLogger("req").info("⇠ %s (%s %s)", resp.status, request.method, request.path)
+        rid = g.get("request_id")
+        if rid:
+            resp.headers["X-Request-ID"] = rid
+        route = route_template()
+        if not should_log(route, resp.status_code):
+            return resp
+
+        # nutzt die (einmalige) Verifikation aus app/jwtctx.py
+        claims = current_claims()
+        err = None if claims else verify_error()
+        started = g.get("request_started")
+        fields = {
+            "request_id": rid,
+            "method": request.method,
+            "route": route,
+            "path": request.path,
+            "status": resp.status_code,
+            "latency_ms": round((time.perf_counter() - started) * 1000, 2) if started else None,
+            "user": claims.get("sub") if claims else None,
+        }
+        if err is not None and not isinstance(err, NoAuthorizationError):
+            fields["jwt_error"] = str(err)
+        level = logging.WARNING if resp.status_code >= 500 else logging.INFO
+        logging.getLogger("req").log(
+            level, "⇠ %s %s %s", request.method, route, resp.status_code, extra=fields
+        )
         return resp
 
     # --- JWT Fehlerhandler ---
@@ -206,6 +248,11 @@ def create_app() -> Flask:
     def _needs_fresh(jwt_header, jwt_payload):
         return jsonify(msg="fresh token required"), 401
 
+    @jwt.token_in_blocklist_loader
+    def _in_blocklist(jwt_header, jwt_payload):
+        # Access: nur Speicher-Lookup; Refresh (nur /auth/refresh): Mongo
+        return revocation.in_blocklist(app.config["MONGO_CLIENT"].get_default_database(), jwt_payload)
+
     @jwt.revoked_token_loader
     def _revoked(jwt_header, jwt_payload):
         logging.getLogger("req").warning(
@@ -220,10 +267,17 @@ def create_app() -> Flask:
         from .utils import _now
         return {"ok": True, "time": _now()}
 
+    # --- Readiness: nur der gecachte Snapshot, kein DB-Zugriff pro Probe ---
+    @app.get("/ready")
+    def ready():
+        body, status = readiness.snapshot()
+        return jsonify(body), status
+
     # --- Favicon (404 vermeiden) ---
     @app.get("/favicon.ico")
     def favicon():
         # Leere Antwort, Browser hört auf zu meckern
         return "", 204
 
+    startup.report()
     return app
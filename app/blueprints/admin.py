@@ -0,0 +1,115 @@
+# app/blueprints/admin.py
+import logging
+from datetime import datetime, timedelta, timezone
+
+from flask import Blueprint, request, jsonify, current_app, stream_with_context
+from flask_jwt_extended import get_jwt_identity
+
+from .. import columnar, profiler, slowlog
+from ..extensions import socketio
+from ..jwtctx import jwt_required
+from ..utils import is_admin, get_db
+
+log = logging.getLogger(__name__)
+admin_bp = Blueprint("admin", __name__, url_prefix="/admin")
+
+
+@admin_bp.get("/profile")
+@jwt_required()
+def profile():
+    """
+    Startet den Sampling-Profiler für ?seconds=N (Default 10) mit ?hz= (Default 100)
+    und liefert Collapsed-Stacks (text/plain) für Flamegraph-Tools.
+    ?idle=1 nimmt wartende Threads/Hub-Poll mit auf.
+    """
+    user = get_jwt_identity()
+    if not is_admin(user):
+        return jsonify(msg="forbidden"), 403
+
+    try:
+        seconds = float(request.args.get("seconds", 10))
+        hz = int(request.args.get("hz", 100))
+    except ValueError:
+        return jsonify(msg="bad seconds/hz"), 400
+    seconds = min(max(seconds, 0.1), profiler.max_seconds())
+    hz = min(max(hz, 1), 1000)
+    include_idle = request.args.get("idle") in {"1", "true"}
+
+    log.info("🔬 profiler start: user=%s seconds=%.1f hz=%d", user, seconds, hz)
+    try:
+        out = profiler.profile(current_app._get_current_object(), socketio,
+                               seconds, hz=hz, include_idle=include_idle)
+    except profiler.ProfilerBusy:
+        return jsonify(msg="profiler already running"), 409
+
+    return current_app.response_class(
+        out,
+        mimetype="text/plain",
+        headers={"Content-Disposition": "attachment; filename=profile.collapsed"},
+    )
+
+
+@admin_bp.get("/slow-queries")
+@jwt_required()
+def slow_queries():
+    """
+    Query-Shapes aus `slow_queries`, nach Gesamtzeit absteigend.
+    ?minutes= Zeitfenster (Default 60), ?limit= Anzahl Shapes (Default 20).
+    """
+    if not is_admin(get_jwt_identity()):
+        return jsonify(msg="forbidden"), 403
+    try:
+        minutes = float(request.args.get("minutes", 60))
+        limit = int(request.args.get("limit", 20))
+    except ValueError:
+        return jsonify(msg="bad minutes/limit"), 400
+    limit = min(max(limit, 1), 200)
+    since = datetime.now(timezone.utc) - timedelta(minutes=max(minutes, 0))
+
+    shapes = slowlog.summary(get_db(), since, limit)
+    return jsonify(
+        thresholdMs=slowlog.recorder.threshold_ms,
+        since=since.isoformat(),
+        dropped=slowlog.recorder.dropped,
+        shapes=shapes,
+    ), 200
+
+
+@admin_bp.get("/export/<collection>.<fmt>")
+@jwt_required()
+def export_columnar(collection, fmt):
+    """
+    question_attempts/games als Parquet (.parquet) oder Arrow-Stream (.arrow),
+    gestreamt Row-Group für Row-Group. ?columns=a,b  ?since=<ObjectId>
+    ?incremental=<name> liest ab der gespeicherten Watermark und rückt sie
+    nach vollständig gesendeter Antwort vor.
+    """
+    user = get_jwt_identity()
+    if not is_admin(user):
+        return jsonify(msg="forbidden"), 403
+    if not columnar.available():
+        return jsonify(msg="pyarrow not installed"), 501
+    try:
+        export = columnar.Export(
+            get_db("analytics"), collection,
+            fmt=fmt,
+            columns=request.args.get("columns"),
+            incremental=request.args.get("incremental"),
+            since=request.args.get("since"),
+            row_group=int(request.args.get("rowGroup", columnar.ROW_GROUP)),
+            watermark_db=get_db(),
+        )
+    except (columnar.ExportError, ValueError) as e:
+        return jsonify(msg=str(e)), 400
+
+    def _generate():
+        yield from export
+        export.commit()
+
+    mimetype, ext = columnar.FORMATS[fmt]
+    log.info("📦 columnar export start: user=%s collection=%s fmt=%s", user, collection, fmt)
+    return current_app.response_class(
+        stream_with_context(_generate()),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f"attachment; filename={collection}.{ext}"},
+    )
@@ -1,7 +1,8 @@
 # app/blueprints/analytics.py
 import logging, pymongo, datetime as dt
 from flask import Blueprint, request, jsonify, current_app
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import get_jwt_identity
+from ..jwtctx import jwt_required
 from ..utils import get_db
 
 log = logging.getLogger(__name__)
@@ -18,7 +19,7 @@ def stats_mine():
             "myCorrect": int, "oppCorrect": int }
         ] }
     """
-    db = get_db()
+    db = get_db("analytics")
     user = get_jwt_identity()
 
     pipeline = [
@@ -71,7 +72,7 @@ def stats_mine():
     
 @analytics_bp.route("/analytics/<username>")
 def get_analytics(username):
-    db = current_app.config["MONGO_CLIENT"].get_default_database()
+    db = get_db("analytics")
 
     pipeline = [
         {"$match": {"$or": [{"player1": username}, {"player2": username}]}},
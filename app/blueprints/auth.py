@@ -1,77 +1,57 @@
 # app/blueprints/auth.py
 import logging
+import os
 from datetime import timedelta
 from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import (
     create_access_token,
     create_refresh_token,
-    jwt_required,
+    decode_token,
+    get_jwt,
     get_jwt_identity,
 )
-from werkzeug.security import check_password_hash, generate_password_hash
 
-import pymongo
+from .. import credentials, revocation
+from ..jwtctx import jwt_required
+from ..ratelimit import TokenBucketLimiter, client_ip, throttle
 
 log = logging.getLogger(__name__)
 auth_bp = Blueprint("auth", __name__, url_prefix="/auth")
 
 
-def _users_col():
-    mongo = current_app.config["MONGO_CLIENT"]
-    return mongo.get_default_database()["users"]
+def _db():
+    return current_app.config["MONGO_CLIENT"].get_default_database()
 
 
-def _normalize_username(val: str | None) -> str:
-    return (val or "").strip().lower()
-
-
-def _verify_password(user_doc: dict, plain_pw: str) -> bool:
-    """
-    Unterstützt:
-      - user_doc["passwordHash"] (werkzeug / pbkdf2 / bcrypt etc.)
-      - Fallback: user_doc["password"] im Klartext (Altbestand)
-    """
-    if not plain_pw:
-        return False
-
-    # neue/empfohlene Variante
-    pw_hash = user_doc.get("passwordHash")
-    if isinstance(pw_hash, str) and pw_hash:
-        try:
-            return check_password_hash(pw_hash, plain_pw)
-        except Exception:
-            # Falls ein fremdes Hash-Format o.Ä. drin ist
-            log.warning("login: check_password_hash Exception (vermutlich unbekanntes Hash-Format)")
-            return False
+def _body_username():
+    body = request.get_json(silent=True) or {}
+    return credentials.normalize_username(body.get("username") or body.get("name")) or None
 
-    # Fallback für wirklich alte Datensätze (Klartext in DB)
-    legacy_plain = user_doc.get("password")
-    if isinstance(legacy_plain, str) and legacy_plain:
-        return legacy_plain == plain_pw
 
-    return False
+# Format "<anzahl>/<sekunden>" – Burst = anzahl, danach anzahl pro sekunden
+_LOGIN_LIMITS = [
+    ("ip", TokenBucketLimiter.from_spec(os.environ.get("LOGIN_RATE_IP", "20/60")), client_ip),
+    ("user", TokenBucketLimiter.from_spec(os.environ.get("LOGIN_RATE_USER", "5/60")), _body_username),
+]
+_REGISTER_LIMITS = [
+    ("ip", TokenBucketLimiter.from_spec(os.environ.get("REGISTER_RATE_IP", "5/600")), client_ip),
+    ("user", TokenBucketLimiter.from_spec(os.environ.get("REGISTER_RATE_USER", "3/60")), _body_username),
+]
 
 
 @auth_bp.post("/login")
+@throttle("login", _LOGIN_LIMITS)
 def login():
-    dbu = _users_col()
-
     body = request.get_json(silent=True) or {}
     # akzeptiere beides
-    username = _normalize_username(body.get("username") or body.get("name"))
+    username = credentials.normalize_username(body.get("username") or body.get("name"))
     password = body.get("password") or ""
 
     if not username or not password:
         return jsonify(msg="missing username or password"), 400
 
-    user = dbu.find_one({"username": username})
-    if not user:
-        log.info("login 401: user not found (username=%s)", username)
-        return jsonify(msg="invalid credentials"), 401
-
-    if not _verify_password(user, password):
-        log.info("login 401: password mismatch (username=%s, fields=%s)",
-                 username, [k for k in user.keys() if k != "password"])
+    if not credentials.verify_login(_db(), username, password):
+        log.info("login 401: invalid credentials (username=%s)", username)
         return jsonify(msg="invalid credentials"), 401
 
     # OK → Tokens erstellen
@@ -87,30 +67,20 @@ def login():
 
 
 @auth_bp.post("/register")
+@throttle("register", _REGISTER_LIMITS)
 def register():
-    dbu = _users_col()
     body = request.get_json(silent=True) or {}
 
-    username = _normalize_username(body.get("username") or body.get("name"))
+    username = credentials.normalize_username(body.get("username") or body.get("name"))
     password = (body.get("password") or "").strip()
     email = (body.get("email") or "").strip()
 
     if not username or not password:
         return jsonify(msg="missing username or password"), 400
 
-    if dbu.find_one({"username": username}):
+    if credentials.create_user(_db(), username, password, email=email) is None:
         return jsonify(msg="user exists"), 409
 
-    pw_hash = generate_password_hash(password)
-
-    dbu.insert_one({
-        "username": username,
-        "email": email or None,
-        "passwordHash": pw_hash,
-        # Alt-Feld NICHT weiter befüllen, damit wir migrieren
-        "createdAt": current_app.config.get("NOW_FN", lambda: None)() or None,
-    })
-
     # Direkt Tokens geben (optional)
     acc_expires = current_app.config.get("JWT_ACCESS_TOKEN_EXPIRES")
     refr_expires = current_app.config.get("JWT_REFRESH_TOKEN_EXPIRES")
@@ -124,8 +94,46 @@ def register():
 @auth_bp.post("/refresh")
 @jwt_required(refresh=True)
 def refresh():
+    """
+    Refresh-Rotation: das benutzte Refresh-Token wird widerrufen, der Client
+    bekommt ein neues Paar. Ein zweites Einlösen desselben Tokens → 401.
+    """
     identity = get_jwt_identity()
+    if not revocation.revoke(_db(), get_jwt(), reason="rotated"):
+        # schon eingelöst (Replay oder paralleler Request) – atomar über den Unique-Index
+        log.warning("refresh 401: token already used (sub=%s)", identity)
+        return jsonify(msg="token revoked"), 401
+
     acc_expires = current_app.config.get("JWT_ACCESS_TOKEN_EXPIRES")
+    refr_expires = current_app.config.get("JWT_REFRESH_TOKEN_EXPIRES")
     new_access = create_access_token(identity=identity, expires_delta=acc_expires)
-    log.info("refresh 200: new access for %s", identity)
-    return jsonify(access=new_access), 200
+    new_refresh = create_refresh_token(identity=identity, expires_delta=refr_expires)
+    log.info("refresh 200: rotated tokens for %s", identity)
+    return jsonify(access=new_access, refresh=new_refresh), 200
+
+
+@auth_bp.post("/logout")
+@jwt_required()
+def logout():
+    """
+    Widerruft das Access-Token und optional das Refresh-Token.
+    Body (optional): { "refresh": "<refresh-token>" }
+    """
+    db = _db()
+    identity = get_jwt_identity()
+    revocation.revoke(db, get_jwt(), reason="logout")
+
+    body = request.get_json(silent=True) or {}
+    refresh_tok = body.get("refresh")
+    if refresh_tok:
+        try:
+            claims = decode_token(refresh_tok)
+        except Exception as e:
+            # abgelaufen/ungültig → muss nicht widerrufen werden
+            log.info("logout: refresh token ignoriert (%s)", e)
+        else:
+            if claims.get("sub") == identity and claims.get("type") == "refresh":
+                revocation.revoke(db, claims, reason="logout")
+
+    log.info("logout 200: revoked tokens for %s", identity)
+    return jsonify(ok=True), 200
@@ -0,0 +1,54 @@
+# app/blueprints/chat.py
+"""
+Chat-Lesezugriffe per HTTP. Senden und Lesebestätigungen laufen über
+Socket.IO (chat_send / chat_read, siehe app/sockets.py).
+"""
+import logging
+
+from flask import Blueprint, jsonify, request
+from flask_jwt_extended import get_jwt_identity
+
+from .. import chat
+from ..jwtctx import jwt_required
+from ..utils import get_db
+
+log = logging.getLogger(__name__)
+chat_bp = Blueprint("chat", __name__, url_prefix="/chat")
+
+
+def _me() -> str:
+    return (get_jwt_identity() or "").strip().lower()
+
+
+def _limit() -> int:
+    """?limit= (Default 50, 1–200); ValueError bei Unsinn."""
+    return max(min(int(request.args.get("limit", 50)), 200), 1)
+
+
+@chat_bp.get("/conversations")
+@jwt_required()
+def list_conversations():
+    """Meine Konversationen, zuletzt aktive zuerst, mit Ungelesen-Zähler."""
+    try:
+        limit = _limit()
+    except ValueError:
+        return jsonify(msg="bad limit"), 400
+    items = chat.conversations(get_db(), _me(), limit)
+    return jsonify(items=items, count=len(items)), 200
+
+
+@chat_bp.get("/<peer>/messages")
+@jwt_required()
+def list_messages(peer):
+    """Verlauf mit <peer>, neueste zuerst; ältere Seiten per ?before=<nextBefore>."""
+    try:
+        limit = _limit()
+    except ValueError:
+        return jsonify(msg="bad limit"), 400
+    try:
+        items, next_before = chat.history(
+            get_db(), _me(), (peer or "").strip().lower(), request.args.get("before"), limit,
+        )
+    except chat.ChatError as e:
+        return jsonify(msg=str(e)), 400
+    return jsonify(items=items, count=len(items), nextBefore=next_before), 200
@@ -1,15 +1,21 @@
 # app/blueprints/feedback.py
-import json
+import base64
 import csv
 import logging
-from io import StringIO
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 import os
+from typing import Optional
 
 import pymongo
 from bson.objectid import ObjectId
-from flask import Blueprint, request, jsonify, current_app
-from flask_jwt_extended import jwt_required, get_jwt_identity, verify_jwt_in_request
+from flask import Blueprint, request, jsonify, current_app, stream_with_context
+from flask_jwt_extended import get_jwt_identity
+from pymongo.errors import BulkWriteError
+
+from .. import feedback_stats, jsonprovider
+from ..jwtctx import jwt_required, current_claims, verify_error
+from ..ratelimit import TokenBucketLimiter, charge, client_ip, throttle
+from ..utils import is_admin as _is_admin, get_db
 
 log = logging.getLogger(__name__)
 
@@ -22,80 +28,261 @@ def _now():
     return datetime.now(timezone.utc).isoformat()
 
 
-def _is_admin(user: str) -> bool:
-    admins = (current_app.config.get("FEEDBACK_ADMINS") or "")
-    wl = {u.strip().lower() for u in admins.split(",") if u.strip()}
-    return bool(user) and user.lower() in wl
+def _debug_jwt_info():
+    """Debug-Helper: Zeigt im Log das Ergebnis der (einmaligen) Token-Prüfung."""
+    claims = current_claims()
+    if claims:
+        log.debug("[JWT DEBUG] Token ok für user=%s type=%s", claims.get("sub"), claims.get("type"))
+    else:
+        log.debug("[JWT DEBUG] kein gültiges Token: %s", verify_error())
 
 
-@feedback_bp.record_once
-def _create_indexes(setup_state):
-    """Wird beim Registrieren des Blueprints aufgerufen."""
-    app = setup_state.app
-    mongo_client = app.config["MONGO_CLIENT"]
-    db = mongo_client.get_default_database()
-    db["feedback"].create_index(
-        [("createdAt", pymongo.DESCENDING)], name="createdAt_desc"
-    )
-    db["feedback"].create_index(
-        [("questionId", pymongo.ASCENDING)], name="questionId_asc"
-    )
-    db["feedback"].create_index(
-        [("resolved", pymongo.ASCENDING)], name="resolved_asc"
-    )
-    log.info("🗄️  feedback indexes ensured")
+# ───────── Anlegen (einzeln / Batch) ─────────────────────────────
 
+_META_MAX_BYTES = int(os.environ.get("FEEDBACK_META_MAX_BYTES", 2048))
+_TEXT_MAX_CHARS = int(os.environ.get("FEEDBACK_MAX_CHARS", 4000))
+_BATCH_MAX = int(os.environ.get("FEEDBACK_BATCH_MAX", 50))
+_CLIENT_ID_MAX = 64
 
-def _debug_jwt_info():
-    """Debug-Helper: Zeigt im Log Infos zum Token und Secret."""
-    auth_header = request.headers.get("Authorization", "")
-    token_part = auth_header[:40] + "..." if auth_header else None
-    log.info("[JWT DEBUG] Incoming token=%s", token_part)
-    log.info("[JWT DEBUG] JWT_SECRET_KEY in app.config=%r",
-             current_app.config.get("JWT_SECRET_KEY"))
-    try:
-        verify_jwt_in_request()
-        log.info("[JWT DEBUG] Token verification succeeded for user=%s", get_jwt_identity())
-    except Exception as e:
-        log.warning("[JWT DEBUG] Token verification failed: %s", e)
+
+def _jwt_user():
+    return (get_jwt_identity() or "").lower() or None
+
+
+def _anon_ip():
+    return None if get_jwt_identity() else client_ip()
+
+
+# Angemeldet: Quota pro User, anonym: pro IP. Ein Batch kostet ein Token pro Item.
+_FEEDBACK_LIMITS = [
+    ("user", TokenBucketLimiter.from_spec(os.environ.get("FEEDBACK_RATE_USER", "120/600")), _jwt_user),
+    ("ip", TokenBucketLimiter.from_spec(os.environ.get("FEEDBACK_RATE_IP", "60/600")), _anon_ip),
+]
+
+
+class _Invalid(ValueError):
+    def __init__(self, msg: str, status: int = 400):
+        super().__init__(msg)
+        self.status = status
+
+
+def _build_doc(data: dict, user: Optional[str], created_at: str) -> dict:
+    """Ein Feedback-Item prüfen und als Dokument aufbauen (_Invalid bei Fehlern)."""
+    if not isinstance(data, dict):
+        raise _Invalid("item muss ein Objekt sein")
+    qid = str(data.get("questionId") or "").strip()
+    text = str(data.get("feedback") or "").strip()
+    qtxt = str(data.get("questionText") or "").strip()
+    meta = data.get("meta") or {}
+
+    if not qid or not text:
+        raise _Invalid("questionId und feedback sind Pflicht")
+    if len(text) > _TEXT_MAX_CHARS:
+        raise _Invalid(f"feedback länger als {_TEXT_MAX_CHARS} Zeichen", 413)
+    if not isinstance(meta, dict):
+        raise _Invalid("meta muss ein Objekt sein")
+    if len(jsonprovider.dumps_bytes(meta)) > _META_MAX_BYTES:
+        raise _Invalid(f"meta größer als {_META_MAX_BYTES} Bytes", 413)
+
+    return {
+        "questionId": qid[:200],
+        "questionText": qtxt[:_TEXT_MAX_CHARS],
+        "feedback": text,
+        "meta": meta,
+        "username": user,
+        "userAgent": request.headers.get("User-Agent"),
+        "createdAt": created_at,
+        "resolved": False,
+        "resolvedAt": None,
+        "resolver": None,
+    }
 
 
 @feedback_bp.post("")
 @jwt_required(optional=True)
+@throttle("feedback", _FEEDBACK_LIMITS)
 def create_feedback():
     _debug_jwt_info()
     db = current_app.config["MONGO_CLIENT"].get_default_database()
-    user = get_jwt_identity()
     data = request.get_json(force=True, silent=False) or {}
 
-    qid = (data.get("questionId") or "").strip()
-    text = (data.get("feedback") or "").strip()
-    qtxt = (data.get("questionText") or "").strip()
-    meta = data.get("meta") or {}
+    try:
+        doc = _build_doc(data, _jwt_user(), _now())
+    except _Invalid as e:
+        return jsonify(msg=str(e)), e.status
+    ins = db["feedback"].insert_one(doc)   # setzt doc["_id"]
+    feedback_stats.on_created(db, doc)
+    return jsonify(id=str(ins.inserted_id)), 201
 
-    if not qid or not text:
-        return jsonify(msg="questionId und feedback sind Pflicht"), 400
-
-    ins = db["feedback"].insert_one(
-        {
-            "questionId": qid,
-            "questionText": qtxt,
-            "feedback": text,
-            "meta": meta,
-            "username": (user or "").lower() or None,
-            "userAgent": request.headers.get("User-Agent"),
-            "createdAt": _now(),
-            "resolved": False,
-            "resolvedAt": None,
-            "resolver": None,
+
+@feedback_bp.post("/batch")
+@jwt_required(optional=True)
+def create_feedback_batch():
+    """
+    Mehrere Feedbacks auf einmal (z.B. Offline-Queue der App):
+
+        {"items": [{"clientId": "<uuid>", "questionId": ..., "feedback": ..., ...}, ...]}
+
+    clientId ist Pflicht und macht Wiederholungen idempotent (Unique-Index):
+    ein bereits gespeichertes Item kommt als "duplicate" mit seiner id zurück.
+    Ein ungeordneter insert_many für alle gültigen Items; Ergebnis pro Item
+    in Eingabereihenfolge.
+    """
+    _debug_jwt_info()
+    data = request.get_json(force=True, silent=False) or {}
+    items = data.get("items") if isinstance(data, dict) else None
+    if not isinstance(items, list) or not items:
+        return jsonify(msg="items (Liste) ist Pflicht"), 400
+    if len(items) > _BATCH_MAX:
+        return jsonify(msg=f"maximal {_BATCH_MAX} items pro Batch"), 413
+
+    limited = charge("feedback_batch", _FEEDBACK_LIMITS, cost=len(items))
+    if limited is not None:
+        return limited
+
+    user = _jwt_user()
+    created_at = _now()
+    results: list[dict] = []
+    docs: list[dict] = []
+    seen: set[str] = set()
+    for item in items:
+        cid = str((item or {}).get("clientId") or "").strip() if isinstance(item, dict) else ""
+        res = {"clientId": cid or None}
+        results.append(res)
+        if not cid or len(cid) > _CLIENT_ID_MAX:
+            res.update(status="invalid", msg=f"clientId (1–{_CLIENT_ID_MAX} Zeichen) ist Pflicht")
+            continue
+        if cid in seen:
+            res["status"] = "duplicate"
+            continue
+        try:
+            doc = _build_doc(item, user, created_at)
+        except _Invalid as e:
+            res.update(status="invalid", msg=str(e))
+            continue
+        # erst nach gültigem Item – eine korrigierte Wiederholung im selben Batch zählt
+        seen.add(cid)
+        doc["clientId"] = cid
+        docs.append(doc)
+
+    db = current_app.config["MONGO_CLIENT"].get_default_database()
+    failed: set[int] = set()
+    if docs:
+        try:
+            db["feedback"].insert_many(docs, ordered=False)   # setzt _id in allen docs
+        except BulkWriteError as e:
+            for err in e.details.get("writeErrors", []):
+                if err.get("code") != 11000:
+                    raise
+                failed.add(err["index"])
+
+    inserted = [d for i, d in enumerate(docs) if i not in failed]
+    dup_ids = {docs[i]["clientId"] for i in failed}
+    if inserted:
+        feedback_stats.on_created_many(db, inserted)
+    wanted = dup_ids | {r["clientId"] for r in results if r.get("status") == "duplicate"}
+    existing = {}
+    if wanted:
+        existing = {
+            d["clientId"]: str(d["_id"])
+            for d in db["feedback"].find({"clientId": {"$in": list(wanted)}}, {"clientId": 1})
         }
-    )
-    return jsonify(id=str(ins.inserted_id)), 201
+
+    by_cid = {d["clientId"]: d for d in inserted}
+    for res in results:
+        if res.get("status") == "invalid":
+            continue
+        cid = res["clientId"]
+        if cid in by_cid and "status" not in res:
+            res.update(status="created", id=str(by_cid.pop(cid)["_id"]))
+        else:
+            res.update(status="duplicate", id=existing.get(cid))
+
+    created = sum(1 for r in results if r["status"] == "created")
+    log.info("📥 feedback batch user=%s items=%d created=%d", user or "-", len(items), created)
+    return jsonify(items=results, created=created), 200
+
+
+def _encode_cursor(doc: dict) -> str:
+    raw = jsonprovider.dumps_bytes({"c": doc.get("createdAt"), "i": str(doc["_id"])})
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _encode_search_cursor(doc: dict) -> str:
+    raw = jsonprovider.dumps_bytes({"s": doc["score"], "c": doc.get("createdAt"), "i": str(doc["_id"])})
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _read_cursor(token: str) -> dict:
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        c = jsonprovider.loads(raw)
+        c["i"] = ObjectId(c["i"])
+        return c
+    except Exception:
+        raise ValueError("bad cursor")
+
+
+def _decode_cursor(token: str) -> dict:
+    """Cursor → Keyset-Bedingung für Sortierung (createdAt, _id) absteigend."""
+    c = _read_cursor(token)
+    if "c" not in c:
+        raise ValueError("bad cursor")
+    created, oid = c["c"], c["i"]
+    return {"$or": [
+        {"createdAt": {"$lt": created}},
+        {"createdAt": created, "_id": {"$lt": oid}},
+    ]}
+
+
+def _decode_search_cursor(token: str) -> dict:
+    """Such-Cursor → Keyset auf (score, createdAt, _id) absteigend."""
+    c = _read_cursor(token)
+    if not isinstance(c.get("s"), (int, float)):
+        raise ValueError("bad cursor")
+    score, created, oid = c["s"], c.get("c"), c["i"]
+    return {"$or": [
+        {"score": {"$lt": score}},
+        {"score": score, "createdAt": {"$lt": created}},
+        {"score": score, "createdAt": created, "_id": {"$lt": oid}},
+    ]}
+
+
+_SEARCH_MAX_CHARS = 200
+
+
+def _search(db, q: dict, text: str, limit: int, cursor: Optional[str]) -> tuple[list, Optional[str]]:
+    """
+    Volltextsuche über den Textindex feedback_text (Deutsch, mit Stemming),
+    beste Treffer zuerst. Die übrigen Filter laufen im selben $match mit.
+    Pagination per Keyset auf (score, createdAt, _id) – Mongo berechnet
+    ohnehin nur die Treffer, nicht die ganze Collection.
+    """
+    pipeline = [
+        {"$match": {**q, "$text": {"$search": text}}},
+        {"$addFields": {"score": {"$meta": "textScore"}}},
+    ]
+    if cursor:
+        pipeline.append({"$match": _decode_search_cursor(cursor)})
+    pipeline += [
+        {"$sort": {"score": -1, "createdAt": -1, "_id": -1}},
+        {"$limit": limit + 1},
+    ]
+    docs = list(db["feedback"].aggregate(pipeline))
+    more = len(docs) > limit
+    docs = docs[:limit]
+    return docs, (_encode_search_cursor(docs[-1]) if more else None)
 
 
 @feedback_bp.get("")
 @jwt_required()
 def list_feedback():
+    """
+    Admin-Liste, neueste zuerst. Seiten per ?cursor= (aus nextCursor der
+    vorherigen Antwort) statt skip – jede Seite kostet gleich viel.
+    ?includeTotal=true liefert die Gesamtzahl aus feedback_counters.
+    ?q= sucht im Volltext (feedback + questionText), sortiert nach Relevanz.
+    """
     _debug_jwt_info()
     db = current_app.config["MONGO_CLIENT"].get_default_database()
     user = get_jwt_identity()
@@ -110,21 +297,74 @@ def list_feedback():
     if qid:
         q["questionId"] = qid
 
-    limit = min(int(request.args.get("limit", 100)), 1000)
-    skip = max(int(request.args.get("skip", 0)), 0)
+    limit = max(min(int(request.args.get("limit", 100)), 1000), 1)
+    cursor = request.args.get("cursor")
+    skip = max(int(request.args.get("skip", 0)), 0)   # Altbestand; cursor bevorzugen
+    text = (request.args.get("q") or "").strip()[:_SEARCH_MAX_CHARS]
+
+    if text:
+        try:
+            docs, next_cursor = _search(db, q, text, limit, cursor)
+        except ValueError:
+            return jsonify(msg="bad cursor"), 400
+    else:
+        find_q = q
+        if cursor:
+            try:
+                find_q = {**q, **_decode_cursor(cursor)}
+            except ValueError:
+                return jsonify(msg="bad cursor"), 400
+            skip = 0
+
+        cur = (
+            db["feedback"]
+            .find(find_q)
+            .sort([("createdAt", pymongo.DESCENDING), ("_id", pymongo.DESCENDING)])
+            .skip(skip)
+            .limit(limit + 1)
+        )
+        docs = list(cur)
+        more = len(docs) > limit
+        docs = docs[:limit]
+        next_cursor = _encode_cursor(docs[-1]) if more else None
 
-    cur = (
-        db["feedback"]
-        .find(q)
-        .sort("createdAt", pymongo.DESCENDING)
-        .skip(skip)
-        .limit(limit)
-    )
     out = []
-    for d in cur:
+    for d in docs:
         d["id"] = str(d.pop("_id"))
         out.append(d)
-    return jsonify(items=out, count=len(out)), 200
+    body = {"items": out, "count": len(out), "nextCursor": next_cursor}
+    if request.args.get("includeTotal") == "true":
+        if text:
+            # Trefferzahl gibt es nicht vorberechnet – zählt über den Textindex
+            body["total"] = db["feedback"].count_documents({**q, "$text": {"$search": text}})
+        else:
+            body["total"] = feedback_stats.total(db, q.get("resolved"), q.get("questionId"))
+    return jsonify(body), 200
+
+
+@feedback_bp.get("/by-question")
+@jwt_required()
+def list_by_question():
+    """
+    Feedback gruppiert nach Frage: offene Meldungen, letzte Meldung und die
+    jüngsten offenen Texte – direkt aus feedback_questions, ohne $group.
+    ?includeResolved=true zeigt auch Fragen ohne offene Meldungen.
+    """
+    _debug_jwt_info()
+    db = current_app.config["MONGO_CLIENT"].get_default_database()
+    user = get_jwt_identity()
+    if not _is_admin(user):
+        return jsonify(msg="forbidden"), 403
+
+    limit = max(min(int(request.args.get("limit", 50)), 500), 1)
+    skip = max(int(request.args.get("skip", 0)), 0)
+    items = feedback_stats.by_question(
+        db,
+        include_resolved=request.args.get("includeResolved") == "true",
+        limit=limit,
+        skip=skip,
+    )
+    return jsonify(items=items, count=len(items)), 200
 
 
 @feedback_bp.patch("/<fid>/resolve")
@@ -148,9 +388,17 @@ def mark_resolved(fid):
         "resolvedAt": _now() if value else None,
         "resolver": user if value else None,
     }
-    res = db["feedback"].update_one({"_id": obj}, {"$set": upd})
-    if res.matched_count == 0:
-        return jsonify(msg="not found"), 404
+    # nur bei echtem Zustandswechsel matchen → Zähler bleiben exakt
+    before = db["feedback"].find_one_and_update(
+        {"_id": obj, "resolved": {"$ne": value}},
+        {"$set": upd},
+        projection={"questionId": 1},
+    )
+    if before is None:
+        if db["feedback"].count_documents({"_id": obj}, limit=1) == 0:
+            return jsonify(msg="not found"), 404
+        return jsonify(ok=True), 200
+    feedback_stats.on_resolved_changed(db, fid, before.get("questionId"), value)
     return jsonify(ok=True), 200
 
 
@@ -165,54 +413,144 @@ def admin_status():
     return jsonify(username=user, is_admin=_is_admin(user)), 200
     
     
-@feedback_bp.get("/export.csv")
-@jwt_required()
-def export_csv():
-    _debug_jwt_info()
-    db = current_app.config["MONGO_CLIENT"].get_default_database()
-    user = get_jwt_identity()
-    if not _is_admin(user):
-        return jsonify(msg="forbidden"), 403
+# ───────── Export (gestreamt) ────────────────────────────────────
+
+_EXPORT_FIELDS = [
+    "createdAt", "username", "questionId", "questionText", "feedback",
+    "resolved", "resolvedAt", "resolver", "meta",
+]
+_EXPORT_PROJECTION = {f: 1 for f in _EXPORT_FIELDS}
+_EXPORT_BATCH = int(os.environ.get("FEEDBACK_EXPORT_BATCH", 500))
+_CHUNK_BYTES = 64 * 1024
 
+
+def _parse_bound(raw: str, end: bool) -> str:
+    """ISO-Datum/-Zeit → ISO-String wie in createdAt (UTC). Reines Datum bei `to` = ganzer Tag."""
+    if len(raw) == 10:
+        d = datetime.fromisoformat(raw).replace(tzinfo=timezone.utc)
+        if end:
+            d += timedelta(days=1)
+        return d.isoformat()
+    d = datetime.fromisoformat(raw.replace("Z", "+00:00"))
+    if d.tzinfo is None:
+        d = d.replace(tzinfo=timezone.utc)
+    return d.astimezone(timezone.utc).isoformat()
+
+
+def _export_filter(args) -> dict:
+    """?resolved=&questionId=&from=&to= → Mongo-Filter (ValueError bei kaputtem Datum)."""
     q = {}
-    resolved = request.args.get("resolved")
+    resolved = args.get("resolved")
     if resolved in {"true", "false"}:
         q["resolved"] = (resolved == "true")
+    qid = (args.get("questionId") or "").strip()
+    if qid:
+        q["questionId"] = qid
+    created = {}
+    if args.get("from"):
+        created["$gte"] = _parse_bound(args["from"], end=False)
+    if args.get("to"):
+        created["$lt"] = _parse_bound(args["to"], end=True)
+    if created:
+        q["createdAt"] = created
+    return q
+
+
+class _Line:
+    """csv.writer-Ziel, das die geschriebene Zeile einfach zurückgibt."""
 
-    cur = db["feedback"].find(q).sort("createdAt", pymongo.DESCENDING)
-    sio = StringIO()
-    w = csv.writer(sio)
-    w.writerow(
-        [
-            "id",
-            "createdAt",
-            "username",
-            "questionId",
-            "questionText",
-            "feedback",
-            "resolved",
-            "resolvedAt",
-            "resolver",
-            "meta",
-        ]
+    def write(self, value):
+        return value
+
+
+def _chunked(lines):
+    """Fasst kleine Zeilen zu ~64-KB-Blöcken zusammen (weniger Writes/Syscalls)."""
+    buf, size = [], 0
+    for line in lines:
+        buf.append(line)
+        size += len(line)
+        if size >= _CHUNK_BYTES:
+            yield "".join(buf) if isinstance(line, str) else b"".join(buf)
+            buf, size = [], 0
+    if buf:
+        yield "".join(buf) if isinstance(buf[0], str) else b"".join(buf)
+
+
+def _csv_lines(docs):
+    w = csv.writer(_Line())
+    yield w.writerow(["id"] + _EXPORT_FIELDS)
+    for d in docs:
+        yield w.writerow([
+            str(d.get("_id")),
+            d.get("createdAt", ""),
+            d.get("username", ""),
+            d.get("questionId", ""),
+            (d.get("questionText", "") or "").replace("\n", " ").strip(),
+            (d.get("feedback", "") or "").replace("\n", " ").strip(),
+            d.get("resolved", False),
+            d.get("resolvedAt", ""),
+            d.get("resolver", ""),
+            jsonprovider.dumps(d.get("meta") or {}),
+        ])
+
+
+def _ndjson_lines(docs):
+    for d in docs:
+        d["id"] = str(d.pop("_id"))
+        yield jsonprovider.dumps_bytes(d) + b"\n"
+
+
+_EXPORT_FORMATS = {
+    "csv": (_csv_lines, "text/csv", "feedback_export.csv"),
+    "ndjson": (_ndjson_lines, "application/x-ndjson", "feedback_export.ndjson"),
+}
+
+
+def _export(fmt: str):
+    """
+    Streamt den Export: Cursor mit Projection + batch_size, Zeilen werden
+    sofort erzeugt und in ~64-KB-Blöcken gesendet. Speicherbedarf bleibt
+    konstant, egal wie groß die Collection ist.
+    """
+    _debug_jwt_info()
+    user = get_jwt_identity()
+    if not _is_admin(user):
+        return jsonify(msg="forbidden"), 403
+    try:
+        q = _export_filter(request.args)
+    except ValueError:
+        return jsonify(msg="bad from/to (ISO-8601 erwartet)"), 400
+
+    db = get_db("analytics")
+    cur = (
+        db["feedback"]
+        .find(q, _EXPORT_PROJECTION)
+        .sort("createdAt", pymongo.DESCENDING)
+        .batch_size(_EXPORT_BATCH)
     )
-    for d in cur:
-        w.writerow(
-            [
-                str(d.get("_id")),
-                d.get("createdAt", ""),
-                d.get("username", ""),
-                d.get("questionId", ""),
-                (d.get("questionText", "") or "").replace("\n", " ").strip(),
-                (d.get("feedback", "") or "").replace("\n", " ").strip(),
-                d.get("resolved", False),
-                d.get("resolvedAt", ""),
-                d.get("resolver", ""),
-                json.dumps(d.get("meta") or {}, ensure_ascii=False),
-            ]
-        )
+    make_lines, mimetype, filename = _EXPORT_FORMATS[fmt]
+
+    def _generate():
+        try:
+            yield from _chunked(make_lines(cur))
+        finally:
+            cur.close()
+
+    log.info("📤 feedback export %s user=%s filter=%s", fmt, user, q)
     return current_app.response_class(
-        sio.getvalue(),
-        mimetype="text/csv",
-        headers={"Content-Disposition": "attachment; filename=feedback_export.csv"},
+        stream_with_context(_generate()),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
     )
+
+
+@feedback_bp.get("/export.csv")
+@jwt_required()
+def export_csv():
+    return _export("csv")
+
+
+@feedback_bp.get("/export.ndjson")
+@jwt_required()
+def export_ndjson():
+    return _export("ndjson")
@@ -5,7 +5,10 @@ from typing import List
 
 import pymongo
 from flask import Blueprint, current_app, jsonify, request
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import get_jwt_identity
+
+from .. import credentials
+from ..jwtctx import jwt_required
 
 log = logging.getLogger(__name__)
 friends_bp = Blueprint("friends", __name__, url_prefix="/friends")
@@ -16,49 +19,6 @@ def _now_iso() -> str:
 def _norm(u: str) -> str:
     return (u or "").strip().lower()
 
-@friends_bp.record_once
-def _create_indexes(setup_state):
-    """Wird beim Registrieren des Blueprints ausgeführt (idempotent & robust)."""
-    app = setup_state.app
-    client = app.config["MONGO_CLIENT"]
-    db = client.get_default_database()
-
-    users = db["users"]
-
-    # --- users.username: sicherstellen, dass es ein UNIQUE-Index ist ---
-    desired_name = "username_asc"  # benutze den existierenden Namen, um Konflikte zu vermeiden
-    desired_keys = [("username", pymongo.ASCENDING)]
-
-    existing = list(users.list_indexes())
-    username_idx = None
-    for idx in existing:
-        key_items = list(idx.get("key", {}).items())
-        if key_items == desired_keys:
-            username_idx = idx
-            break
-
-    if username_idx:
-        if not username_idx.get("unique", False):
-            users.drop_index(username_idx["name"])
-            log.info("🗑️  dropped non-unique index on users.username (%s)", username_idx["name"])
-        else:
-            log.info("🗄️  users.username unique index already present (%s)", username_idx["name"])
-    if not username_idx or not username_idx.get("unique", False):
-        users.create_index(desired_keys, name=desired_name, unique=True)
-        log.info("🗄️  created UNIQUE index users.username (%s)", desired_name)
-
-    # --- friend_requests Indizes (idempotent) ---
-    fr = db["friend_requests"]
-    fr.create_index(
-        [("requester", pymongo.ASCENDING), ("target", pymongo.ASCENDING)],
-        name="friend_requests_unique_pair",
-        unique=True,
-    )
-    fr.create_index([("target", pymongo.ASCENDING)], name="friend_requests_target_asc")
-    fr.create_index([("createdAt", pymongo.DESCENDING)], name="friend_requests_created_desc")
-
-    log.info("🗄️  friends: users.username index ensured")
-    log.info("🗄️  friends: friend_requests indexes ensured")
 
 @friends_bp.get("/list_with_status")
 @jwt_required()
@@ -166,8 +126,7 @@ def request_friendship():
         return jsonify(msg="cannot request yourself"), 400
 
     # Zieluser muss existieren
-    target_doc = db["users"].find_one({"username": target})
-    if not target_doc:
+    if not credentials.user_exists(db, target):
         return jsonify(msg="user not found"), 404
 
     # schon bestehende Anfrage prüfen (unique-index fängt es ab, aber schönerer Fehler)
@@ -5,12 +5,14 @@ import pymongo
 
 from flask import Blueprint, request, jsonify, current_app
 
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import get_jwt_identity
 
-from ..extensions import socketio
+from .. import gameplay
+from ..sockets import emit
+from ..jwtctx import jwt_required
 from ..utils import (
     _now, expose_id, reduced_game_doc, get_db,
-    _open_games, _open_games_with_badge, _news_counts
+    _open_games, _open_games_with_badge, _news_counts, ASYNC_ONLY
 )
 
 log = logging.getLogger(__name__)
@@ -28,7 +30,7 @@ def games_open(username):
         return jsonify(msg="forbidden"), 403
 
     cur = db["games"].find(
-        {"$or": [{"hostName": u}, {"friendName": u}], "finishedAt": None}
+        {"$or": [{"hostName": u}, {"friendName": u}], "finishedAt": None, **ASYNC_ONLY}
     ).sort("createdAt", pymongo.DESCENDING)
 
     open_games = []
@@ -104,7 +106,7 @@ def games_new():
         "friendCorrect"   : 0
     }).inserted_id
     unseen_open = _open_games_with_badge(friend)[1]
-    socketio.emit("notification", {"openGames": unseen_open}, room=friend)
+    emit("notification", {"openGames": unseen_open}, room=friend)
     gid_str = str(gid)
     return jsonify(id=gid_str, gameId=gid_str), 200
 
@@ -135,50 +137,11 @@ def games_answer(gid):
     except Exception:
         return jsonify(msg="invalid json"), 400
 
-    ans = (data or {}).get("answers", [])
-    if not ans:
-        return jsonify(msg="no answers"), 400
-
     try:
-        obj = ObjectId(gid)
-    except (InvalidId, TypeError):
-        return jsonify(msg="bad id"), 400
-
-    game = db.games.find_one({"_id": obj})
-    if not game:
-        return jsonify(msg="not found"), 404
-
-    field = ("hostAnswers" if user == game["hostName"].lower()
-             else "friendAnswers" if user == game["friendName"].lower()
-             else None)
-    if field is None:
-        return jsonify(msg="not participant"), 403
-
-    qids = [a["questionId"] for a in ans]
-    db.games.update_one({"_id": obj}, {"$pull": {field: {"questionId": {"$in": qids}}}})
-    db.games.update_one({"_id": obj}, {"$push": {field: {"$each": ans}}})
-
-    game = db.games.find_one({"_id": obj})
-    total_q    = len(game["questions"])
-    host_cnt   = len(game["hostAnswers"])
-    friend_cnt = len(game["friendAnswers"])
-
-    if (not game.get("finished") and host_cnt >= total_q and friend_cnt >= total_q):
-        def _cnt_ok(arr): return sum(1 for a in arr if a.get("isCorrect"))
-        host_ok   = _cnt_ok(game["hostAnswers"])
-        friend_ok = _cnt_ok(game["friendAnswers"])
-        db.games.update_one({"_id": obj}, {"$set": {
-            "finished"        : True,
-            "finishedAt"      : _now(),
-            "hostCorrect"     : host_ok,
-            "friendCorrect"   : friend_ok,
-            "hostSeenResult"  : False,
-            "friendSeenResult": False,
-            "hostAnswered":   host_cnt,
-            "friendAnswered": friend_cnt,
-            "totalQuestions": total_q,
-        }})
-    return jsonify(ok=True), 200
+        result = gameplay.submit_answers(db, gid, user, (data or {}).get("answers", []))
+    except gameplay.AnswerError as e:
+        return jsonify(msg=str(e)), e.status
+    return jsonify(ok=True, **result), 200
 
 
 
@@ -217,9 +180,11 @@ def games_finish():
         return jsonify(msg="Not found / no access"), 404
     if g.get("finished"):
         return jsonify(msg="Already finished"), 409
+    if g.get("mode") == "duel":
+        return jsonify(msg="live duel – ends via socket / duel_decline"), 409
     db.games.update_one({"_id": obj}, {"$set": {"finished": True, "finishedAt": _now()}})
     for u in (g["hostName"].lower(), g["friendName"].lower()):
-        socketio.emit("notification_reset", _news_counts(u), room=u)
+        emit("notification_reset", _news_counts(u), room=u)
     return jsonify(ok=True), 200
 
 @games_bp.delete("/<gid>")
@@ -236,7 +201,9 @@ def games_delete(gid):
         return jsonify(msg="Not found / no access"), 404
     if g.get("finished"):
         return jsonify(msg="Already finished"), 409
+    if g.get("mode") == "duel":
+        return jsonify(msg="live duel – ends via socket / duel_decline"), 409
     db.games.delete_one({"_id": obj})
     for u in (g["hostName"].lower(), g["friendName"].lower()):
-        socketio.emit("notification_reset", _news_counts(u), room=u)
+        emit("notification_reset", _news_counts(u), room=u)
     return jsonify(ok=True), 200
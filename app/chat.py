@@ -0,0 +1,215 @@
+# app/chat.py
+"""
+1:1-Chat zwischen Freunden.
+
+`chat` (eine Nachricht pro Dokument):
+    {_id, conversationId, from, to, text, createdAt, clientId?, read, readAt}
+    Index (conversationId, _id) → Verlauf seitenweise rückwärts per ?before=<_id>
+
+`chat_conversations` (ein Dokument pro Paar):
+    {_id: conversationId, members: [{u, unread, readUpTo}, …], last: {…}, updatedAt}
+
+Ungelesen-Zähler stehen pro Mitglied im Konversations-Dokument: +1 beim
+Senden, −n beim Lesen. Lesebestätigungen gelten "bis einschließlich
+<_id>" und kosten ein update_many statt eines Updates pro Nachricht.
+Der Badge (unread_total) summiert nur die Konversationen des Users.
+"""
+import json
+import logging
+import os
+from datetime import datetime, timezone
+from typing import Optional
+
+import pymongo
+from bson import ObjectId
+from pymongo.database import Database
+from pymongo.errors import DuplicateKeyError
+
+log = logging.getLogger(__name__)
+
+MESSAGES = "chat"
+CONVERSATIONS = "chat_conversations"
+MAX_CHARS = int(os.environ.get("CHAT_MAX_CHARS", 2000))
+PREVIEW_CHARS = 120
+
+
+class ChatError(ValueError):
+    pass
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def conversation_id(a: str, b: str) -> str:
+    """Eindeutig und reihenfolgeunabhängig – auch bei Sonderzeichen im Namen."""
+    return json.dumps(sorted([a, b]), ensure_ascii=False, separators=(",", ":"))
+
+
+def are_friends(db: Database, a: str, b: str) -> bool:
+    return db["friend_requests"].find_one(
+        {"status": "accepted",
+         "$or": [{"requester": a, "target": b}, {"requester": b, "target": a}]},
+        {"_id": 1},
+    ) is not None
+
+
+def public_message(doc: dict) -> dict:
+    return {
+        "id": str(doc["_id"]),
+        "conversationId": doc["conversationId"],
+        "from": doc["from"],
+        "to": doc["to"],
+        "text": doc["text"],
+        "createdAt": doc["createdAt"],
+        "clientId": doc.get("clientId"),
+        "read": bool(doc.get("read")),
+    }
+
+
+def send(db: Database, sender: str, to: str, text: str, client_id: Optional[str] = None) -> tuple[dict, bool]:
+    """
+    Speichert eine Nachricht und zählt unread beim Empfänger hoch.
+    Rückgabe: (Nachricht, neu?) – bei wiederholter clientId die vorhandene.
+    """
+    if not isinstance(to, str) or not isinstance(text, str):
+        raise ChatError("to und text müssen Strings sein")
+    to, text = to.strip().lower(), text.strip()
+    if not to or not text:
+        raise ChatError("to und text sind Pflicht")
+    if to == sender:
+        raise ChatError("keine Nachrichten an sich selbst")
+    if len(text) > MAX_CHARS:
+        raise ChatError(f"text länger als {MAX_CHARS} Zeichen")
+    if not are_friends(db, sender, to):
+        raise ChatError("nur zwischen Freunden")
+
+    cid = conversation_id(sender, to)
+    doc = {"conversationId": cid, "from": sender, "to": to, "text": text,
+           "createdAt": _now(), "read": False}
+    if client_id:
+        doc["clientId"] = str(client_id)[:64]
+    try:
+        db[MESSAGES].insert_one(doc)
+    except DuplicateKeyError:
+        existing = db[MESSAGES].find_one({"clientId": doc["clientId"], "from": sender})
+        if existing is None:
+            raise
+        return public_message(existing), False
+
+    last = {"id": str(doc["_id"]), "from": sender, "text": text[:PREVIEW_CHARS], "createdAt": doc["createdAt"]}
+    res = db[CONVERSATIONS].update_one(
+        {"_id": cid, "members.u": to},
+        {"$inc": {"members.$.unread": 1}, "$set": {"last": last, "updatedAt": doc["createdAt"]}},
+    )
+    if res.matched_count == 0:
+        try:
+            db[CONVERSATIONS].insert_one({
+                "_id": cid,
+                "members": [{"u": sender, "unread": 0, "readUpTo": None},
+                            {"u": to, "unread": 1, "readUpTo": None}],
+                "last": last,
+                "updatedAt": doc["createdAt"],
+            })
+        except DuplicateKeyError:
+            # parallel angelegt → jetzt existiert sie
+            db[CONVERSATIONS].update_one(
+                {"_id": cid, "members.u": to},
+                {"$inc": {"members.$.unread": 1}, "$set": {"last": last, "updatedAt": doc["createdAt"]}},
+            )
+    return public_message(doc), True
+
+
+def mark_read(db: Database, me: str, peer: str, up_to: str) -> int:
+    """
+    Alle Nachrichten von peer an mich bis einschließlich up_to als gelesen markieren.
+    Gescannt wird nur der Bereich (readUpTo, up_to] – bereits bestätigte
+    Nachrichten liest der Index gar nicht erst.
+    """
+    if not isinstance(up_to, str) or not ObjectId.is_valid(up_to):
+        raise ChatError("upTo muss eine Nachrichten-id sein")
+    upto = ObjectId(up_to)
+    cid = conversation_id(me, peer)
+    conv = db[CONVERSATIONS].find_one({"_id": cid, "members.u": me}, {"members": 1})
+    if conv is None:
+        return 0
+    prev = next((m.get("readUpTo") for m in conv["members"] if m["u"] == me), None)
+    if prev is not None and prev >= upto:
+        return 0
+    id_range = {"$lte": upto}
+    if prev is not None:
+        id_range["$gt"] = prev
+    res = db[MESSAGES].update_many(
+        {"conversationId": cid, "_id": id_range, "to": me, "read": {"$ne": True}},
+        {"$set": {"read": True, "readAt": _now()}},
+    )
+    n = res.modified_count
+    if n:
+        db[CONVERSATIONS].update_one(
+            {"_id": cid, "members.u": me},
+            {"$inc": {"members.$.unread": -n}, "$max": {"members.$.readUpTo": upto}},
+        )
+    return n
+
+
+def history(db: Database, me: str, peer: str, before: Optional[str] = None, limit: int = 50) -> tuple[list, Optional[str]]:
+    """Neueste zuerst; nächste Seite per before=<nextBefore>."""
+    q = {"conversationId": conversation_id(me, peer)}
+    if before:
+        try:
+            q["_id"] = {"$lt": ObjectId(before)}
+        except Exception:
+            raise ChatError("before muss eine Nachrichten-id sein")
+    docs = list(db[MESSAGES].find(q).sort("_id", pymongo.DESCENDING).limit(limit + 1))
+    more = len(docs) > limit
+    docs = docs[:limit]
+    return [public_message(d) for d in docs], (str(docs[-1]["_id"]) if more else None)
+
+
+def conversations(db: Database, me: str, limit: int = 50) -> list[dict]:
+    out = []
+    cur = (
+        db[CONVERSATIONS]
+        .find({"members.u": me})
+        .sort("updatedAt", pymongo.DESCENDING)
+        .limit(limit)
+    )
+    for c in cur:
+        mine = next((m for m in c["members"] if m["u"] == me), {})
+        peer = next((m for m in c["members"] if m["u"] != me), {})
+        out.append({
+            "conversationId": c["_id"],
+            "with": peer.get("u"),
+            "unread": max(int(mine.get("unread", 0)), 0),
+            "peerReadUpTo": str(peer["readUpTo"]) if peer.get("readUpTo") else None,
+            "last": c.get("last"),
+            "updatedAt": c.get("updatedAt"),
+        })
+    return out
+
+
+def unread_total(db: Database, me: str) -> int:
+    """Badge: Summe der Zähler über die Konversationen – ohne Nachrichten zu lesen."""
+    rows = list(db[CONVERSATIONS].aggregate([
+        {"$match": {"members.u": me}},
+        {"$unwind": "$members"},
+        {"$match": {"members.u": me}},
+        {"$group": {"_id": None, "n": {"$sum": "$members.unread"}}},
+    ]))
+    return max(int(rows[0]["n"]), 0) if rows else 0
+
+
+def ensure_indexes(db: Database) -> None:
+    msgs = db[MESSAGES]
+    msgs.create_index([("conversationId", pymongo.ASCENDING), ("_id", pymongo.DESCENDING)],
+                      name="conversation_id_desc")
+    msgs.create_index(
+        [("from", pymongo.ASCENDING), ("clientId", pymongo.ASCENDING)],
+        name="from_clientId_unique",
+        unique=True,
+        partialFilterExpression={"clientId": {"$exists": True}},
+    )
+    db[CONVERSATIONS].create_index(
+        [("members.u", pymongo.ASCENDING), ("updatedAt", pymongo.DESCENDING)],
+        name="members_updated_desc",
+    )
@@ -0,0 +1,368 @@
+# app/columnar.py
+"""
+Spaltenorientierter Export von `question_attempts` und `games` für Offline-Analysen.
+
+- Parquet oder Arrow-IPC-Stream, geschrieben in Row-Groups à ROW_GROUP Zeilen
+  → Speicherbedarf ~ eine Row-Group, egal wie groß die Collection ist
+- Spaltenauswahl (?columns= / --columns), nur diese Felder werden aus Mongo gelesen
+- Inkrementell: Watermark pro Export-Name in `export_watermarks`; der
+  nächste Lauf liest nur neuere Dokumente
+    question_attempts  unveränderlich → Watermark = letzte _id
+    games              ändern sich bis zum Spielende → nur beendete Spiele,
+                       Watermark = (finishedAt, _id)
+  Exportiert wird nur, was älter als COLUMNAR_SAFETY_LAG_SECONDS ist: ein
+  Insert mit früher vergebener _id, der erst nach dem Lauf sichtbar wird,
+  fiele sonst hinter die Watermark.
+
+pyarrow steht in requirements.txt; fehlt es trotzdem, liefert der
+Endpoint 501 und das CLI bricht mit einer Meldung ab.
+
+    flask --app run export-columnar question_attempts --out attempts.parquet --incremental daily
+"""
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Iterator, Optional
+
+import click
+import pymongo
+from bson import ObjectId
+from pymongo.database import Database
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional
+    pa = pq = None
+
+log = logging.getLogger(__name__)
+
+WATERMARKS = "export_watermarks"
+ROW_GROUP = int(os.environ.get("COLUMNAR_ROW_GROUP", 50_000))
+SAFETY_LAG = float(os.environ.get("COLUMNAR_SAFETY_LAG_SECONDS", 60))
+FORMATS = {
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+}
+
+
+class ExportError(ValueError):
+    pass
+
+
+def _ts(value) -> Optional[datetime]:
+    """ISO-String (wie in der DB gespeichert) → datetime in UTC."""
+    if isinstance(value, datetime):
+        return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+    if not value:
+        return None
+    try:
+        d = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return d if d.tzinfo else d.replace(tzinfo=timezone.utc)
+
+
+def _field(name: str) -> Callable[[dict], object]:
+    return lambda d: d.get(name)
+
+
+def _bool(name: str) -> Callable[[dict], object]:
+    return lambda d: bool(d.get(name))
+
+
+def _time(name: str) -> Callable[[dict], object]:
+    return lambda d: _ts(d.get(name))
+
+
+def _count(name: str) -> Callable[[dict], object]:
+    return lambda d: len(d.get(name) or [])
+
+
+# Spalte → (Arrow-Typ, Mongo-Feld für die Projection, Extraktor)
+SCHEMAS: dict[str, dict[str, tuple[str, str, Callable[[dict], object]]]] = {
+    "question_attempts": {
+        "id": ("string", "_id", lambda d: str(d["_id"])),
+        "username": ("string", "username", _field("username")),
+        "questionId": ("string", "questionId", _field("questionId")),
+        "timestamp": ("timestamp", "timestamp", _time("timestamp")),
+        "isCorrect": ("bool", "isCorrect", _bool("isCorrect")),
+        "sessionId": ("string", "sessionId", _field("sessionId")),
+        "chapterTitle": ("string", "chapterTitle", _field("chapterTitle")),
+        "subchapterId": ("string", "subchapterId", _field("subchapterId")),
+        "subchapterTitle": ("string", "subchapterTitle", _field("subchapterTitle")),
+    },
+    "games": {
+        "id": ("string", "_id", lambda d: str(d["_id"])),
+        "hostName": ("string", "hostName", _field("hostName")),
+        "friendName": ("string", "friendName", _field("friendName")),
+        "createdAt": ("timestamp", "createdAt", _time("createdAt")),
+        "finished": ("bool", "finished", _bool("finished")),
+        "finishedAt": ("timestamp", "finishedAt", _time("finishedAt")),
+        "totalQuestions": ("int64", "totalQuestions", lambda d: int(d.get("totalQuestions") or 0)),
+        "hostCorrect": ("int64", "hostCorrect", lambda d: int(d.get("hostCorrect") or 0)),
+        "friendCorrect": ("int64", "friendCorrect", lambda d: int(d.get("friendCorrect") or 0)),
+        "hostAnswered": ("int64", "hostAnswers", _count("hostAnswers")),
+        "friendAnswered": ("int64", "friendAnswers", _count("friendAnswers")),
+        "questionIds": ("list<string>", "questions",
+                        lambda d: [q.get("questionId") for q in d.get("questions") or []]),
+    },
+}
+
+
+# Collection → (Watermark-Feld vor _id oder None, Grundfilter)
+CURSORS: dict[str, tuple[Optional[str], dict]] = {
+    "question_attempts": (None, {}),
+    "games": ("finishedAt", {"finished": True}),
+}
+
+
+def available() -> bool:
+    return pa is not None
+
+
+def select_columns(collection: str, columns: Optional[str]) -> list[str]:
+    """'a,b' → geprüfte Spaltenliste (alle, wenn leer)."""
+    if collection not in SCHEMAS:
+        raise ExportError(f"unbekannte Collection {collection!r}")
+    schema = SCHEMAS[collection]
+    if not columns:
+        return list(schema)
+    cols = [c.strip() for c in columns.split(",") if c.strip()]
+    unknown = [c for c in cols if c not in schema]
+    if unknown:
+        raise ExportError(f"unbekannte Spalten: {', '.join(unknown)}")
+    return cols
+
+
+def projection(collection: str, columns: list[str]) -> dict:
+    proj = {SCHEMAS[collection][c][1]: 1 for c in columns}
+    key = CURSORS[collection][0]
+    if key:
+        proj[key] = 1   # für die Watermark nötig, auch wenn nicht exportiert
+    return proj
+
+
+def query(collection: str, after_key=None, after_id: Optional[ObjectId] = None,
+          now: Optional[datetime] = None) -> dict:
+    """Filter für einen Lauf: nach der Watermark, vor (now − SAFETY_LAG)."""
+    key, base = CURSORS[collection]
+    cutoff = (now or datetime.now(timezone.utc)) - timedelta(seconds=SAFETY_LAG)
+    conds = [dict(base)] if base else []
+    if key is None:
+        id_range = {"$lt": ObjectId.from_datetime(cutoff)}
+        if after_id is not None:
+            id_range["$gt"] = after_id
+        conds.append({"_id": id_range})
+    else:
+        conds.append({key: {"$lt": cutoff.isoformat()}})   # ISO-Strings wie in der DB
+        if after_key is not None:
+            conds.append({"$or": [{key: {"$gt": after_key}},
+                                  {key: after_key, "_id": {"$gt": after_id}}]})
+        elif after_id is not None:
+            conds.append({"_id": {"$gt": after_id}})
+    return conds[0] if len(conds) == 1 else {"$and": conds}
+
+
+def sort_keys(collection: str) -> list[tuple[str, int]]:
+    key = CURSORS[collection][0]
+    return ([(key, 1)] if key else []) + [("_id", 1)]
+
+
+def to_columns(collection: str, columns: list[str], docs: list[dict]) -> dict[str, list]:
+    """Dokumente einer Row-Group → {spalte: werte} (reines Python, ohne pyarrow)."""
+    schema = SCHEMAS[collection]
+    return {c: [schema[c][2](d) for d in docs] for c in columns}
+
+
+def arrow_schema(collection: str, columns: list[str]):
+    types = {
+        "string": pa.string(),
+        "bool": pa.bool_(),
+        "int64": pa.int64(),
+        "timestamp": pa.timestamp("ms", tz="UTC"),
+        "list<string>": pa.list_(pa.string()),
+    }
+    return pa.schema([(c, types[SCHEMAS[collection][c][0]]) for c in columns])
+
+
+# ───────── Watermarks ────────────────────────────────────────────
+
+def _wm_id(collection: str, name: str) -> str:
+    return f"{collection}:{name}"
+
+
+def get_watermark(db: Database, collection: str, name: str) -> tuple[object, Optional[ObjectId]]:
+    """(lastKey, lastId) – lastKey nur bei Collections mit Watermark-Feld, sonst None."""
+    doc = db[WATERMARKS].find_one({"_id": _wm_id(collection, name)}, {"lastKey": 1, "lastId": 1})
+    return (doc.get("lastKey"), doc.get("lastId")) if doc else (None, None)
+
+
+def set_watermark(db: Database, collection: str, name: str, last_key, last_id: ObjectId,
+                  rows: int) -> None:
+    db[WATERMARKS].update_one(
+        {"_id": _wm_id(collection, name)},
+        {"$set": {"lastKey": last_key, "lastId": last_id, "rows": rows,
+                  "updatedAt": datetime.now(timezone.utc)},
+         "$inc": {"runs": 1}},
+        upsert=True,
+    )
+
+
+# ───────── Schreiben ─────────────────────────────────────────────
+
+class _Sink:
+    """Write-only-Dateiobjekt, das die geschriebenen Bytes zum Abholen sammelt."""
+
+    def __init__(self):
+        self.parts: list[bytes] = []
+        self.pos = 0
+        self.closed = False
+
+    def write(self, b) -> int:
+        b = bytes(b)
+        self.parts.append(b)
+        self.pos += len(b)
+        return len(b)
+
+    def tell(self) -> int:
+        return self.pos
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def writable(self) -> bool:
+        return True
+
+    def drain(self) -> bytes:
+        out, self.parts = b"".join(self.parts), []
+        return out
+
+
+class Export:
+    """
+    Ein Export-Lauf. Iterieren liefert die Datei in Blöcken (ein Block pro
+    Row-Group); danach stehen rows/last_id fest. commit() setzt die
+    Watermark – der Aufrufer entscheidet, wann die Datei als angekommen gilt.
+    """
+
+    def __init__(self, db: Database, collection: str, *, fmt: str = "parquet",
+                 columns: Optional[str] = None, incremental: Optional[str] = None,
+                 since: Optional[str] = None, row_group: int = ROW_GROUP,
+                 watermark_db: Optional[Database] = None):
+        if pa is None:
+            raise ExportError("pyarrow ist nicht installiert (pip install pyarrow)")
+        if fmt not in FORMATS:
+            raise ExportError(f"unbekanntes Format {fmt!r} (parquet|arrow)")
+        self.db = db
+        self.wm_db = watermark_db if watermark_db is not None else db
+        self.collection = collection
+        self.fmt = fmt
+        self.columns = select_columns(collection, columns)
+        self.incremental = incremental
+        self.row_group = max(int(row_group), 1)
+        self.rows = 0
+        self.key = CURSORS[collection][0]
+        self.last_key = None
+        self.last_id: Optional[ObjectId] = None
+
+        self.after_key = None
+        self.after_id: Optional[ObjectId] = None
+        if since:
+            try:
+                self.after_id = ObjectId(since)
+            except Exception:
+                raise ExportError("since muss eine ObjectId sein")
+        elif incremental:
+            self.after_key, self.after_id = get_watermark(self.wm_db, collection, incremental)
+
+    def _batches(self) -> Iterator[list[dict]]:
+        q = query(self.collection, self.after_key, self.after_id)
+        proj = projection(self.collection, self.columns)
+        cur = (
+            self.db[self.collection]
+            .find(q, proj)
+            .sort(sort_keys(self.collection))
+            .batch_size(min(self.row_group, 10_000))
+        )
+        try:
+            batch = []
+            for d in cur:
+                batch.append(d)
+                if len(batch) >= self.row_group:
+                    yield batch
+                    batch = []
+            if batch:
+                yield batch
+        finally:
+            cur.close()
+
+    def __iter__(self) -> Iterator[bytes]:
+        schema = arrow_schema(self.collection, self.columns)
+        sink = _Sink()
+        if self.fmt == "parquet":
+            writer = pq.ParquetWriter(sink, schema, compression="zstd")
+            write = writer.write_table
+            make = lambda cols: pa.Table.from_pydict(cols, schema=schema)
+        else:
+            writer = pa.ipc.new_stream(sink, schema)
+            write = writer.write_batch
+            make = lambda cols: pa.RecordBatch.from_pydict(cols, schema=schema)
+
+        for docs in self._batches():
+            write(make(to_columns(self.collection, self.columns, docs)))
+            self.rows += len(docs)
+            self.last_id = docs[-1]["_id"]
+            if self.key:
+                self.last_key = docs[-1].get(self.key)
+            yield sink.drain()
+        writer.close()
+        yield sink.drain()
+        log.info("📦 columnar export %s (%s): %d Zeilen, watermark=%s",
+                 self.collection, self.fmt, self.rows, self.last_id)
+
+    def commit(self) -> None:
+        """Watermark vorrücken – erst nach vollständig geschriebener Datei aufrufen."""
+        if self.incremental and self.last_id is not None:
+            set_watermark(self.wm_db, self.collection, self.incremental,
+                          self.last_key, self.last_id, self.rows)
+
+
+def ensure_indexes(db: Database) -> None:
+    # inkrementeller games-Export: beendete Spiele nach (finishedAt, _id)
+    db["games"].create_index(
+        [("finishedAt", pymongo.ASCENDING), ("_id", pymongo.ASCENDING)],
+        name="finishedAt_id_finished",
+        partialFilterExpression={"finished": True},
+    )
+
+
+def register_cli(app) -> None:
+    @app.cli.command("export-columnar")
+    @click.argument("collection", type=click.Choice(sorted(SCHEMAS)))
+    @click.option("--out", "out", required=True, type=click.Path(dir_okay=False), help="Zieldatei")
+    @click.option("--format", "fmt", type=click.Choice(sorted(FORMATS)), default="parquet")
+    @click.option("--columns", default=None, help="Komma-separierte Spalten (Default: alle)")
+    @click.option("--incremental", default=None, help="Watermark-Name: nur Dokumente seit dem letzten Lauf")
+    @click.option("--since", default=None, help="nur Dokumente mit _id > ObjectId (statt Watermark)")
+    @click.option("--row-group", type=int, default=ROW_GROUP, show_default=True)
+    def export_columnar_cmd(collection, out, fmt, columns, incremental, since, row_group):
+        """Exportiert question_attempts/games als Parquet oder Arrow-Stream."""
+        clients = app.config.get("MONGO_CLIENTS") or {}
+        client = clients.get("analytics") or app.config["MONGO_CLIENT"]
+        try:
+            export = Export(client.get_default_database(), collection, fmt=fmt, columns=columns,
+                            incremental=incremental, since=since, row_group=row_group,
+                            watermark_db=app.config["MONGO_CLIENT"].get_default_database())
+        except ExportError as e:
+            raise click.ClickException(str(e))
+        tmp = out + ".part"
+        with open(tmp, "wb") as f:
+            for chunk in export:
+                f.write(chunk)
+        os.replace(tmp, out)   # erst nach vollständigem Lauf sichtbar
+        export.commit()
+        click.echo(f"{export.rows} Zeilen → {out} (watermark {export.last_id})")
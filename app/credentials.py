@@ -0,0 +1,256 @@
+# app/credentials.py
+# -*- coding: utf-8 -*-
+"""
+Zentrale Credential-Verwaltung für alle Blueprints.
+
+- EIN Schema: users.username (lower+trim, unique) + users.passwordHash (Argon2id)
+- EIN Lookup-Pfad: find_user() → {"username": ...}
+- Altbestände werden beim erfolgreichen Login transparent auf Argon2id gehoben:
+    * passwordHash im werkzeug-Format (pbkdf2:/scrypt:)
+    * pwHash (alter Argon2-Hash aus dem name/pwHash-Schema)
+    * password im Klartext
+- Die Argon2-Kosten kommen fest aus der Umgebung (ARGON2_TIME_COST,
+  ARGON2_MEMORY_KIB, ARGON2_PARALLELISM). `flask calibrate-argon2` misst
+  einmalig auf der Ziel-CPU und gibt passende Werte dafür aus – beim Start
+  wird nicht gemessen. Gehasht wird neu nur, wenn ein Parameter steigt.
+
+Alle Hash-Operationen laufen über app.pwpool (nativer Thread-Pool).
+"""
+from __future__ import annotations
+
+import hmac
+import logging
+import os
+import time
+from typing import Optional
+
+import click
+from argon2 import PasswordHasher, extract_parameters
+from argon2.exceptions import InvalidHashError, VerificationError
+from argon2.low_level import Type
+from pymongo.database import Database
+from pymongo.errors import DuplicateKeyError
+from werkzeug.security import check_password_hash
+
+from . import pwpool
+from .utils import _now
+
+log = logging.getLogger(__name__)
+
+# Untergrenze laut OWASP-Empfehlung für Argon2id (19 MiB)
+MIN_MEMORY_KIB = 19 * 1024
+# argon2-cffi-Default; ohne ARGON2_TIME_COST gilt dieser Wert
+DEFAULT_TIME_COST = 3
+
+# Felder, die nie aus diesem Modul herausgegeben werden
+_SECRET_FIELDS = ("passwordHash", "pwHash", "password")
+
+_hasher = PasswordHasher(type=Type.ID)
+_dummy_hash: Optional[str] = None
+
+
+# ───────── Kalibrierung ─────────────────────────────────────────
+
+def _measure(ph: PasswordHasher) -> float:
+    h = ph.hash("calibration-probe")
+    t0 = time.perf_counter()
+    ph.verify(h, "calibration-probe")
+    return time.perf_counter() - t0
+
+
+def calibrate(target_ms: float, memory_kib: int, parallelism: int = 1,
+              max_time_cost: int = 10) -> PasswordHasher:
+    """
+    Wählt time_cost (und notfalls kleineres memory_cost), sodass ein Verify
+    auf dieser CPU ungefähr target_ms dauert. Die Laufzeit von Argon2 ist
+    linear in time_cost – eine Messung mit time_cost=1 reicht für die Schätzung.
+    """
+    target = target_ms / 1000.0
+    memory = max(memory_kib, MIN_MEMORY_KIB)
+    while True:
+        one = _measure(PasswordHasher(time_cost=1, memory_cost=memory,
+                                      parallelism=parallelism, type=Type.ID))
+        if one <= target or memory <= MIN_MEMORY_KIB:
+            break
+        memory = max(memory // 2, MIN_MEMORY_KIB)
+
+    time_cost = max(1, min(max_time_cost, int(target / one)))
+    return PasswordHasher(time_cost=time_cost, memory_cost=memory,
+                          parallelism=parallelism, type=Type.ID)
+
+
+def init_credentials(app) -> None:
+    """Konfiguriert den Argon2-Hasher mit den festen Parametern aus der Umgebung."""
+    global _hasher, _dummy_hash
+    _hasher = PasswordHasher(
+        time_cost=int(os.environ.get("ARGON2_TIME_COST", DEFAULT_TIME_COST)),
+        memory_cost=max(int(os.environ.get("ARGON2_MEMORY_KIB", 64 * 1024)), MIN_MEMORY_KIB),
+        parallelism=int(os.environ.get("ARGON2_PARALLELISM", 1)),
+        type=Type.ID,
+    )
+    _dummy_hash = _hasher.hash("timing-equalizer")
+
+    p = _hasher
+    app.config["ARGON2_PARAMS"] = {
+        "time_cost": p.time_cost, "memory_cost": p.memory_cost, "parallelism": p.parallelism,
+    }
+    log.info("🔐 Argon2id: time_cost=%d memory=%d KiB parallelism=%d",
+             p.time_cost, p.memory_cost, p.parallelism)
+
+
+def register_cli(app) -> None:
+    @app.cli.command("calibrate-argon2")
+    @click.option("--target-ms", type=float, default=lambda: float(os.environ.get("ARGON2_TARGET_MS", 100)),
+                  help="Ziel-Dauer eines Verify (Default: ARGON2_TARGET_MS bzw. 100)")
+    def calibrate_cmd(target_ms):
+        """Misst Argon2id auf dieser CPU und gibt die ARGON2_*-Werte für die Umgebung aus."""
+        ph = calibrate(target_ms, int(os.environ.get("ARGON2_MEMORY_KIB", 64 * 1024)),
+                       int(os.environ.get("ARGON2_PARALLELISM", 1)))
+        click.echo(f"ARGON2_TIME_COST={ph.time_cost}")
+        click.echo(f"ARGON2_MEMORY_KIB={ph.memory_cost}")
+        click.echo(f"ARGON2_PARALLELISM={ph.parallelism}")
+        click.echo(f"# verify ≈ {_measure(ph) * 1000:.0f} ms", err=True)
+
+
+# ───────── Helfer ───────────────────────────────────────────────
+
+def normalize_username(val: str | None) -> str:
+    return (val or "").strip().lower()
+
+
+def public_user(doc: Optional[dict]) -> Optional[dict]:
+    """Entfernt Hash-/Passwortfelder."""
+    if doc is None:
+        return None
+    return {k: v for k, v in doc.items() if k not in _SECRET_FIELDS}
+
+
+def hash_password(password: str) -> str:
+    return pwpool.run("hash", _hasher.hash, password)
+
+
+def _weaker(pw_hash: str) -> bool:
+    """
+    True, wenn der Hash schwächer ist als die aktuellen Parameter. Anders als
+    check_needs_rehash() löst ein Absenken der Kosten keinen Rehash aus.
+    """
+    try:
+        p = extract_parameters(pw_hash)
+    except InvalidHashError:
+        return True
+    return (p.type is not Type.ID
+            or p.time_cost < _hasher.time_cost
+            or p.memory_cost < _hasher.memory_cost
+            or p.parallelism < _hasher.parallelism)
+
+
+def _check(doc: dict, password: str) -> tuple[bool, bool]:
+    """
+    Prüft das Passwort gegen alle bekannten Formate.
+    Rückgabe: (ok, needs_rehash)
+    """
+    pw_hash = doc.get("passwordHash") or doc.get("pwHash")
+    if isinstance(pw_hash, str) and pw_hash.startswith("$argon2"):
+        try:
+            pwpool.run("verify", _hasher.verify, pw_hash, password)
+        except (VerificationError, InvalidHashError):
+            return False, False
+        return True, ("pwHash" in doc or "password" in doc
+                      or _weaker(pw_hash))
+
+    if isinstance(pw_hash, str) and pw_hash:
+        try:
+            ok = pwpool.run("verify", check_password_hash, pw_hash, password)
+            return ok, ok
+        except Exception:
+            # Falls ein fremdes Hash-Format o.Ä. drin ist
+            log.warning("login: unbekanntes Hash-Format für username=%s", doc.get("username"))
+            return False, False
+
+    # Fallback für wirklich alte Datensätze (Klartext in DB)
+    legacy_plain = doc.get("password")
+    if isinstance(legacy_plain, str) and legacy_plain:
+        ok = hmac.compare_digest(legacy_plain.encode(), password.encode())
+        return ok, ok
+
+    return False, False
+
+
+# ───────── Public API ───────────────────────────────────────────
+
+def find_user(db: Database, username: str, projection: Optional[dict] = None) -> Optional[dict]:
+    """Der einzige Lookup-Pfad für User (inkl. Hashfeldern – nur intern verwenden)."""
+    username = normalize_username(username)
+    if not username:
+        return None
+    return db["users"].find_one({"username": username}, projection)
+
+
+def user_exists(db: Database, username: str) -> bool:
+    return find_user(db, username, {"_id": 1}) is not None
+
+
+def create_user(db: Database, username: str, password: Optional[str], *,
+                email: Optional[str] = None, **extra) -> Optional[dict]:
+    """
+    Legt einen User an. Gibt das gespeicherte Dokument ohne Hash zurück,
+    oder None, wenn der Username schon vergeben ist.
+    """
+    username = normalize_username(username)
+    if not username:
+        raise ValueError("Username is required")
+    if user_exists(db, username):
+        return None
+
+    doc = {
+        "username": username,
+        "email": email or None,
+        "passwordHash": hash_password(password) if password else None,
+        "createdAt": _now(),
+        **extra,
+    }
+    try:
+        doc["_id"] = db["users"].insert_one(doc).inserted_id
+    except DuplicateKeyError:
+        return None
+    return public_user(doc)
+
+
+def verify_login(db: Database, username: str, password: str) -> Optional[dict]:
+    """
+    Prüft Username+Passwort. Bei Erfolg wird ein Altbestands-Hash sofort
+    durch Argon2id mit den aktuellen Parametern ersetzt.
+    Gibt den User (ohne Hash) oder None zurück.
+    """
+    if not username or not password:
+        return None
+
+    user = find_user(db, username)
+    if not user:
+        # gleiche CPU-Kosten wie ein echter Login → keine Username-Enumeration über Timing
+        if _dummy_hash:
+            try:
+                pwpool.run("verify", _hasher.verify, _dummy_hash, password)
+            except VerificationError:
+                pass
+        log.info("login: user not found (username=%s)", normalize_username(username))
+        return None
+
+    ok, needs_rehash = _check(user, password)
+    if not ok:
+        log.info("login: password mismatch (username=%s)", user.get("username"))
+        return None
+
+    if needs_rehash:
+        try:
+            db["users"].update_one(
+                {"_id": user["_id"]},
+                {"$set": {"passwordHash": hash_password(password)},
+                 "$unset": {"pwHash": "", "password": ""}},
+            )
+            log.info("🔁 rehash auf Argon2id (username=%s)", user.get("username"))
+        except Exception as e:
+            # Login soll daran nicht scheitern – nächster Login versucht es erneut
+            log.warning("rehash fehlgeschlagen (username=%s): %s", user.get("username"), e)
+
+    return public_user(user)
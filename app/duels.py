@@ -0,0 +1,409 @@
+# app/duels.py
+"""
+Live-Duell: beide Spieler beantworten dieselbe Frage gegen eine Server-Uhr.
+
+Ablauf (Socket.IO, Antworten als Ack):
+    duel_start  {friendName, questions, roundSeconds?}  → Spiel in `games` (mode "duel", waiting),
+                                                          Einladung "duel_invite" an den Freund
+    duel_join   {gameId}                                → Duell läuft, "duel_round" an beide
+    duel_decline {gameId}                               → Einladung ablehnen bzw. zurückziehen,
+                                                          "duel_cancelled" an beide
+    duel_answer {gameId, round, isCorrect, answer?}     → nach beiden Antworten oder Ablauf der
+                                                          Zeit: "duel_round_result", nächste Runde
+    am Ende "duel_finished"; das Spiel erscheint wie jedes andere unter /games/finished
+
+Nicht angenommene Einladungen verfallen nach INVITE_SECONDS (der Ticker
+räumt sie zusammen mit der Recovery ab). Duelle tauchen nicht in den
+Async-Listen (/games/open, Badge) auf und lassen sich nicht per HTTP
+beenden oder löschen.
+
+Der Zustand laufender Duelle liegt nur im Speicher des Workers, der das
+Duell besitzt (Lease `duel.owner`/`duel.leaseUntil` im Spieldokument). Ein
+einziger Ticker arbeitet einen Heap mit Deadlines ab – kein Timer pro Duell.
+Mongo sieht nur Rundengrenzen: die Checkpoints sammeln sich in einer
+Queue und gehen alle FLUSH_INTERVAL Sekunden als ein bulk_write raus.
+Jeder Checkpoint gilt nur für den Rundenstand, von dem er ausgeht
+(`duel.round`), und ist damit idempotent – nach einem Fehler mit
+unklarem Ausgang wird er einfach erneut geschickt.
+
+Stirbt der Worker, übernimmt nach Ablauf der Lease ein Worker (auch der
+neu gestartete) das Duell ab dem letzten Checkpoint; die unterbrochene
+Runde wird neu gespielt.
+"""
+import heapq
+import logging
+import os
+import socket
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+import pymongo
+from bson import ObjectId
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.database import Database
+from pymongo.errors import BulkWriteError
+
+from .metrics import DUELS_ACTIVE, DUEL_FLUSH_OPS
+
+log = logging.getLogger(__name__)
+
+ROUND_SECONDS = float(os.environ.get("DUEL_ROUND_SECONDS", 20))
+ROUND_PAUSE = float(os.environ.get("DUEL_ROUND_PAUSE", 3))
+FLUSH_INTERVAL = float(os.environ.get("DUEL_FLUSH_INTERVAL", 0.5))
+LEASE_SECONDS = float(os.environ.get("DUEL_LEASE_SECONDS", 30))
+MAX_QUESTIONS = int(os.environ.get("DUEL_MAX_QUESTIONS", 30))
+INVITE_SECONDS = float(os.environ.get("DUEL_INVITE_SECONDS", 300))
+_TICK = 0.05
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+
+class DuelError(ValueError):
+    pass
+
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _lease_until() -> datetime:
+    return datetime.fromtimestamp(time.time() + LEASE_SECONDS, tz=timezone.utc)
+
+
+def _oid(gid: str) -> ObjectId:
+    try:
+        return ObjectId(gid)
+    except Exception:
+        raise DuelError("bad id")
+
+
+class Duel:
+    """Reiner In-Memory-Zustand eines laufenden Duells (ohne I/O)."""
+
+    __slots__ = ("gid", "host", "friend", "questions", "round_seconds",
+                 "round", "deadline", "answers", "host_correct", "friend_correct")
+
+    def __init__(self, gid: str, host: str, friend: str, questions: list, round_seconds: float,
+                 round_: int = 0, host_correct: int = 0, friend_correct: int = 0):
+        self.gid = gid
+        self.host = host
+        self.friend = friend
+        self.questions = questions
+        self.round_seconds = round_seconds
+        self.round = round_
+        self.deadline = 0.0            # 0 = Runde läuft gerade nicht (Pause)
+        self.answers: dict[str, dict] = {}
+        self.host_correct = host_correct
+        self.friend_correct = friend_correct
+
+    @classmethod
+    def from_doc(cls, doc: dict) -> "Duel":
+        d = doc.get("duel") or {}
+        return cls(str(doc["_id"]), doc["hostName"], doc["friendName"], doc["questions"],
+                   float(d.get("roundSeconds") or ROUND_SECONDS), int(d.get("round") or 0),
+                   int(doc.get("hostCorrect") or 0), int(doc.get("friendCorrect") or 0))
+
+    @property
+    def players(self) -> tuple[str, str]:
+        return self.host, self.friend
+
+    @property
+    def finished(self) -> bool:
+        return self.round >= len(self.questions)
+
+    def open_round(self, now: float) -> dict:
+        self.answers = {}
+        self.deadline = now + self.round_seconds
+        q = self.questions[self.round]
+        return {"gameId": self.gid, "round": self.round, "of": len(self.questions),
+                "question": q, "secondsLeft": self.round_seconds,
+                "deadline": int((time.time() + self.round_seconds) * 1000)}
+
+    def answer(self, player: str, round_: int, is_correct: bool, answer, now: float) -> bool:
+        """Antwort eintragen; True, sobald beide geantwortet haben."""
+        if player not in self.players:
+            raise DuelError("not participant")
+        if round_ != self.round or not self.deadline:
+            raise DuelError("round closed")
+        if now > self.deadline:
+            raise DuelError("too late")
+        if player in self.answers:
+            raise DuelError("already answered")
+        self.answers[player] = {
+            "questionId": self.questions[self.round].get("questionId"),
+            "isCorrect": bool(is_correct),
+            "answer": answer,
+            "ms": int((now - (self.deadline - self.round_seconds)) * 1000),
+            "round": self.round,
+        }
+        return len(self.answers) == 2
+
+    def close_round(self) -> dict:
+        """Runde werten (fehlende Antwort = falsch) und weiterschalten."""
+        qid = self.questions[self.round].get("questionId")
+        result = {}
+        for p in self.players:
+            a = self.answers.get(p) or {"questionId": qid, "isCorrect": False, "answer": None,
+                                        "ms": None, "round": self.round, "timeout": True}
+            result[p] = a
+        self.host_correct += int(result[self.host]["isCorrect"])
+        self.friend_correct += int(result[self.friend]["isCorrect"])
+        self.round += 1
+        self.deadline = 0.0
+        self.answers = {}
+        return result
+
+    def scores(self) -> dict:
+        return {self.host: self.host_correct, self.friend: self.friend_correct}
+
+
+class DuelManager:
+    """Alle Duelle dieses Workers: Ticker, Checkpoint-Queue, Lease, Recovery."""
+
+    def __init__(self):
+        self.duels: dict[str, Duel] = {}
+        self._heap: list[tuple[float, str, int, str]] = []   # (zeit, gid, runde, "open"|"close")
+        self._pending: list[UpdateOne] = []
+        self._db: Optional[Database] = None
+        self._socketio = None
+
+    # ---- Hilfen ----
+    def _emit(self, event, data, room):
+        from .sockets import emit  # zirkulärer Import (sockets → duels)
+        emit(event, data, room=room)
+
+    def _schedule(self, at: float, duel: Duel, kind: str):
+        heapq.heappush(self._heap, (at, duel.gid, duel.round, kind))
+
+    def _checkpoint(self, gid: str, round_before: int, update: dict):
+        self._pending.append(UpdateOne(
+            {"_id": ObjectId(gid), "duel.owner": WORKER_ID, "duel.round": round_before}, update))
+
+    def _adopt(self, duel: Duel):
+        self.duels[duel.gid] = duel
+        DUELS_ACTIVE.set(len(self.duels))
+        self._schedule(time.monotonic(), duel, "open")
+
+    # ---- API für die Socket-Handler ----
+    def create(self, db: Database, host: str, friend: str, questions: list,
+               round_seconds: Optional[float] = None) -> str:
+        if not friend or friend == host:
+            raise DuelError("friendName fehlt")
+        if not isinstance(questions, list) or not questions or len(questions) > MAX_QUESTIONS:
+            raise DuelError(f"1–{MAX_QUESTIONS} questions erwartet")
+        if not all(isinstance(q, dict) and q.get("questionId") is not None for q in questions):
+            raise DuelError("questions brauchen questionId")
+        seconds = min(max(float(round_seconds or ROUND_SECONDS), 5.0), 120.0)
+        gid = db.games.insert_one({
+            "hostName": host,
+            "friendName": friend,
+            "questions": questions,
+            "hostAnswers": [],
+            "friendAnswers": [],
+            "createdAt": _now_iso(),
+            "finished": False,
+            "hostSeenResult": False,
+            "friendSeenResult": False,
+            "hostCorrect": 0,
+            "friendCorrect": 0,
+            "mode": "duel",
+            "duel": {"status": "waiting", "round": 0, "roundSeconds": seconds,
+                     "inviteUntil": datetime.fromtimestamp(time.time() + INVITE_SECONDS,
+                                                           tz=timezone.utc)},
+        }).inserted_id
+        gid = str(gid)
+        self._emit("duel_invite", {"gameId": gid, "from": host, "questions": len(questions),
+                                   "roundSeconds": seconds}, room=friend)
+        return gid
+
+    def join(self, db: Database, user: str, gid: str) -> None:
+        doc = db.games.find_one_and_update(
+            {"_id": _oid(gid), "mode": "duel", "friendName": user, "duel.status": "waiting",
+             "duel.inviteUntil": {"$gt": datetime.now(timezone.utc)}},
+            {"$set": {"duel.status": "running", "duel.owner": WORKER_ID,
+                      "duel.leaseUntil": _lease_until(), "duel.startedAt": _now_iso()}},
+            return_document=ReturnDocument.AFTER,
+        )
+        if doc is None:
+            raise DuelError("not found / already started")
+        self._adopt(Duel.from_doc(doc))
+        log.info("⚔️  duel %s gestartet: %s vs %s", gid, doc["hostName"], user)
+
+    def decline(self, db: Database, user: str, gid: str) -> None:
+        """Wartende Einladung verwerfen – der Freund lehnt ab, der Host zieht zurück."""
+        doc = db.games.find_one_and_delete(
+            {"_id": _oid(gid), "mode": "duel", "duel.status": "waiting",
+             "$or": [{"hostName": user}, {"friendName": user}]},
+            projection={"hostName": 1, "friendName": 1},
+        )
+        if doc is None:
+            raise DuelError("not found / already started")
+        self._cancelled(doc, "declined", by=user)
+
+    def _cancelled(self, doc: dict, reason: str, by: Optional[str] = None):
+        payload = {"gameId": str(doc["_id"]), "reason": reason, "by": by}
+        for p in (doc["hostName"], doc["friendName"]):
+            self._emit("duel_cancelled", payload, room=p)
+
+    def answer(self, user: str, gid: str, round_: int, is_correct: bool, answer=None) -> dict:
+        duel = self.duels.get(gid)
+        if duel is None:
+            raise DuelError("duel not active")
+        both = duel.answer(user, int(round_), is_correct, answer, time.monotonic())
+        other = duel.friend if user == duel.host else duel.host
+        self._emit("duel_answered", {"gameId": gid, "round": duel.round, "from": user}, room=other)
+        if both:
+            self._close_round(duel)
+        return {"round": int(round_), "bothAnswered": both}
+
+    # ---- Rundenwechsel (Ticker) ----
+    def _open_round(self, duel: Duel):
+        payload = duel.open_round(time.monotonic())
+        self._schedule(duel.deadline, duel, "close")
+        for p in duel.players:
+            self._emit("duel_round", payload, room=p)
+
+    def _close_round(self, duel: Duel):
+        result = duel.close_round()
+        upd = {
+            "$push": {"hostAnswers": result[duel.host], "friendAnswers": result[duel.friend]},
+            "$set": {"duel.round": duel.round, "hostCorrect": duel.host_correct,
+                     "friendCorrect": duel.friend_correct, "duel.leaseUntil": _lease_until()},
+        }
+        payload = {"gameId": duel.gid, "round": duel.round - 1, "answers": result, "scores": duel.scores()}
+        if duel.finished:
+            upd["$set"].update({
+                "finished": True, "finishedAt": _now_iso(), "duel.status": "finished",
+                "hostAnswered": duel.round, "friendAnswered": duel.round,
+                "totalQuestions": len(duel.questions),
+            })
+            upd["$unset"] = {"duel.owner": "", "duel.leaseUntil": ""}
+            self.duels.pop(duel.gid, None)
+            DUELS_ACTIVE.set(len(self.duels))
+        else:
+            self._schedule(time.monotonic() + ROUND_PAUSE, duel, "open")
+        self._checkpoint(duel.gid, duel.round - 1, upd)
+
+        for p in duel.players:
+            self._emit("duel_round_result", payload, room=p)
+            if duel.finished:
+                self._emit("duel_finished", {"gameId": duel.gid, "scores": duel.scores()}, room=p)
+
+    def tick(self, now: Optional[float] = None) -> None:
+        """Fällige Heap-Einträge abarbeiten; veraltete (Runde schon weiter) verwerfen."""
+        now = time.monotonic() if now is None else now
+        while self._heap and self._heap[0][0] <= now:
+            _, gid, round_, kind = heapq.heappop(self._heap)
+            duel = self.duels.get(gid)
+            if duel is None or duel.round != round_:
+                continue
+            if kind == "open" and not duel.deadline:
+                self._open_round(duel)
+            elif kind == "close" and duel.deadline:
+                self._close_round(duel)
+
+    # ---- Mongo: Checkpoints, Lease, Recovery ----
+    def flush(self) -> int:
+        ops, self._pending = self._pending, []
+        if not ops:
+            return 0
+        DUEL_FLUSH_OPS.observe(len(ops))
+        try:
+            self._db.games.bulk_write(ops, ordered=True)
+        except BulkWriteError as e:
+            # ordered: alles vor dem fehlerhaften Update ist geschrieben, der Rest nicht
+            failed = e.details["writeErrors"][0]["index"]
+            log.warning("⚠️ Duell-Checkpoint %d/%d abgelehnt, verworfen: %s",
+                        failed + 1, len(ops), e.details["writeErrors"][0].get("errmsg"))
+            self._pending = ops[failed + 1:] + self._pending
+        except Exception as e:
+            # Ausgang unbekannt (Netz, Failover) → alles erneut; dank duel.round-Filter idempotent
+            log.warning("⚠️ Duell-Checkpoint fehlgeschlagen (%d Updates): %s", len(ops), e)
+            self._pending = ops + self._pending
+        return len(ops)
+
+    def renew_leases(self) -> None:
+        """Leases verlängern; Duelle, deren Lease ein anderer Worker hält, aufgeben."""
+        if not self.duels:
+            return
+        ids = [ObjectId(g) for g in self.duels]
+        res = self._db.games.update_many(
+            {"_id": {"$in": ids}, "duel.owner": WORKER_ID},
+            {"$set": {"duel.leaseUntil": _lease_until()}},
+        )
+        if res.matched_count == len(ids):
+            return
+        owned = {str(d["_id"]) for d in self._db.games.find(
+            {"_id": {"$in": ids}, "duel.owner": WORKER_ID}, {"_id": 1})}
+        for gid in [g for g in self.duels if g not in owned]:
+            self.duels.pop(gid, None)
+            log.warning("⚔️  Lease für Duell %s verloren – abgegeben", gid)
+        DUELS_ACTIVE.set(len(self.duels))
+
+    def recover(self, limit: int = 500) -> int:
+        """Laufende Duelle mit abgelaufener Lease übernehmen (z.B. nach Neustart)."""
+        now = datetime.now(timezone.utc)
+        cond = {"mode": "duel", "duel.status": "running", "duel.leaseUntil": {"$lt": now}}
+        n = 0
+        for doc in self._db.games.find(cond, {"_id": 1}).limit(limit):
+            claimed = self._db.games.find_one_and_update(
+                {"_id": doc["_id"], **cond},
+                {"$set": {"duel.owner": WORKER_ID, "duel.leaseUntil": _lease_until()}},
+                return_document=ReturnDocument.AFTER,
+            )
+            if claimed is not None and str(claimed["_id"]) not in self.duels:
+                self._adopt(Duel.from_doc(claimed))
+                n += 1
+        if n:
+            log.info("⚔️  %d Duelle ab letztem Checkpoint übernommen", n)
+        return n
+
+    def expire_invites(self, limit: int = 500) -> int:
+        """Nicht angenommene Einladungen nach INVITE_SECONDS entfernen."""
+        cond = {"mode": "duel", "duel.status": "waiting",
+                "duel.inviteUntil": {"$lt": datetime.now(timezone.utc)}}
+        n = 0
+        for doc in self._db.games.find(cond, {"_id": 1}).limit(limit):
+            gone = self._db.games.find_one_and_delete(
+                {"_id": doc["_id"], **cond}, projection={"hostName": 1, "friendName": 1})
+            if gone is not None:           # sonst war ein anderer Worker oder duel_join schneller
+                self._cancelled(gone, "expired")
+                n += 1
+        if n:
+            log.info("⚔️  %d Duell-Einladungen verfallen", n)
+        return n
+
+    def start(self, app, socketio) -> None:
+        self._db = app.config["MONGO_CLIENT"].get_default_database()
+
+        def _ticker():
+            last_flush = last_lease = time.monotonic()
+            while True:
+                socketio.sleep(_TICK)
+                try:
+                    self.tick()
+                    now = time.monotonic()
+                    if now - last_flush >= FLUSH_INTERVAL:
+                        last_flush = now
+                        self.flush()
+                    if now - last_lease >= LEASE_SECONDS / 3:
+                        last_lease = now
+                        self.renew_leases()
+                        self.recover()
+                        self.expire_invites()
+                except Exception as e:
+                    log.warning("⚠️ Duell-Ticker: %s", e)
+
+        socketio.start_background_task(_ticker)
+
+
+def ensure_indexes(db: Database) -> None:
+    db["games"].create_index(
+        [("duel.status", pymongo.ASCENDING), ("duel.leaseUntil", pymongo.ASCENDING)],
+        name="duel_status_lease",
+        partialFilterExpression={"mode": "duel"},
+    )
+
+
+manager = DuelManager()
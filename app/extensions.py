@@ -1,4 +1,5 @@
 # app/extensions.py
+import importlib.util
 import os, sys, logging, pymongo
 from logging.handlers import RotatingFileHandler
 from flask_cors import CORS
@@ -10,14 +11,23 @@ jwt = JWTManager()
 socketio = SocketIO()
 
 def init_logging():
+    """
+    Root-Logger → AsyncLogHandler (Queue + nativer Writer-Thread) →
+    stdout + Rotationsdatei. Format per LOG_FORMAT: "json" (Default) oder "text".
+    """
+    from .logpipe import AsyncLogHandler, JsonFormatter
+
     logger = logging.getLogger()
     if logger.handlers:
         return
     level = os.environ.get("LOG_LEVEL", "DEBUG").upper()
     logger.setLevel(level)
 
-    fmt = "%(asctime)s %(levelname)-8s [%(filename)s:%(lineno)d] %(message)s"
-    formatter = logging.Formatter(fmt)
+    if os.environ.get("LOG_FORMAT", "json").lower() == "text":
+        fmt = "%(asctime)s %(levelname)-8s [%(filename)s:%(lineno)d] %(message)s"
+        formatter = logging.Formatter(fmt)
+    else:
+        formatter = JsonFormatter()
 
     console = logging.StreamHandler(sys.stdout)
     console.setFormatter(formatter)
@@ -37,10 +47,94 @@ def init_logging():
     file.setFormatter(formatter)
     file.setLevel(level)
 
-    logger.addHandler(console)
-    logger.addHandler(file)
+    pipeline = AsyncLogHandler(
+        [console, file],
+        maxsize=int(os.environ.get("LOG_QUEUE_SIZE", 10_000)),
+        high_water=float(os.environ.get("LOG_QUEUE_HIGH_WATER", 0.8)),
+    )
+    pipeline.setLevel(level)
+    logger.addHandler(pipeline)
+
+# env-Suffix → MongoClient-Option (nur gesetzt, wenn die Variable existiert)
+_MONGO_INT_OPTIONS = {
+    "MAX_POOL_SIZE": "maxPoolSize",
+    "MIN_POOL_SIZE": "minPoolSize",
+    "MAX_CONNECTING": "maxConnecting",
+    "MAX_IDLE_TIME_MS": "maxIdleTimeMS",
+    "WAIT_QUEUE_TIMEOUT_MS": "waitQueueTimeoutMS",
+    "CONNECT_TIMEOUT_MS": "connectTimeoutMS",
+    "SOCKET_TIMEOUT_MS": "socketTimeoutMS",
+    "SERVER_SELECTION_TIMEOUT_MS": "serverSelectionTimeoutMS",
+}
+
+# Kompressor → Python-Modul, das pymongo dafür braucht (zlib ist immer da)
+_COMPRESSOR_MODULES = {"zstd": "zstandard", "snappy": "snappy", "zlib": "zlib"}
+
+
+def available_compressors(spec: str) -> list[str]:
+    """'zstd,zlib' → nur die Kompressoren, deren Modul installiert ist."""
+    out = []
+    for name in (c.strip().lower() for c in (spec or "").split(",")):
+        mod = _COMPRESSOR_MODULES.get(name)
+        if not mod:
+            continue
+        if importlib.util.find_spec(mod) is None:
+            logging.getLogger(__name__).warning("⚠️ Mongo-Kompressor %s nicht verfügbar (pip install %s)", name, mod)
+            continue
+        out.append(name)
+    return out
+
+
+def mongo_options(prefix: str, defaults: dict | None = None) -> dict:
+    """
+    MongoClient-Optionen aus ENV, z.B. MONGO_MAX_POOL_SIZE=50.
+    Für prefix="MONGO_ANALYTICS_" fallen Timeouts auf die MONGO_-Werte
+    zurück, Pool-Größen nicht (eigener, kleinerer Pool).
+    """
+    opts = dict(defaults or {})
+    for suffix, key in _MONGO_INT_OPTIONS.items():
+        raw = os.environ.get(prefix + suffix)
+        if not raw and "POOL_SIZE" not in suffix:
+            raw = os.environ.get("MONGO_" + suffix)
+        if raw:
+            opts[key] = int(raw)
+    compressors = available_compressors(os.environ.get("MONGO_COMPRESSORS", ""))
+    if compressors:
+        opts["compressors"] = compressors
+        if "zlib" in compressors and os.environ.get("MONGO_ZLIB_LEVEL"):
+            opts["zlibCompressionLevel"] = int(os.environ["MONGO_ZLIB_LEVEL"])
+    return opts
+
 
 def init_db(app):
-    """Erzeuge einen globalen MongoClient in app.config['MONGO_CLIENT']."""
+    """
+    Erzeuge die MongoClients:
+    - app.config['MONGO_CLIENT']: Default-Workload (Spiel-Schreibzugriffe,
+      Auth …) immer auf dem Primary.
+    - app.config['MONGO_CLIENTS']['analytics']: eigener Pool für schwere
+      Lesezugriffe (Analytics, Exporte, Suche) mit eigener Read-Preference
+      (MONGO_ANALYTICS_READ_PREFERENCE, Default secondaryPreferred).
+    connect=False: keine Verbindung beim Start, erst beim ersten Kommando.
+    """
+    from .mongo_monitor import CommandMetricsListener, PoolListener
+    from .slowlog import recorder
+
     if "MONGO_CLIENT" not in app.config:
-        app.config["MONGO_CLIENT"] = pymongo.MongoClient(app.config["MONGO_URI"])
+        commands = CommandMetricsListener()
+        pool = PoolListener("default")
+        app.config["MONGO_POOL_LISTENER"] = pool
+        client = pymongo.MongoClient(
+            app.config["MONGO_URI"],
+            connect=False,
+            event_listeners=[commands, recorder, pool],
+            **mongo_options("MONGO_"),
+        )
+        analytics = pymongo.MongoClient(
+            os.environ.get("MONGO_ANALYTICS_URI") or app.config["MONGO_URI"],
+            connect=False,
+            readPreference=os.environ.get("MONGO_ANALYTICS_READ_PREFERENCE", "secondaryPreferred"),
+            event_listeners=[commands, recorder, PoolListener("analytics")],
+            **mongo_options("MONGO_ANALYTICS_", {"maxPoolSize": 20}),
+        )
+        app.config["MONGO_CLIENT"] = client
+        app.config["MONGO_CLIENTS"] = {"default": client, "analytics": analytics}
@@ -0,0 +1,267 @@
+# app/feedback_stats.py
+"""
+Mitgeführte Aggregate für Feedback – statt count_documents/$group pro Seitenaufruf.
+
+`feedback_counters`:
+    {_id: "all", total, open}
+
+`feedback_questions` (ein Dokument pro Frage):
+    {_id: <questionId>, questionText, totalCount, openCount, lastReportAt,
+     samples: [{id, feedback, username, createdAt}, …]}   # letzte offene, max. SAMPLES
+
+Gepflegt in create_feedback/-batch (+1 total/open, Sample vorn anhängen) und
+mark_resolved (±1 open, nur bei echtem Zustandswechsel; Samples werden aus
+den offenen Meldungen neu gefüllt).
+
+Migration: migrate() baut die Aggregate einmalig aus `feedback` auf
+(Index-Schritt im Hintergrund bzw. `flask ensure-indexes`). Marker ist
+{_id: "migration", version, dirty: [questionId, …]} in `feedback_counters`
+("all" taugt nicht – on_created legt es per Upsert an). Solange version <
+VERSION, schreiben die Hooks keine Aggregate, sondern tragen nur die Frage
+in `dirty` ein (ein bedingter Upsert – derselbe Roundtrip prüft den Marker).
+Damit kollidiert kein $inc mit den $set des Neuaufbaus; migrate() rechnet
+danach die dirty-Fragen nach und setzt version erst, wenn `dirty` leer ist
+(Compare-and-set). Ist der Marker einmal gesetzt, merkt sich der Prozess
+das und die Hooks laufen wieder ohne Zusatz-Roundtrip.
+"""
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+import pymongo
+from pymongo import DeleteMany, UpdateOne
+from pymongo.database import Database
+from pymongo.errors import DuplicateKeyError
+
+log = logging.getLogger(__name__)
+
+COUNTERS = "feedback_counters"
+QUESTIONS = "feedback_questions"
+SAMPLES = 3
+SAMPLE_CHARS = 280
+
+MIGRATION = "migration"
+VERSION = 1
+MIGRATION_STALE = 600   # Claim eines abgestürzten Workers gilt danach als verwaist
+_MIGRATION_ROUNDS = 100
+
+_migrated = False       # pro Prozess: Marker schon auf VERSION gesehen
+
+
+def _sample(doc: dict) -> dict:
+    return {
+        "id": str(doc["_id"]),
+        "feedback": (doc.get("feedback") or "")[:SAMPLE_CHARS],
+        "username": doc.get("username"),
+        "createdAt": doc.get("createdAt"),
+    }
+
+
+def _question_update(doc: dict) -> dict:
+    upd = {
+        "$inc": {"totalCount": 1, "openCount": 1},
+        "$max": {"lastReportAt": doc["createdAt"]},
+        "$push": {"samples": {"$each": [_sample(doc)], "$position": 0, "$slice": SAMPLES}},
+    }
+    if doc.get("questionText"):
+        upd["$set"] = {"questionText": doc["questionText"]}
+    return upd
+
+
+def _deferred(db: Database, qids) -> bool:
+    """
+    True, solange die Migration aussteht – die Fragen sind dann im Marker
+    als dirty vermerkt und migrate() rechnet sie nach. Bei gesetztem Marker
+    scheitert der Upsert am _id (DuplicateKeyError) → Hooks schreiben selbst.
+    """
+    global _migrated
+    if _migrated:
+        return False
+    try:
+        db[COUNTERS].update_one(
+            {"_id": MIGRATION, "version": {"$lt": VERSION}},
+            {"$addToSet": {"dirty": {"$each": sorted({q for q in qids if q is not None})}},
+             "$setOnInsert": {"version": 0}},
+            upsert=True,
+        )
+    except DuplicateKeyError:
+        _migrated = True
+        return False
+    return True
+
+
+def on_created(db: Database, doc: dict) -> None:
+    """Neues Feedback (bereits eingefügt, mit _id)."""
+    if _deferred(db, [doc["questionId"]]):
+        return
+    db[COUNTERS].update_one({"_id": "all"}, {"$inc": {"total": 1, "open": 1}}, upsert=True)
+    db[QUESTIONS].update_one({"_id": doc["questionId"]}, _question_update(doc), upsert=True)
+
+
+def on_created_many(db: Database, docs: list[dict]) -> None:
+    """Wie on_created für einen ganzen Batch – zwei Roundtrips statt 2×N."""
+    if _deferred(db, [d["questionId"] for d in docs]):
+        return
+    n = len(docs)
+    db[COUNTERS].update_one({"_id": "all"}, {"$inc": {"total": n, "open": n}}, upsert=True)
+    db[QUESTIONS].bulk_write(
+        [UpdateOne({"_id": d["questionId"]}, _question_update(d), upsert=True) for d in docs],
+        ordered=True,   # Reihenfolge der Samples wie eingefügt
+    )
+
+
+def open_samples(db: Database, qid: str) -> list[dict]:
+    """Die jüngsten offenen Meldungen einer Frage (Index resolved_questionId_createdAt_id)."""
+    cur = (
+        db["feedback"]
+        .find({"questionId": qid, "resolved": {"$ne": True}},
+              {"feedback": 1, "username": 1, "createdAt": 1})
+        .sort([("createdAt", pymongo.DESCENDING), ("_id", pymongo.DESCENDING)])
+        .limit(SAMPLES)
+    )
+    return [_sample(d) for d in cur]
+
+
+def on_resolved_changed(db: Database, fid: str, qid: str, resolved: bool) -> None:
+    """
+    Status wirklich gewechselt: offen ↔ erledigt. Die Samples werden aus
+    `feedback` neu gefüllt – nach dem Erledigen rückt die nächste offene
+    Meldung nach, nach dem Wieder-Öffnen ist die Meldung wieder dabei.
+    """
+    if _deferred(db, [qid]):
+        return
+    delta = -1 if resolved else 1
+    db[COUNTERS].update_one({"_id": "all"}, {"$inc": {"open": delta}}, upsert=True)
+    db[QUESTIONS].update_one(
+        {"_id": qid},
+        {"$inc": {"openCount": delta}, "$set": {"samples": open_samples(db, qid)}},
+        upsert=True,
+    )
+
+
+def total(db: Database, resolved: Optional[bool] = None, qid: Optional[str] = None) -> int:
+    """Anzahl passend zu den List-Filtern – ein Lookup per _id."""
+    if qid:
+        doc = db[QUESTIONS].find_one({"_id": qid}, {"totalCount": 1, "openCount": 1}) or {}
+        t, o = int(doc.get("totalCount", 0)), int(doc.get("openCount", 0))
+    else:
+        doc = db[COUNTERS].find_one({"_id": "all"}) or {}
+        t, o = int(doc.get("total", 0)), int(doc.get("open", 0))
+    if resolved is None:
+        return t
+    return t - o if resolved else o
+
+
+def by_question(db: Database, *, include_resolved: bool = False, limit: int = 50, skip: int = 0) -> list[dict]:
+    """Fragen nach offenen Meldungen, dann jüngster Meldung (Index questions_open_last)."""
+    q = {} if include_resolved else {"openCount": {"$gt": 0}}
+    cur = (
+        db[QUESTIONS]
+        .find(q)
+        .sort([("openCount", pymongo.DESCENDING), ("lastReportAt", pymongo.DESCENDING)])
+        .skip(skip)
+        .limit(limit)
+    )
+    out = []
+    for d in cur:
+        d["questionId"] = d.pop("_id")
+        out.append(d)
+    return out
+
+
+def rebuild(db: Database, qids: Optional[list] = None) -> int:
+    """
+    Fragen-Aggregate aus `feedback` neu berechnen (alle oder nur `qids`) und
+    "all" als Summe über `feedback_questions` setzen. Nur ohne parallele
+    Hook-Schreibzugriffe aufrufen (migrate() sorgt dafür).
+    """
+    open_expr = {"$ne": ["$resolved", True]}
+    pipeline = [{"$match": {"questionId": {"$in": qids}}}] if qids is not None else []
+    rows = list(db["feedback"].aggregate(pipeline + [
+        {"$sort": {"createdAt": -1, "_id": -1}},
+        {"$group": {
+            "_id": "$questionId",
+            "questionText": {"$max": "$questionText"},
+            "totalCount": {"$sum": 1},
+            "openCount": {"$sum": {"$cond": [open_expr, 1, 0]}},
+            "lastReportAt": {"$max": "$createdAt"},
+            "samples": {"$push": {"$cond": [open_expr, {
+                "id": {"$toString": "$_id"},
+                "feedback": {"$substrCP": [{"$ifNull": ["$feedback", ""]}, 0, SAMPLE_CHARS]},
+                "username": "$username",
+                "createdAt": "$createdAt",
+            }, None]}},
+        }},
+        {"$project": {
+            "questionText": 1, "totalCount": 1, "openCount": 1, "lastReportAt": 1,
+            "samples": {"$slice": [{"$filter": {"input": "$samples", "cond": {"$ne": ["$$this", None]}}}, SAMPLES]},
+        }},
+    ], allowDiskUse=True))
+
+    ops = [UpdateOne({"_id": r.pop("_id")}, {"$set": r}, upsert=True) for r in rows if r.get("_id")]
+    if ops:
+        db[QUESTIONS].bulk_write(ops, ordered=False)
+    sums = list(db[QUESTIONS].aggregate([
+        {"$group": {"_id": None, "total": {"$sum": "$totalCount"}, "open": {"$sum": "$openCount"}}},
+    ]))
+    totals = {"total": sums[0]["total"], "open": sums[0]["open"]} if sums else {"total": 0, "open": 0}
+    db[COUNTERS].bulk_write([
+        DeleteMany({"_id": {"$regex": "^q:"}}),   # Zähler-Altformat
+        UpdateOne({"_id": "all"}, {"$set": totals}, upsert=True),
+    ], ordered=True)
+    log.info("🧮 feedback-Aggregate neu aufgebaut (%d Fragen)", len(rows))
+    return len(rows)
+
+
+def needs_migration(db: Database) -> bool:
+    doc = db[COUNTERS].find_one({"_id": MIGRATION}, {"version": 1})
+    return doc is None or int(doc.get("version") or 0) < VERSION
+
+
+def migrate(db: Database) -> bool:
+    """
+    Aggregate einmalig neu aufbauen. Genau ein Worker übernimmt (Claim auf
+    das Marker-Dokument), alle anderen kehren sofort zurück – ihre Hooks
+    vermerken bis dahin nur dirty-Fragen. Rückgabe: True, wenn dieser
+    Aufruf die Migration abgeschlossen hat.
+    """
+    if not needs_migration(db):
+        return False
+    now = datetime.now(timezone.utc)
+    try:
+        db[COUNTERS].update_one(
+            {"_id": MIGRATION, "version": {"$lt": VERSION},
+             "$or": [{"startedAt": {"$exists": False}},
+                     {"startedAt": {"$lt": now - timedelta(seconds=MIGRATION_STALE)}}]},
+            {"$set": {"startedAt": now}, "$setOnInsert": {"version": 0}},
+            upsert=True,
+        )
+    except DuplicateKeyError:
+        return False   # läuft woanders (oder ist eben fertig geworden)
+
+    rebuild(db)
+    marker = db[COUNTERS]
+    for _ in range(_MIGRATION_ROUNDS):
+        # erst austragen, dann nachrechnen: ein Hook danach trägt die Frage erneut ein
+        dirty = (marker.find_one({"_id": MIGRATION}, {"dirty": 1}) or {}).get("dirty") or []
+        if dirty:
+            marker.update_one({"_id": MIGRATION}, {"$pull": {"dirty": {"$in": dirty}}})
+            rebuild(db, dirty)
+        done = marker.update_one(
+            {"_id": MIGRATION, "$or": [{"dirty": {"$exists": False}}, {"dirty": {"$size": 0}}]},
+            {"$set": {"version": VERSION, "migratedAt": datetime.now(timezone.utc)}},
+        )
+        if done.matched_count:
+            log.info("🧮 feedback-Aggregate migriert (Version %d)", VERSION)
+            return True
+    log.warning("⚠️ feedback-Migration: dirty-Fragen kommen schneller nach als gerechnet – nächster Lauf")
+    return False
+
+
+def ensure(db: Database) -> None:
+    """Index anlegen; Aggregate einmalig aufbauen, falls noch nicht geschehen."""
+    db[QUESTIONS].create_index(
+        [("openCount", pymongo.DESCENDING), ("lastReportAt", pymongo.DESCENDING)],
+        name="questions_open_last",
+    )
+    migrate(db)
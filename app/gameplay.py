@@ -0,0 +1,127 @@
+# app/gameplay.py
+"""
+Antworten eines Spielers speichern – gemeinsam für PATCH /games/<gid>/answer
+und das Socket-Event submit_answers.
+
+Ein Aufruf = ein Lesen (Teilnehmer + Antworten) und ein bedingtes
+find_one_and_update, das die zusammengeführte Antwortliste setzt, falls
+sie sich seit dem Lesen nicht geändert hat, und gleich die Zählerstände
+zurückgibt (sonst neu lesen, max. _CAS_RETRIES Versuche). Sind danach
+beide fertig, markiert ein weiteres (bedingtes, idempotentes) Update das
+Spiel als beendet.
+Der Gegner wird direkt benachrichtigt – ein extra game_progress vom
+Client ist nicht mehr nötig.
+"""
+import logging
+
+from bson.objectid import InvalidId, ObjectId
+from pymongo import ReturnDocument
+from pymongo.database import Database
+
+from .utils import _now, _open_games_with_badge
+
+log = logging.getLogger(__name__)
+
+_COUNTS = {"hostName": 1, "friendName": 1, "finished": 1, "mode": 1,
+           "questions.questionId": 1, "hostAnswers.isCorrect": 1, "friendAnswers.isCorrect": 1}
+_CAS_RETRIES = 5
+
+
+class AnswerError(ValueError):
+    def __init__(self, msg: str, status: int = 400):
+        super().__init__(msg)
+        self.status = status
+
+
+def _emit(event, data, room, **kwargs):
+    from .sockets import emit  # zirkulärer Import (sockets → gameplay)
+    emit(event, data, room=room, **kwargs)
+
+
+def _valid_qid(qid) -> bool:
+    # landet in einem set → nur hashbare Skalare; bool ist kein int im Sinne einer Frage-ID
+    return isinstance(qid, (str, int)) and not isinstance(qid, bool)
+
+
+def submit_answers(db: Database, gid: str, user: str, answers) -> dict:
+    """
+    Speichert `answers` (ersetzt frühere Antworten auf dieselben Fragen).
+    Rückgabe: {gameId, hostAnswered, friendAnswered, totalQuestions, finished}.
+    AnswerError mit HTTP-Status bei ungültigen Daten.
+    """
+    if not isinstance(answers, list) or not answers:
+        raise AnswerError("no answers")
+    if not all(isinstance(a, dict) and _valid_qid(a.get("questionId")) for a in answers):
+        raise AnswerError("answers need questionId (string or int)")
+    try:
+        obj = ObjectId(gid)
+    except (InvalidId, TypeError):
+        raise AnswerError("bad id")
+
+    qids = {a["questionId"] for a in answers}
+    for _ in range(_CAS_RETRIES):
+        game = db.games.find_one({"_id": obj}, {"hostName": 1, "friendName": 1, "mode": 1,
+                                                "hostAnswers": 1, "friendAnswers": 1})
+        if not game:
+            raise AnswerError("not found", 404)
+        field = ("hostAnswers" if user == game["hostName"].lower()
+                 else "friendAnswers" if user == game["friendName"].lower()
+                 else None)
+        if field is None:
+            raise AnswerError("not participant", 403)
+        if game.get("mode") == "duel":
+            raise AnswerError("live duel – answers via socket", 409)
+
+        # Compare-and-set: nur schreiben, wenn die Liste noch die gelesene ist.
+        # Parallele Batches desselben Spielers (eigene Greenlets) verlieren so
+        # nichts – der zweite liest neu und merged erneut. (Pipeline-Updates
+        # bräuchten Mongo ≥ 4.2, docker-compose läuft mit 4.0.)
+        current = game.get(field)
+        merged = [a for a in current or [] if a.get("questionId") not in qids] + answers
+        g = db.games.find_one_and_update(
+            {"_id": obj, field: current},
+            {"$set": {field: merged}},
+            projection=_COUNTS,
+            return_document=ReturnDocument.AFTER,
+        )
+        if g is not None:
+            break
+    else:
+        raise AnswerError("concurrent update, please retry", 409)
+
+    total_q = len(g.get("questions") or [])
+    host_cnt = len(g.get("hostAnswers") or [])
+    friend_cnt = len(g.get("friendAnswers") or [])
+    finished = bool(g.get("finished"))
+
+    if not finished and host_cnt >= total_q and friend_cnt >= total_q:
+        def _cnt_ok(arr): return sum(1 for a in arr if a.get("isCorrect"))
+        res = db.games.update_one({"_id": obj, "finished": {"$ne": True}}, {"$set": {
+            "finished": True,
+            "finishedAt": _now(),
+            "hostCorrect": _cnt_ok(g["hostAnswers"]),
+            "friendCorrect": _cnt_ok(g["friendAnswers"]),
+            "hostSeenResult": False,
+            "friendSeenResult": False,
+            "hostAnswered": host_cnt,
+            "friendAnswered": friend_cnt,
+            "totalQuestions": total_q,
+        }})
+        finished = True
+        if res.modified_count:
+            log.info("🏁 game %s finished", gid)
+
+    result = {"gameId": gid, "hostAnswered": host_cnt, "friendAnswered": friend_cnt,
+              "totalQuestions": total_q, "finished": finished}
+    _notify_opponent(g, user, result)
+    return result
+
+
+def _notify_opponent(game: dict, user: str, result: dict) -> None:
+    host = game["hostName"].lower()
+    other = game["friendName"].lower() if user == host else host
+    answered = result["hostAnswered"] if user == host else result["friendAnswered"]
+    progress = {"gameId": result["gameId"], "answered": answered, "from": user}
+    unseen_open = _open_games_with_badge(other)[1]
+    _emit("notification", {"openGames": unseen_open, "progressUpdate": progress}, room=other)
+    _emit("game_progress", {"gameId": result["gameId"], "answered": answered}, room=other)
@@ -0,0 +1,162 @@
+# app/indexes.py
+"""
+Alle Indizes und Sonder-Collections an EINER Stelle.
+
+Früher lief das in record_once-Hooks der Blueprints – synchron bei jedem
+App-Start, noch bevor ein Request bedient wurde. Jetzt:
+
+- STARTUP_INDEXES=background (Default): einmal als Hintergrund-Task nach
+  dem Start; der Server nimmt sofort Requests an.
+- STARTUP_INDEXES=sync: blockierend im Start (z.B. für Tests/CI).
+- STARTUP_INDEXES=off: gar nicht – dann explizit im Deploy-Schritt:
+
+      flask --app run ensure-indexes
+
+Alle Schritte sind idempotent.
+"""
+import logging
+import os
+import time
+
+import click
+import pymongo
+from pymongo.database import Database
+
+from . import chat, columnar, duels, feedback_stats, revocation, slowlog
+from .metrics import STARTUP_PHASE_SECONDS
+
+log = logging.getLogger(__name__)
+
+MODES = ("background", "sync", "off")
+
+
+def _users(db: Database) -> None:
+    users = db["users"]
+
+    # --- users.username: sicherstellen, dass es ein UNIQUE-Index ist ---
+    desired_name = "username_asc"  # benutze den existierenden Namen, um Konflikte zu vermeiden
+    desired_keys = [("username", pymongo.ASCENDING)]
+
+    username_idx = None
+    for idx in users.list_indexes():
+        if list(idx.get("key", {}).items()) == desired_keys:
+            username_idx = idx
+            break
+
+    if username_idx and not username_idx.get("unique", False):
+        users.drop_index(username_idx["name"])
+        log.info("🗑️  dropped non-unique index on users.username (%s)", username_idx["name"])
+    if not username_idx or not username_idx.get("unique", False):
+        users.create_index(desired_keys, name=desired_name, unique=True)
+        log.info("🗄️  created UNIQUE index users.username (%s)", desired_name)
+
+    # Social-Subs (optional, sparse+unique => mehrere fehlende Werte erlaubt)
+    users.create_index("googleSub", unique=True, sparse=True, name="googleSub_1")
+    users.create_index("appleSub", unique=True, sparse=True, name="appleSub_1")
+
+
+def _friend_requests(db: Database) -> None:
+    fr = db["friend_requests"]
+    fr.create_index(
+        [("requester", pymongo.ASCENDING), ("target", pymongo.ASCENDING)],
+        name="friend_requests_unique_pair",
+        unique=True,
+    )
+    fr.create_index([("target", pymongo.ASCENDING)], name="friend_requests_target_asc")
+    fr.create_index([("createdAt", pymongo.DESCENDING)], name="friend_requests_created_desc")
+
+
+def _feedback(db: Database) -> None:
+    fb = db["feedback"]
+    # Keyset-Pagination: Sortierung (createdAt, _id) absteigend, je Filterkombination
+    desc = [("createdAt", pymongo.DESCENDING), ("_id", pymongo.DESCENDING)]
+    fb.create_index(desc, name="createdAt_id_desc")
+    fb.create_index([("resolved", pymongo.ASCENDING)] + desc, name="resolved_createdAt_id")
+    fb.create_index([("questionId", pymongo.ASCENDING)] + desc, name="questionId_createdAt_id")
+    fb.create_index([("resolved", pymongo.ASCENDING), ("questionId", pymongo.ASCENDING)] + desc,
+                    name="resolved_questionId_createdAt_id")
+    # Idempotenz für /feedback/batch – nur Dokumente mit clientId
+    fb.create_index(
+        [("clientId", pymongo.ASCENDING)],
+        name="clientId_unique",
+        unique=True,
+        partialFilterExpression={"clientId": {"$exists": True}},
+    )
+    # Volltextsuche (?q=): deutsches Stemming, Treffer im Feedback-Text zählen mehr
+    fb.create_index(
+        [("feedback", pymongo.TEXT), ("questionText", pymongo.TEXT)],
+        name="feedback_text",
+        default_language="german",
+        language_override="textLanguage",   # "language" könnte in Client-Daten auftauchen
+        weights={"feedback": 3, "questionText": 1},
+    )
+    # von den Compound-Indizes abgedeckt
+    existing = {idx["name"] for idx in fb.list_indexes()}
+    for old in ("createdAt_desc", "questionId_asc", "resolved_asc"):
+        if old in existing:
+            fb.drop_index(old)
+            log.info("🗑️  dropped superseded index feedback.%s", old)
+
+
+# Reihenfolge = Ausführungsreihenfolge; Name taucht im Log auf
+STEPS = [
+    ("users", _users),
+    ("friend_requests", _friend_requests),
+    ("feedback", _feedback),
+    ("feedback_aggregates", feedback_stats.ensure),
+    ("chat", chat.ensure_indexes),
+    ("duels", duels.ensure_indexes),
+    ("columnar_export", columnar.ensure_indexes),
+    ("token_blocklist", revocation.ensure_indexes),
+    ("slow_queries", slowlog.ensure_collection),
+]
+
+
+def ensure_all(db: Database) -> dict[str, float]:
+    """Führt alle Schritte aus; ein fehlgeschlagener Schritt stoppt die anderen nicht."""
+    timings = {}
+    t_all = time.perf_counter()
+    for name, fn in STEPS:
+        t0 = time.perf_counter()
+        try:
+            fn(db)
+        except Exception as e:
+            log.warning("⚠️ Index-Schritt %s fehlgeschlagen: %s", name, e)
+        timings[name] = round((time.perf_counter() - t0) * 1000, 1)
+    total = time.perf_counter() - t_all
+    STARTUP_PHASE_SECONDS.labels(phase="indexes").set(total)
+    log.info("🗄️  indexes ensured in %.0f ms", total * 1000, extra={"index_steps_ms": timings})
+    return timings
+
+
+def mode() -> str:
+    m = os.environ.get("STARTUP_INDEXES", "background").strip().lower()
+    return m if m in MODES else "background"
+
+
+def start(app, socketio) -> None:
+    """Index-Pflege gemäß STARTUP_INDEXES anstoßen."""
+    m = mode()
+    if m == "off":
+        log.info("🗄️  STARTUP_INDEXES=off – Indizes per 'flask ensure-indexes' anlegen")
+        return
+
+    def _run():
+        try:
+            ensure_all(app.config["MONGO_CLIENT"].get_default_database())
+        except Exception as e:
+            log.warning("⚠️ Index-Pflege fehlgeschlagen: %s", e)
+
+    if m == "sync":
+        _run()
+    else:
+        socketio.start_background_task(_run)
+
+
+def register_cli(app) -> None:
+    @app.cli.command("ensure-indexes")
+    def ensure_indexes_cmd():
+        """Legt alle Indizes und Sonder-Collections an (idempotent)."""
+        timings = ensure_all(app.config["MONGO_CLIENT"].get_default_database())
+        for name, ms in timings.items():
+            click.echo(f"{name:<18}{ms:>8.1f} ms")
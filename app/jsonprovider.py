@@ -0,0 +1,110 @@
+# app/jsonprovider.py
+"""
+Schneller JSON-Provider für Flask-Responses und Socket.IO-Payloads.
+
+- orjson, falls installiert (optional), sonst die Standardbibliothek
+- ObjectId → str, datetime → ISO-8601 (naive Werte aus Mongo gelten als UTC),
+  Decimal128 → str, BSON-Timestamp → Sekunden, Binary/bytes → Base64,
+  DBRef → {"$ref", "$id"}, Regex → Pattern
+
+    app.json = FastJSONProvider(app)
+    socketio.init_app(app, json=SocketJSON)
+"""
+import base64
+import datetime as dt
+import json
+import uuid
+from decimal import Decimal
+
+from bson import DBRef, Decimal128, ObjectId, Regex, Timestamp
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # optional
+    orjson = None
+
+_ORJSON_OPTS = (orjson.OPT_NAIVE_UTC | orjson.OPT_NON_STR_KEYS) if orjson else 0
+
+
+def _bson_default(o):
+    """Typen, die weder orjson noch json kennen."""
+    if isinstance(o, ObjectId):
+        return str(o)
+    if isinstance(o, Decimal128):
+        return str(o.to_decimal())
+    if isinstance(o, Decimal):
+        return str(o)
+    if isinstance(o, Timestamp):
+        return o.time
+    if isinstance(o, (bytes, bytearray, memoryview)):   # inkl. bson.Binary
+        return base64.b64encode(bytes(o)).decode("ascii")
+    if isinstance(o, DBRef):
+        return {"$ref": o.collection, "$id": _bson_default(o.id) if isinstance(o.id, ObjectId) else o.id}
+    if isinstance(o, Regex):
+        return o.pattern
+    if isinstance(o, (set, frozenset)):
+        return list(o)
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+def _std_default(o):
+    """Fallback ohne orjson: zusätzlich datetime/date/UUID."""
+    if isinstance(o, dt.datetime):
+        if o.tzinfo is None:
+            o = o.replace(tzinfo=dt.timezone.utc)
+        return o.isoformat()
+    if isinstance(o, dt.date):
+        return o.isoformat()
+    if isinstance(o, uuid.UUID):
+        return str(o)
+    return _bson_default(o)
+
+
+def dumps_bytes(obj) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj, default=_bson_default, option=_ORJSON_OPTS)
+    return json.dumps(obj, default=_std_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def dumps(obj) -> str:
+    return dumps_bytes(obj).decode("utf-8")
+
+
+def loads(s):
+    return orjson.loads(s) if orjson is not None else json.loads(s)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    Flask-JSON-Provider auf orjson-Basis. Aufrufe mit Sonder-kwargs
+    (indent, sort_keys, …) gehen an den Standard-Provider.
+    """
+
+    def dumps(self, obj, **kwargs) -> str:
+        if kwargs:
+            kwargs.setdefault("default", _std_default)
+            return super().dumps(obj, **kwargs)
+        return dumps(obj)
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return loads(s)
+
+    def response(self, *args, **kwargs):
+        # bytes direkt in die Response – kein Umweg über str
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps_bytes(obj) + b"\n", mimetype=self.mimetype)
+
+
+class SocketJSON:
+    """json-Modul-Ersatz für python-socketio (ruft dumps(data, separators=...))."""
+
+    @staticmethod
+    def dumps(obj, *args, **kwargs) -> str:
+        return dumps(obj)
+
+    @staticmethod
+    def loads(s, *args, **kwargs):
+        return loads(s)
@@ -0,0 +1,88 @@
+# app/jwtctx.py
+"""
+Per-Request JWT-Kontext: das Token wird höchstens EINMAL pro Request
+dekodiert und verifiziert (Signatur, Ablauf, Blocklist). Logging-Hook,
+@jwt_required und Debug-Helper lesen alle aus demselben Ergebnis in `g`.
+
+Typprüfung (access/refresh) erfolgt erst im Decorator – die eigentliche
+Verifikation ist typunabhängig und kann deshalb geteilt werden.
+"""
+from functools import wraps
+from typing import Optional
+
+from flask import current_app, g, request
+from flask_jwt_extended import verify_jwt_in_request
+from flask_jwt_extended.exceptions import NoAuthorizationError, WrongTokenError
+
+# Endpunkte ohne jede JWT-Arbeit (Probes, Scraper, Browser)
+SKIP_PATHS = frozenset({"/metrics", "/health", "/ready", "/favicon.ico"})
+
+_UNSET = object()
+
+
+def _verify_once():
+    """
+    Verifiziert das Token beim ersten Aufruf und merkt sich das Ergebnis.
+    Rückgabe: None (ok oder kein Verify nötig) bzw. die aufgetretene Exception.
+    """
+    state = g.get("_jwtctx_error", _UNSET)
+    if state is not _UNSET:
+        return state
+
+    err = None
+    try:
+        verify_jwt_in_request(verify_type=False)
+    except NoAuthorizationError as e:
+        # wie optional=True in flask_jwt_extended: leerer Kontext
+        g._jwt_extended_jwt = {}
+        g._jwt_extended_jwt_header = {}
+        g._jwt_extended_jwt_user = {"loaded_user": None}
+        g._jwt_extended_jwt_location = None
+        err = e
+    except Exception as e:
+        # ungültig / abgelaufen / widerrufen → erst im Decorator werfen
+        err = e
+    g._jwtctx_error = err
+    return err
+
+
+def current_claims() -> Optional[dict]:
+    """Verifizierte Claims dieses Requests oder None (kein/ungültiges Token)."""
+    if request.path in SKIP_PATHS:
+        return None
+    if _verify_once() is not None:
+        return None
+    return g.get("_jwt_extended_jwt") or None
+
+
+def verify_error() -> Optional[Exception]:
+    """Grund, warum kein gültiges Token vorliegt (None = ok)."""
+    if request.path in SKIP_PATHS:
+        return None
+    return _verify_once()
+
+
+def jwt_required(optional: bool = False, refresh: bool = False):
+    """
+    Drop-in für flask_jwt_extended.jwt_required, nutzt aber den geteilten
+    Request-Kontext statt erneut zu dekodieren. Fehler werden unverändert
+    geworfen und landen bei den JWT-Fehlerhandlern in app/__init__.py.
+    """
+    def wrapper(fn):
+        @wraps(fn)
+        def decorator(*args, **kwargs):
+            err = _verify_once()
+            if err is not None and not (optional and isinstance(err, NoAuthorizationError)):
+                raise err
+
+            data = g.get("_jwt_extended_jwt") or {}
+            if data:
+                if refresh and data.get("type") != "refresh":
+                    raise WrongTokenError("Only refresh tokens are allowed")
+                if not refresh and data.get("type") == "refresh":
+                    raise WrongTokenError("Only non-refresh tokens are allowed")
+            return current_app.ensure_sync(fn)(*args, **kwargs)
+
+        return decorator
+
+    return wrapper
@@ -0,0 +1,156 @@
+# app/logpipe.py
+"""
+Asynchrone Log-Pipeline.
+
+Der Hub legt Log-Records nur noch in eine begrenzte Queue; ein nativer
+OS-Thread formatiert sie (JSON-Lines) und schreibt sie nach stdout und in
+die Rotationsdatei. Datei-I/O blockiert damit nie den eventlet-Hub.
+
+Überlast: ab LOG_QUEUE_HIGH_WATER (Anteil der Queue) werden Records unter
+WARNING verworfen, bei voller Queue alle. Verworfenes wird in
+log_records_dropped_total gezählt und regelmäßig als WARNING gemeldet –
+niemals wartet ein Request auf den Logger.
+
+Queue und Thread kommen aus den ORIGINAL-Modulen (nicht monkey-gepatcht),
+sonst würde der Writer selbst wieder im Hub laufen.
+"""
+import atexit
+import json
+import logging
+import os
+import random
+import time
+
+from eventlet import patcher
+
+from .metrics import LOG_RECORDS_DROPPED_TOTAL, LOG_QUEUE_DEPTH
+
+_queue = patcher.original("queue")
+_threading = patcher.original("threading")
+
+# Attribute, die jeder LogRecord hat – alles andere sind "extra"-Felder
+_STD_ATTRS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """Ein JSON-Objekt pro Zeile; extra={...}-Felder landen auf oberster Ebene."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        out = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S") + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "src": f"{record.filename}:{record.lineno}",
+            "msg": record.getMessage(),
+        }
+        for k, v in record.__dict__.items():
+            if k not in _STD_ATTRS and not k.startswith("_"):
+                out[k] = v
+        if record.exc_text:
+            out["exc"] = record.exc_text
+        return json.dumps(out, ensure_ascii=False, default=str)
+
+
+class AsyncLogHandler(logging.Handler):
+    """Nimmt Records im Hub entgegen und reicht sie an den Writer-Thread."""
+
+    def __init__(self, sinks: list[logging.Handler], maxsize: int = 10_000,
+                 high_water: float = 0.8, report_every: float = 10.0):
+        super().__init__()
+        # eigener nativer Lock – der Handler wird aus dem Hub UND dem Writer benutzt
+        self.lock = _threading.RLock()
+        self.sinks = sinks
+        for s in sinks:
+            s.lock = _threading.RLock()
+        self.queue = _queue.Queue(maxsize)
+        self.soft_limit = int(maxsize * high_water)
+        self.report_every = report_every
+        self.dropped = 0
+        self._reported = 0
+        self._stop = object()
+        self._thread = _threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            if record.levelno < logging.WARNING and self.queue.qsize() >= self.soft_limit:
+                self._drop(record)
+                return
+            # Args/Exceptions jetzt einfrieren – danach gehört der Record dem Writer
+            record.msg = record.getMessage()
+            record.args = None
+            if record.exc_info:
+                record.exc_text = logging.Formatter().formatException(record.exc_info)
+                record.exc_info = None
+            self.queue.put_nowait(record)
+        except _queue.Full:
+            self._drop(record)
+        except Exception:
+            self.handleError(record)
+
+    def _drop(self, record: logging.LogRecord) -> None:
+        self.dropped += 1
+        LOG_RECORDS_DROPPED_TOTAL.labels(level=record.levelname).inc()
+
+    def _run(self) -> None:
+        last_report = time.monotonic()
+        while True:
+            try:
+                record = self.queue.get(timeout=self.report_every)
+            except _queue.Empty:
+                record = None
+            if record is self._stop:
+                break
+            if record is not None:
+                LOG_QUEUE_DEPTH.set(self.queue.qsize())
+                self._write(record)
+
+            now = time.monotonic()
+            if now - last_report >= self.report_every and self.dropped != self._reported:
+                n, self._reported = self.dropped - self._reported, self.dropped
+                self._write(logging.LogRecord(
+                    "logpipe", logging.WARNING, __file__, 0,
+                    "⚠️ Log-Pipeline überlastet: %d Records verworfen (gesamt %d)",
+                    (n, self.dropped), None,
+                ))
+                last_report = now
+
+    def _write(self, record: logging.LogRecord) -> None:
+        for s in self.sinks:
+            if record.levelno >= s.level:
+                s.handle(record)
+
+    def close(self) -> None:
+        if self._thread.is_alive():
+            try:
+                self.queue.put(self._stop, timeout=1)
+            except _queue.Full:
+                pass
+            self._thread.join(timeout=2)
+        for s in self.sinks:
+            s.flush()
+        super().close()
+
+
+# ───────── Request-Sampling ──────────────────────────────────────
+
+def parse_sample_rates(spec: str) -> dict[str, float]:
+    """'default=1,/health=0,/games/<gid>=0.1' → {route: rate}"""
+    rates = {"default": 1.0}
+    for part in (spec or "").split(","):
+        route, sep, val = part.strip().rpartition("=")
+        if sep and route:
+            rates[route] = max(0.0, min(1.0, float(val)))
+    return rates
+
+
+_sample_rates = parse_sample_rates(os.environ.get("LOG_SAMPLE_RATES", ""))
+
+
+def should_log(route: str, status: int) -> bool:
+    """Fehler (≥400) immer, sonst gemäß LOG_SAMPLE_RATES pro Route-Template."""
+    if status >= 400:
+        return True
+    rate = _sample_rates.get(route, _sample_rates["default"])
+    return rate >= 1.0 or (rate > 0.0 and random.random() < rate)
@@ -1,46 +1,221 @@
 import time
 
-from flask import request, Response
-from prometheus_client import Counter, Histogram, generate_latest, CONTENT_TYPE_LATEST
+from flask import g, has_request_context, request, Response
+from prometheus_client import Counter, Gauge, Histogram, generate_latest, CONTENT_TYPE_LATEST
 
 
 # Zähler für alle HTTP-Requests
+# "path" ist das Route-Template (/games/<gid>), nicht der rohe Pfad –
+# sonst erzeugt jede ID eine neue Zeitreihe.
 HTTP_REQUESTS_TOTAL = Counter(
     "http_requests_total",
     "Anzahl der HTTP Requests",
     ["method", "path", "status"],
 )
 
-# Latenz in Sekunden pro Pfad
+# Latenz in Sekunden pro Route-Template
 HTTP_REQUEST_DURATION_SECONDS = Histogram(
     "http_request_duration_seconds",
     "Dauer der HTTP Requests in Sekunden",
     ["path"],
 )
 
+# MongoDB-Kommandos (siehe app/mongo_monitor.py)
+MONGO_COMMAND_DURATION_SECONDS = Histogram(
+    "mongo_command_duration_seconds",
+    "Dauer der MongoDB-Kommandos",
+    ["command", "collection", "route"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+
+MONGO_DOCS_RETURNED_TOTAL = Counter(
+    "mongo_docs_returned_total",
+    "Von MongoDB gelieferte Dokumente (Cursor-Batches)",
+    ["command", "collection", "route"],
+)
+
+MONGO_COMMAND_ERRORS_TOTAL = Counter(
+    "mongo_command_errors_total",
+    "Fehlgeschlagene MongoDB-Kommandos",
+    ["command", "collection", "route"],
+)
+
+# Socket.IO (siehe app/sockets.py)
+SOCKET_CONNECTED = Gauge(
+    "socketio_connected_sockets",
+    "Aktuell verbundene Sockets",
+)
+
+SOCKET_USERS = Gauge(
+    "socketio_mapped_users",
+    "User mit mindestens einem zugeordneten Socket",
+)
+
+SOCKET_EVENTS_TOTAL = Counter(
+    "socketio_events_received_total",
+    "Empfangene Socket.IO-Events",
+    ["event"],
+)
+
+SOCKET_HANDLER_SECONDS = Histogram(
+    "socketio_handler_duration_seconds",
+    "Laufzeit der Socket.IO-Handler",
+    ["event"],
+)
+
+SOCKET_EMITS_TOTAL = Counter(
+    "socketio_emits_total",
+    "Gesendete Socket.IO-Events",
+    ["event"],
+)
+
+SOCKET_EMIT_FANOUT = Histogram(
+    "socketio_emit_fanout",
+    "Anzahl Empfänger-Sockets pro Emit",
+    ["event"],
+    buckets=(0, 1, 2, 3, 5, 10, 25, 50, 100, 250, 1000),
+)
+
+# Passwort-Hashing im nativen Thread-Pool (siehe app/pwpool.py)
+PW_HASH_QUEUE_DEPTH = Gauge(
+    "pw_hash_queue_depth",
+    "Anzahl der Hash-Jobs, die auf einen freien Pool-Slot warten",
+)
+
+PW_HASH_WAIT_SECONDS = Histogram(
+    "pw_hash_wait_seconds",
+    "Wartezeit der Hash-Jobs bis zum freien Pool-Slot",
+    ["op"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+
+PW_HASH_DURATION_SECONDS = Histogram(
+    "pw_hash_duration_seconds",
+    "Rechenzeit der Hash-Jobs im Pool",
+    ["op"],
+)
+
+# Vom Rate-Limiter abgewiesene Requests (siehe app/ratelimit.py)
+THROTTLED_TOTAL = Counter(
+    "throttled_requests_total",
+    "Anzahl der mit 429 abgewiesenen Requests",
+    ["endpoint", "scope"],
+)
+
+# Asynchrone Log-Pipeline (siehe app/logpipe.py)
+LOG_RECORDS_DROPPED_TOTAL = Counter(
+    "log_records_dropped_total",
+    "Wegen Überlast verworfene Log-Records",
+    ["level"],
+)
+
+LOG_QUEUE_DEPTH = Gauge(
+    "log_queue_depth",
+    "Log-Records, die auf den Writer-Thread warten",
+)
+
+# Widerrufene, noch nicht abgelaufene Tokens im Speicher dieses Workers
+JWT_BLOCKLIST_SIZE = Gauge(
+    "jwt_blocklist_size",
+    "Anzahl widerrufener JWTs im lokalen Filter",
+)
+
+
+# Langsame Mongo-Kommandos über SLOW_QUERY_MS (siehe app/slowlog.py)
+SLOW_QUERIES_TOTAL = Counter(
+    "mongo_slow_queries_total",
+    "MongoDB-Kommandos über der Slow-Query-Schwelle",
+    ["command", "collection", "route"],
+)
+
+
+# Dauer der Startphasen (siehe app/startup.py, app/indexes.py)
+STARTUP_PHASE_SECONDS = Gauge(
+    "startup_phase_seconds",
+    "Dauer der einzelnen Startphasen in Sekunden",
+    ["phase"],
+)
+
+
+# Connection-Pool und Readiness (siehe app/mongo_monitor.py, app/readiness.py)
+# "client" = Workload des MongoClients (default / analytics)
+MONGO_POOL_CHECKED_OUT = Gauge(
+    "mongo_pool_checked_out",
+    "Ausgeliehene Mongo-Verbindungen (alle Server)",
+    ["client"],
+)
+
+MONGO_POOL_WAITING = Gauge(
+    "mongo_pool_waiting",
+    "Greenlets, die auf eine freie Mongo-Verbindung warten",
+    ["client"],
+)
+
+MONGO_POOL_WAIT_SECONDS = Histogram(
+    "mongo_pool_wait_seconds",
+    "Wartezeit auf eine Verbindung aus dem Pool",
+    ["client", "outcome"],
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+
+HUB_LAG_SECONDS = Gauge(
+    "eventlet_hub_lag_seconds",
+    "Maximale Verspätung eines Timers im eventlet-Hub (letztes Intervall)",
+)
+
+READY = Gauge(
+    "ready",
+    "1 wenn /ready 200 liefert, sonst 0",
+)
+
+# Live-Duelle (siehe app/duels.py)
+DUELS_ACTIVE = Gauge(
+    "duels_active",
+    "Laufende Duelle im Speicher dieses Workers",
+)
+
+DUEL_FLUSH_OPS = Histogram(
+    "duel_flush_ops",
+    "Mongo-Updates pro gebündeltem Duell-Checkpoint",
+    buckets=(1, 5, 10, 50, 100, 500, 1000, 5000),
+)
+
+
+def route_template() -> str:
+    """
+    Label für die aktuelle Arbeitseinheit: Route-Template im Request,
+    g.metrics_route falls gesetzt (z.B. Socket-Events), sonst "<background>".
+    """
+    if not has_request_context():
+        return "<background>"
+    override = g.get("metrics_route")
+    if override:
+        return override
+    rule = request.url_rule
+    return rule.rule if rule is not None else "<unmatched>"
+
 
 def init_metrics(app):
     """
     Initialisiert Prometheus-Metriken:
     - misst Dauer jedes Requests
-    - zählt Requests nach Methode / Pfad / Statuscode
+    - zählt Requests nach Methode / Route-Template / Statuscode
     - stellt /metrics-Endpoint zur Verfügung
     """
 
     @app.before_request
     def _start_timer():
-        request._metrics_start_time = time.time()
+        request._metrics_start_time = time.perf_counter()
 
     @app.after_request
     def _record_metrics(response):
         try:
+            path = route_template()
             start = getattr(request, "_metrics_start_time", None)
             if start is not None:
-                duration = time.time() - start
-                path = request.path or "unknown"
+                duration = time.perf_counter() - start
                 HTTP_REQUEST_DURATION_SECONDS.labels(path=path).observe(duration)
 
-            path = request.path or "unknown"
             status = response.status_code
             method = request.method
             HTTP_REQUESTS_TOTAL.labels(
@@ -2,8 +2,8 @@
 # -*- coding: utf-8 -*-
 """
 User-/Auth-Model-Helfer für pymongo.
-- Argon2id Hashing
-- Idempotente Index-Erstellung
+- Hashing & Login laufen über app.credentials (Argon2id, username/passwordHash)
+- Indizes: app/indexes.py
 - Reine pymongo-Signaturen (db: Database)
 """
 
@@ -12,36 +12,19 @@ import logging
 import datetime as dt
 from typing import Optional
 
-from pymongo import ASCENDING
 from pymongo.collection import Collection
 from pymongo.database import Database
-from argon2 import PasswordHasher
-from argon2.exceptions import VerifyMismatchError
-from argon2.low_level import Type
 
-log = logging.getLogger(__name__)
+from . import credentials
 
-# Argon2id ist eine gute Wahl
-ph = PasswordHasher(type=Type.ID)
+log = logging.getLogger(__name__)
 
 
-# ───────── Intern: Collections + Indizes ─────────────────────────
+# ───────── Intern: Collections ───────────────────────────────────
 
 def _users(db: Database) -> Collection:
-    """
-    Gibt die User-Collection zurück und stellt sicher, dass
-    notwendige Indizes existieren (idempotent).
-    """
-    col = db["users"]
-    try:
-        # schneller Login über name
-        col.create_index([("name", ASCENDING)], unique=True, name="name_1")
-        # Social-Subs (optional, sparse+unique => mehrere fehlende Werte erlaubt)
-        col.create_index("googleSub", unique=True, sparse=True, name="googleSub_1")
-        col.create_index("appleSub", unique=True, sparse=True, name="appleSub_1")
-    except Exception as e:
-        log.warning("Index-Erstellung users fehlgeschlagen: %s", e)
-    return col
+    """Gibt die User-Collection zurück (Indizes: app/indexes.py)."""
+    return db["users"]
 
 
 # ───────── Public API ─────────────────────────────────────────────
@@ -50,7 +33,8 @@ def ensure_user_indexes(db: Database) -> None:
     """
     Kann beim App-Start aufgerufen werden, um Indizes sicherzustellen.
     """
-    _ = _users(db)  # löst create_index() aus
+    from .indexes import _users as ensure
+    ensure(db)
 
 
 def utcnow_iso() -> str:
@@ -67,90 +51,51 @@ def create_user(
     apple_sub: Optional[str] = None,
 ) -> dict:
     """
-    Erstellt einen neuen User.
-    - name wird lower+trim gespeichert (unique)
-    - Passwort wird mit Argon2id gehasht, falls angegeben
+    Erstellt einen neuen User über app.credentials.
+    - username wird lower+trim gespeichert (unique)
     - googleSub / appleSub werden nur gesetzt, wenn nicht None
-    Gibt das gespeicherte Dokument ohne pwHash zurück.
+    Gibt das gespeicherte Dokument ohne passwordHash zurück.
     """
     if not name:
         raise ValueError("Username is required")
 
-    doc = {
-        "name": name.lower().strip(),
-        "email": email,
-        "fcmTokens": [],  # optional für Push
-        "created": utcnow_iso(),
-    }
-
-    if password:
-        doc["pwHash"] = ph.hash(password)
-    else:
-        doc["pwHash"] = None
-
+    extra = {"fcmTokens": []}  # optional für Push
     if google_sub is not None:
-        doc["googleSub"] = google_sub
+        extra["googleSub"] = google_sub
     if apple_sub is not None:
-        doc["appleSub"] = apple_sub
-
-    res = _users(db).insert_one(doc)
-    doc["_id"] = res.inserted_id
+        extra["appleSub"] = apple_sub
 
-    # sensible Felder nicht rausgeben
-    doc.pop("pwHash", None)
+    doc = credentials.create_user(db, name, password, email=email, **extra)
+    if doc is None:
+        raise ValueError("Username already exists")
     return doc
 
 
 def verify_password(db: Database, name: str, password: str) -> bool:
     """
-    Prüft Klartext-Passwort gegen gespeicherten Argon2id-Hash.
+    Prüft Klartext-Passwort (inkl. transparentem Rehash von Altbeständen).
     Gibt False zurück, wenn User fehlt oder kein Hash gesetzt ist.
     """
-    if not name or not password:
-        return False
-
-    user = _users(db).find_one({"name": name.lower().strip()})
-    if not user or not user.get("pwHash"):
-        return False
-
-    try:
-        ph.verify(user["pwHash"], password)
-        # Optional: Rehash falls Parameter geändert wurden:
-        # if ph.check_needs_rehash(user["pwHash"]):
-        #     _users(db).update_one({"_id": user["_id"]}, {"$set": {"pwHash": ph.hash(password)}})
-        return True
-    except VerifyMismatchError:
-        return False
-    except Exception as e:
-        log.error("Fehler beim Verifizieren von %s: %s", name, e)
-        return False
+    return credentials.verify_login(db, name, password) is not None
 
 
 def get_user_by_sub(db: Database, provider: str, sub: str) -> Optional[dict]:
     """
     Liefert User anhand Social-Login-Sub (google / apple).
-    Entfernt pwHash vor Rückgabe.
+    Entfernt passwordHash vor Rückgabe.
     """
     if not provider or not sub:
         return None
     field = "googleSub" if provider.lower() == "google" else "appleSub"
-    user = _users(db).find_one({field: sub})
-    if user:
-        user.pop("pwHash", None)
-    return user
+    return credentials.public_user(_users(db).find_one({field: sub}))
 
 
 def find_user_by_name(db: Database, name: str) -> Optional[dict]:
     """
     Liefert User anhand des Namens (case-insensitive).
-    Entfernt pwHash vor Rückgabe.
+    Entfernt passwordHash vor Rückgabe.
     """
-    if not name:
-        return None
-    user = _users(db).find_one({"name": name.lower().strip()})
-    if user:
-        user.pop("pwHash", None)
-    return user
+    return credentials.public_user(credentials.find_user(db, name))
 
 
 def add_fcm_token(db: Database, username: str, token: str) -> None:
@@ -160,7 +105,7 @@ def add_fcm_token(db: Database, username: str, token: str) -> None:
     if not username or not token:
         return
     _users(db).update_one(
-        {"name": username.lower().strip()},
+        {"username": credentials.normalize_username(username)},
         {"$addToSet": {"fcmTokens": token}},
     )
 
@@ -172,6 +117,6 @@ def remove_fcm_token(db: Database, username: str, token: str) -> None:
     if not username or not token:
         return
     _users(db).update_one(
-        {"name": username.lower().strip()},
+        {"username": credentials.normalize_username(username)},
         {"$pull": {"fcmTokens": token}},
     )
@@ -0,0 +1,149 @@
+# app/mongo_monitor.py
+"""
+pymongo-Command- und Pool-Monitoring → Prometheus.
+
+Pro Kommando: Latenz-Histogramm, gelieferte Dokumente und Fehler, jeweils
+nach command / collection / route. pymongo ruft die Listener synchron im
+aufrufenden Greenlet auf – die Route des laufenden Requests ist also
+direkt verfügbar (metrics.route_template).
+"""
+import logging
+
+from pymongo import monitoring
+
+from .metrics import (
+    MONGO_COMMAND_DURATION_SECONDS,
+    MONGO_DOCS_RETURNED_TOTAL,
+    MONGO_COMMAND_ERRORS_TOTAL,
+    MONGO_POOL_CHECKED_OUT,
+    MONGO_POOL_WAITING,
+    MONGO_POOL_WAIT_SECONDS,
+    route_template,
+)
+
+log = logging.getLogger(__name__)
+
+
+def command_collection(command_name: str, command: dict) -> str:
+    """Ziel-Collection eines Kommandos ("-" für DB-weite Kommandos)."""
+    if command_name == "getMore":
+        return str(command.get("collection", "-"))
+    target = command.get(command_name)
+    return target if isinstance(target, str) else "-"
+
+
+def _docs_in_reply(reply: dict) -> int:
+    cursor = reply.get("cursor") if isinstance(reply, dict) else None
+    if not isinstance(cursor, dict):
+        return 0
+    batch = cursor.get("firstBatch", cursor.get("nextBatch"))
+    return len(batch) if batch else 0
+
+
+class CommandMetricsListener(monitoring.CommandListener):
+    """Merkt sich beim Start collection+route, misst beim Ende."""
+
+    def __init__(self):
+        self._pending: dict[tuple, tuple[str, str]] = {}
+
+    def started(self, event):
+        key = (event.connection_id, event.request_id)
+        self._pending[key] = (command_collection(event.command_name, event.command), route_template())
+
+    def succeeded(self, event):
+        coll, route = self._pending.pop((event.connection_id, event.request_id), ("-", "-"))
+        labels = (event.command_name, coll, route)
+        MONGO_COMMAND_DURATION_SECONDS.labels(*labels).observe(event.duration_micros / 1e6)
+        docs = _docs_in_reply(event.reply)
+        if docs:
+            MONGO_DOCS_RETURNED_TOTAL.labels(*labels).inc(docs)
+
+    def failed(self, event):
+        coll, route = self._pending.pop((event.connection_id, event.request_id), ("-", "-"))
+        labels = (event.command_name, coll, route)
+        MONGO_COMMAND_DURATION_SECONDS.labels(*labels).observe(event.duration_micros / 1e6)
+        MONGO_COMMAND_ERRORS_TOTAL.labels(*labels).inc()
+        log.debug("mongo %s auf %s fehlgeschlagen (%s): %s", *labels, event.failure)
+
+
+class PoolListener(monitoring.ConnectionPoolListener):
+    """
+    Zählt ausgeliehene und wartende Verbindungen pro Server-Adresse und
+    misst die Wartezeit beim Ausleihen. Sättigung = checked_out / maxPoolSize
+    des vollsten Pools. `name` ist das Metrik-Label (Workload des Clients).
+    """
+
+    def __init__(self, name: str = "default"):
+        self.name = name
+        self.max_size: dict = {}
+        self.checked_out: dict = {}
+        self.waiting: dict = {}
+
+    def _add(self, counter: dict, address, n: int) -> None:
+        counter[address] = max(0, counter.get(address, 0) + n)
+
+    def snapshot(self) -> dict:
+        sat = 0.0
+        for addr, used in self.checked_out.items():
+            size = self.max_size.get(addr) or 0
+            if size:
+                sat = max(sat, used / size)
+        return {
+            "checkedOut": sum(self.checked_out.values()),
+            "waiting": sum(self.waiting.values()),
+            "maxPoolSize": max(self.max_size.values(), default=0),
+            "saturation": round(sat, 3),
+        }
+
+    def _publish(self) -> None:
+        MONGO_POOL_CHECKED_OUT.labels(self.name).set(sum(self.checked_out.values()))
+        MONGO_POOL_WAITING.labels(self.name).set(sum(self.waiting.values()))
+
+    def _observe_wait(self, event, outcome: str) -> None:
+        # duration gibt es ab pymongo 4.7 (Zeit seit check_out_started)
+        took = getattr(event, "duration", None)
+        if took is not None:
+            MONGO_POOL_WAIT_SECONDS.labels(self.name, outcome).observe(took)
+
+    def pool_created(self, event):
+        # options enthält nur Nicht-Defaults; pymongo-Default ist 100
+        self.max_size[event.address] = event.options.get("maxPoolSize", 100)
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        for d in (self.max_size, self.checked_out, self.waiting):
+            d.pop(event.address, None)
+        self._publish()
+
+    def connection_created(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        pass
+
+    def connection_check_out_started(self, event):
+        self._add(self.waiting, event.address, 1)
+        self._publish()
+
+    def connection_check_out_failed(self, event):
+        self._add(self.waiting, event.address, -1)
+        self._publish()
+        self._observe_wait(event, "failed")
+
+    def connection_checked_out(self, event):
+        self._add(self.waiting, event.address, -1)
+        self._add(self.checked_out, event.address, 1)
+        self._publish()
+        self._observe_wait(event, "ok")
+
+    def connection_checked_in(self, event):
+        self._add(self.checked_out, event.address, -1)
+        self._publish()
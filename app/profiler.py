@@ -0,0 +1,156 @@
+# app/profiler.py
+"""
+Sampling-Profiler auf Abruf.
+
+Ein nativer Thread liest für N Sekunden mit `hz` Samples/s die Stacks aller
+OS-Threads (sys._current_frames). Der eventlet-Hub-Thread wird zusätzlich
+nach Route-Template und Greenlet aufgeschlüsselt:
+
+- Greenlet: greenlet.settrace merkt sich bei jedem Wechsel den aktiven
+  Greenlet – der Trace ist NUR während einer Messung installiert.
+- Route: Code-Objekte der View-Funktionen bzw. Socket-Handler werden vorab
+  auf ihr Route-Template abgebildet; der erste Treffer im Stack gewinnt.
+
+Ausgabe: "collapsed stacks" (route;greenlet;frame;...;frame count), lesbar
+von flamegraph.pl, speedscope, inferno usw.
+
+Ohne laufende Messung existieren weder Thread noch Hook – null Overhead.
+"""
+import inspect
+import os
+import sys
+from collections import Counter
+
+import greenlet
+from eventlet import patcher
+
+_threading = patcher.original("threading")
+_time = patcher.original("time")
+
+_lock = _threading.Lock()
+_current_greenlet = None
+
+
+class ProfilerBusy(Exception):
+    """Es läuft bereits eine Messung."""
+
+
+def _route_map(app, socketio) -> dict:
+    """Code-Objekt → Label, für Views und Socket-Handler."""
+    by_endpoint = {}
+    for rule in app.url_map.iter_rules():
+        by_endpoint.setdefault(rule.endpoint, rule.rule)
+
+    codes = {}
+    for endpoint, fn in app.view_functions.items():
+        code = getattr(inspect.unwrap(fn), "__code__", None)
+        if code is not None and endpoint in by_endpoint:
+            codes[code] = by_endpoint[endpoint]
+    for message, handler, _ns in getattr(socketio, "handlers", []):
+        code = getattr(inspect.unwrap(handler), "__code__", None)
+        if code is not None:
+            codes[code] = f"socket:{message}"
+    return codes
+
+
+def _frame_label(code) -> str:
+    parts = code.co_filename.replace("\\", "/").split("/")
+    return f"{code.co_name} ({'/'.join(parts[-2:])}:{code.co_firstlineno})"
+
+
+def _is_idle(frame) -> bool:
+    """Blockiert im Hub-Poll oder in einer Lock-/Queue-Wartestelle?"""
+    code = frame.f_code
+    fname = code.co_filename.replace("\\", "/")
+    return code.co_name in ("wait", "poll", "select") and (
+        "/eventlet/hubs/" in fname or fname.endswith("/threading.py")
+    )
+
+
+def _greenlet_label(gr, hub) -> str:
+    if gr is None:
+        return "<unknown>"
+    if gr is hub:
+        return "hub"
+    return f"{type(gr).__name__}-{id(gr):x}"
+
+
+def collapse(frame, codes: dict, who: str) -> str:
+    """Stack eines Threads → "route;wer;äußerster Frame;…;innerster Frame"."""
+    chain, route = [], None
+    f = frame
+    while f is not None:
+        chain.append(_frame_label(f.f_code))
+        if route is None:
+            route = codes.get(f.f_code)
+        f = f.f_back
+    chain.append(who)
+    chain.append(route or "<no-route>")
+    return ";".join(reversed(chain))
+
+
+def format_collapsed(stacks: Counter) -> str:
+    """Eine Zeile "stack anzahl" pro Stack, häufigste zuerst."""
+    return "".join(f"{stack} {n}\n" for stack, n in stacks.most_common())
+
+
+def _on_switch(event, args):
+    global _current_greenlet
+    if event in ("switch", "throw"):
+        _current_greenlet = args[1]
+
+
+def profile(app, socketio, seconds: float, hz: int = 100, include_idle: bool = False) -> str:
+    """
+    Misst `seconds` lang und liefert die Collapsed-Stacks als Text.
+    Blockiert nur den aufrufenden Greenlet (eventlet.sleep).
+    """
+    global _current_greenlet
+    if not _lock.acquire(blocking=False):
+        raise ProfilerBusy()
+    try:
+        import eventlet
+        from eventlet import hubs
+
+        codes = _route_map(app, socketio)
+        hub = hubs.get_hub().greenlet
+        main_tid = _threading.get_ident()
+        interval = 1.0 / max(1, hz)
+        stacks: Counter = Counter()
+        stop = _threading.Event()
+
+        def _sample():
+            me = _threading.get_ident()
+            while not stop.is_set():
+                names = {t.ident: t.name for t in _threading.enumerate()}
+                for tid, frame in sys._current_frames().items():
+                    if tid == me:
+                        continue
+                    if not include_idle and _is_idle(frame):
+                        continue
+                    if tid == main_tid:
+                        who = _greenlet_label(_current_greenlet, hub)
+                    else:
+                        who = f"thread:{names.get(tid, tid)}"
+                    stacks[collapse(frame, codes, who)] += 1
+                _time.sleep(interval)
+
+        _current_greenlet = greenlet.getcurrent()
+        prev_trace = greenlet.settrace(_on_switch)
+        sampler = _threading.Thread(target=_sample, name="profiler", daemon=True)
+        sampler.start()
+        try:
+            eventlet.sleep(seconds)
+        finally:
+            stop.set()
+            greenlet.settrace(prev_trace)
+            sampler.join(timeout=2)
+            _current_greenlet = None
+
+        return format_collapsed(stacks)
+    finally:
+        _lock.release()
+
+
+def max_seconds() -> float:
+    return float(os.environ.get("PROFILER_MAX_SECONDS", 60))
@@ -0,0 +1,75 @@
+# app/pwpool.py
+"""
+Passwort-Hashing außerhalb des eventlet-Hubs.
+
+PBKDF2/Argon2 sind reine CPU-Arbeit. Unter eventlet laufen alle Requests
+und Socket-Heartbeats in EINEM OS-Thread – ein Hash im Hub legt also den
+ganzen Worker lahm. Deshalb laufen Hash-Jobs im nativen Thread-Pool von
+eventlet (tpool). Eine Semaphore begrenzt die gleichzeitigen Jobs auf
+PW_HASH_WORKERS; wer warten muss, zählt zur Queue-Tiefe.
+
+Ohne Monkey-Patching (Tests, Skripte) wird direkt gerechnet.
+"""
+import os
+import threading
+import time
+
+from eventlet import patcher, tpool
+from eventlet.semaphore import Semaphore
+
+from .metrics import PW_HASH_QUEUE_DEPTH, PW_HASH_WAIT_SECONDS, PW_HASH_DURATION_SECONDS
+
+MAX_WORKERS = int(os.environ.get("PW_HASH_WORKERS", os.cpu_count() or 2))
+
+_slots = None
+
+
+def _offload() -> bool:
+    return patcher.is_monkey_patched("thread")
+
+
+def _get_slots():
+    # erst beim ersten Job anlegen – dann ist klar, ob eventlet aktiv ist
+    global _slots
+    if _slots is None:
+        _slots = Semaphore(MAX_WORKERS) if _offload() else threading.BoundedSemaphore(MAX_WORKERS)
+    return _slots
+
+
+def _timed_call(fn, args):
+    # läuft im Pool-Thread; Exceptions zurückgeben statt werfen,
+    # sonst druckt tpool für jeden Fehlversuch einen Traceback
+    t0 = time.perf_counter()
+    try:
+        return True, fn(*args), time.perf_counter() - t0
+    except Exception as e:
+        return False, e, time.perf_counter() - t0
+
+
+def run(op: str, fn, *args):
+    """
+    Führt fn(*args) begrenzt im nativen Pool aus und blockiert nur den
+    aufrufenden Greenlet. `op` ist das Metrik-Label (z.B. "hash", "verify").
+    """
+    slots = _get_slots()
+    t0 = time.perf_counter()
+    PW_HASH_QUEUE_DEPTH.inc()
+    slots.acquire()
+    try:
+        PW_HASH_QUEUE_DEPTH.dec()
+        PW_HASH_WAIT_SECONDS.labels(op=op).observe(time.perf_counter() - t0)
+        if _offload():
+            ok, value, took = tpool.execute(_timed_call, fn, args)
+        else:
+            ok, value, took = _timed_call(fn, args)
+        PW_HASH_DURATION_SECONDS.labels(op=op).observe(took)
+    finally:
+        slots.release()
+    if not ok:
+        raise value
+    return value
+
+
+def queue_depth() -> int:
+    """Aktuell wartende Hash-Jobs (für Health/Readiness)."""
+    return int(PW_HASH_QUEUE_DEPTH._value.get())
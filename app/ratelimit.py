@@ -0,0 +1,124 @@
+# app/ratelimit.py
+"""
+In-Process-Rate-Limiting mit Token-Buckets.
+
+Pro Key (IP, Username, ...) ein Bucket aus (tokens, zeitstempel) in einem
+OrderedDict. Die Größe ist begrenzt; bei Überlauf fliegt der am längsten
+unbenutzte Key raus (LRU). Ein verdrängter Key startet wieder mit vollem
+Bucket – bei max_keys ≫ aktiven Clients ist das unkritisch.
+
+Kein Lock nötig: unter eventlet läuft take() ohne Greenlet-Wechsel durch.
+"""
+import math
+import os
+import time
+from collections import OrderedDict
+from functools import wraps
+from typing import Callable, Optional
+
+from flask import jsonify, request
+from werkzeug.middleware.proxy_fix import ProxyFix
+
+from .metrics import THROTTLED_TOTAL
+
+
+def parse_rate(spec: str) -> tuple[float, float]:
+    """'10/60' → (Rate pro Sekunde, Burst) = (10/60, 10)."""
+    count, _, seconds = spec.partition("/")
+    burst = float(count)
+    return burst / float(seconds or 1), burst
+
+
+class TokenBucketLimiter:
+    def __init__(self, rate: float, burst: float, max_keys: int = 10_000,
+                 clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._clock = clock
+        self._buckets: "OrderedDict[str, tuple[float, float]]" = OrderedDict()
+
+    @classmethod
+    def from_spec(cls, spec: str, max_keys: int = 10_000) -> "TokenBucketLimiter":
+        rate, burst = parse_rate(spec)
+        return cls(rate, burst, max_keys)
+
+    def take(self, key: str, cost: float = 1.0) -> float:
+        """
+        Entnimmt `cost` Tokens. Rückgabe 0.0 = erlaubt, sonst Sekunden bis
+        genug Tokens nachgelaufen sind (der Bucket bleibt dann unverändert).
+        """
+        now = self._clock()
+        tokens, last = self._buckets.pop(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - last) * self.rate)
+
+        if tokens >= cost:
+            tokens -= cost
+            wait = 0.0
+        else:
+            wait = (cost - tokens) / self.rate if self.rate > 0 else math.inf
+
+        self._buckets[key] = (tokens, now)
+        if len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return wait
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+def init_proxy_fix(app) -> int:
+    """
+    Hinter einem Reverse-Proxy ist remote_addr die Adresse des Proxys – alle
+    Clients teilten sich einen IP-Bucket. PROXY_FIX_X_FOR=<n> (Anzahl
+    vertrauenswürdiger Proxys) übernimmt per ProxyFix den n-ten Eintrag von
+    rechts aus X-Forwarded-For; 0 (Default) lässt remote_addr unverändert,
+    damit Clients ohne Proxy die Adresse nicht fälschen können.
+    """
+    hops = int(os.environ.get("PROXY_FIX_X_FOR", 0))
+    if hops > 0:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=hops, x_proto=hops)
+    return hops
+
+
+def client_ip() -> str:
+    return request.remote_addr or "unknown"
+
+
+def charge(endpoint: str, limits: list[tuple[str, TokenBucketLimiter, Callable[[], Optional[str]]]],
+           cost: float = 1.0):
+    """
+    Bucht `cost` Tokens in allen (scope, limiter, key_fn). Liefert key_fn
+    None, wird der Scope übersprungen. Rückgabe None = erlaubt, sonst die
+    fertige 429-Response mit Retry-After (erster Treffer gewinnt).
+    """
+    for scope, limiter, key_fn in limits:
+        key = key_fn()
+        if not key:
+            continue
+        wait = limiter.take(key, cost)
+        if wait > 0:
+            THROTTLED_TOTAL.labels(endpoint=endpoint, scope=scope).inc()
+            retry = max(1, math.ceil(wait)) if math.isfinite(wait) else 3600
+            resp = jsonify(msg="too many requests", retryAfter=retry)
+            resp.status_code = 429
+            resp.headers["Retry-After"] = str(retry)
+            return resp
+    return None
+
+
+def throttle(endpoint: str, limits: list[tuple[str, TokenBucketLimiter, Callable[[], Optional[str]]]]):
+    """
+    Decorator: charge() mit Kosten 1, BEVOR der View läuft.
+    """
+    def wrapper(fn):
+        @wraps(fn)
+        def decorator(*args, **kwargs):
+            resp = charge(endpoint, limits)
+            if resp is not None:
+                return resp
+            return fn(*args, **kwargs)
+
+        return decorator
+
+    return wrapper
@@ -0,0 +1,143 @@
+# app/readiness.py
+"""
+Readiness für Orchestrator-Probes (/ready).
+
+Ein Hintergrund-Task prüft alle READY_INTERVAL Sekunden (Default 5):
+- MongoDB: ping mit kurzem Timeout (READY_MONGO_TIMEOUT_MS)
+- Pool: ausgeliehene/wartende Verbindungen, Sättigung (PoolListener)
+- Hub-Lag: wie stark sich ein 100-ms-Timer im eventlet-Hub verspätet
+- Queues: wartende Hash-Jobs, Log-Queue, Slow-Query-Queue
+
+/ready liefert nur den letzten Snapshot (200 oder 503) – eine Probe kostet
+weder DB-Roundtrip noch Rechenzeit. Ist der Snapshot älter als drei
+Intervalle, gilt der Worker ebenfalls als nicht bereit.
+"""
+import logging
+import os
+import time
+
+import pymongo
+
+from . import pwpool, slowlog
+from .logpipe import AsyncLogHandler
+from .metrics import HUB_LAG_SECONDS, READY
+
+log = logging.getLogger(__name__)
+
+INTERVAL = float(os.environ.get("READY_INTERVAL", 5))
+MONGO_TIMEOUT = float(os.environ.get("READY_MONGO_TIMEOUT_MS", 1000)) / 1000
+
+# Schwellwerte, ab denen der Worker "degraded" meldet
+LIMITS = {
+    "pool_saturation": float(os.environ.get("READY_POOL_SATURATION", 0.9)),
+    "pool_waiting": int(os.environ.get("READY_POOL_WAITING", 20)),
+    "hub_lag_ms": float(os.environ.get("READY_HUB_LAG_MS", 500)),
+    "pw_hash_queue": int(os.environ.get("READY_PW_HASH_QUEUE", 50)),
+    "log_queue_fill": float(os.environ.get("READY_LOG_QUEUE_FILL", 0.8)),
+}
+
+_LAG_TICK = 0.1
+
+_snapshot: dict = {}
+_lag_max = 0.0
+
+
+def _log_queue() -> dict:
+    for h in logging.getLogger().handlers:
+        if isinstance(h, AsyncLogHandler):
+            size = h.queue.maxsize or 1
+            depth = h.queue.qsize()
+            return {"depth": depth, "fill": round(depth / size, 3), "dropped": h.dropped}
+    return {"depth": 0, "fill": 0.0, "dropped": 0}
+
+
+def _check_mongo(client) -> dict:
+    t0 = time.perf_counter()
+    try:
+        with pymongo.timeout(MONGO_TIMEOUT):
+            client.admin.command("ping")
+        return {"ok": True, "latency_ms": round((time.perf_counter() - t0) * 1000, 1)}
+    except Exception as e:
+        return {"ok": False, "error": str(e)[:200]}
+
+
+def evaluate(checks: dict, limits: dict = LIMITS) -> list[str]:
+    """Gründe, warum der Worker keinen Traffic bekommen sollte (leer = bereit)."""
+    reasons = []
+    if not checks["mongo"]["ok"]:
+        reasons.append("mongo unreachable")
+    pool = checks["pool"]
+    if pool["saturation"] >= limits["pool_saturation"]:
+        reasons.append(f"mongo pool saturated ({pool['saturation']:.0%})")
+    if pool["waiting"] > limits["pool_waiting"]:
+        reasons.append(f"{pool['waiting']} waiting for mongo connection")
+    if checks["hub"]["lag_ms"] > limits["hub_lag_ms"]:
+        reasons.append(f"hub lag {checks['hub']['lag_ms']:.0f} ms")
+    q = checks["queues"]
+    if q["pw_hash"] > limits["pw_hash_queue"]:
+        reasons.append(f"{q['pw_hash']} password hashes queued")
+    if q["log"]["fill"] >= limits["log_queue_fill"]:
+        reasons.append(f"log queue {q['log']['fill']:.0%} full")
+    return reasons
+
+
+def check(app) -> dict:
+    """Ein kompletter Durchlauf; Ergebnis wird der neue Snapshot."""
+    global _snapshot, _lag_max
+    lag, _lag_max = _lag_max, 0.0
+    client = app.config["MONGO_CLIENT"]
+    pool_listener = app.config.get("MONGO_POOL_LISTENER")
+    checks = {
+        "mongo": _check_mongo(client),
+        "pool": pool_listener.snapshot() if pool_listener else
+                {"checkedOut": 0, "waiting": 0, "maxPoolSize": 0, "saturation": 0.0},
+        "hub": {"lag_ms": round(lag * 1000, 1)},
+        "queues": {
+            "pw_hash": pwpool.queue_depth(),
+            "log": _log_queue(),
+            "slow_query": slowlog.recorder.queue.qsize(),
+        },
+    }
+    reasons = evaluate(checks)
+    HUB_LAG_SECONDS.set(lag)
+    READY.set(0 if reasons else 1)
+    if reasons and not _snapshot.get("reasons"):
+        log.warning("🚦 nicht bereit: %s", "; ".join(reasons))
+    elif not reasons and _snapshot.get("reasons"):
+        log.info("🚦 wieder bereit")
+    _snapshot = {"ready": not reasons, "reasons": reasons, "checks": checks, "at": time.time()}
+    return _snapshot
+
+
+def snapshot() -> tuple[dict, int]:
+    """Letzter Snapshot + HTTP-Status für /ready."""
+    snap = _snapshot
+    if not snap:
+        return {"ready": False, "reasons": ["starting"]}, 503
+    age = time.time() - snap["at"]
+    out = dict(snap, age_s=round(age, 1))
+    if age > 3 * INTERVAL:
+        out["ready"] = False
+        out["reasons"] = snap["reasons"] + [f"snapshot stale ({age:.0f} s)"]
+    return out, 200 if out["ready"] else 503
+
+
+def start(app, socketio) -> None:
+    """Startet Checker und Hub-Lag-Messung als Hintergrund-Tasks."""
+    def _lag_loop():
+        global _lag_max
+        while True:
+            t0 = time.perf_counter()
+            socketio.sleep(_LAG_TICK)
+            _lag_max = max(_lag_max, time.perf_counter() - t0 - _LAG_TICK)
+
+    def _check_loop():
+        while True:
+            try:
+                check(app)
+            except Exception as e:
+                log.warning("readiness check fehlgeschlagen: %s", e)
+            socketio.sleep(INTERVAL)
+
+    socketio.start_background_task(_lag_loop)
+    socketio.start_background_task(_check_loop)
@@ -0,0 +1,143 @@
+# app/revocation.py
+"""
+Token-Widerruf (Logout, Refresh-Rotation).
+
+- Quelle der Wahrheit: Collection `token_blocklist` ({jti, type, expiresAt, ...})
+  mit Unique-Index auf jti und TTL-Index auf expiresAt – Mongo räumt
+  abgelaufene Einträge selbst weg.
+- Access-Tokens (kurzlebig, bei jedem Request geprüft): jeder Worker hält
+  deren widerrufene jtis zusätzlich im Speicher und gleicht sie alle
+  REVOCATION_SYNC_SECONDS inkrementell (createdAt > letzter Sync) ab. Die
+  Prüfung pro Request ist damit ein Dict-Lookup ohne DB-Roundtrip; die
+  Menge ist durch die Access-Laufzeit begrenzt.
+- Refresh-Tokens (30 Tage, aber nur bei /auth/refresh benutzt): bleiben
+  aus dem Speicher draußen und werden direkt in Mongo nachgeschlagen.
+  revoke() meldet, ob der Eintrag neu war – darüber ist das Einlösen eines
+  Refresh-Tokens atomar einmalig (Unique-Index auf jti).
+
+Widerrufe von Access-Tokens auf einem anderen Worker greifen hier
+spätestens nach einem Sync-Intervall; eigene Widerrufe sofort.
+"""
+import logging
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+import pymongo
+from pymongo.database import Database
+from pymongo.errors import DuplicateKeyError
+
+from .metrics import JWT_BLOCKLIST_SIZE
+
+log = logging.getLogger(__name__)
+
+COLLECTION = "token_blocklist"
+SYNC_SECONDS = float(os.environ.get("REVOCATION_SYNC_SECONDS", 5))
+
+# jti -> exp (Unix-Zeit), nur Access-Tokens; abgelaufene scheitern ohnehin an exp
+_revoked: dict[str, float] = {}
+_last_sync: Optional[datetime] = None
+
+
+def ensure_indexes(db: Database) -> None:
+    col = db[COLLECTION]
+    col.create_index([("jti", pymongo.ASCENDING)], name="jti_unique", unique=True)
+    col.create_index([("expiresAt", pymongo.ASCENDING)], name="expiresAt_ttl", expireAfterSeconds=0)
+    col.create_index([("createdAt", pymongo.ASCENDING)], name="createdAt_asc")
+
+
+def _in_memory(claims: dict) -> bool:
+    return claims.get("type") != "refresh"
+
+
+def is_revoked(jti: Optional[str]) -> bool:
+    """Per-Request-Check für Access-Tokens (nur Speicher)."""
+    if not jti:
+        return False
+    exp = _revoked.get(jti)
+    return exp is not None and exp > time.time()
+
+
+def in_blocklist(db: Database, claims: dict) -> bool:
+    """Access-Token: Speicher-Lookup. Refresh-Token: Lookup in Mongo (selten)."""
+    jti = claims.get("jti")
+    if not jti:
+        return False
+    if _in_memory(claims):
+        return is_revoked(jti)
+    return db[COLLECTION].find_one({"jti": jti}, {"_id": 1}) is not None
+
+
+def revoke(db: Database, claims: dict, reason: str = "") -> bool:
+    """
+    Widerruft das Token zu diesen (bereits verifizierten) Claims. Idempotent.
+    Rückgabe: True, wenn dieser Aufruf den Eintrag angelegt hat; False, wenn
+    das Token schon widerrufen war (z.B. Refresh-Token zum zweiten Mal eingelöst).
+    """
+    jti = claims.get("jti")
+    if not jti:
+        return False
+    exp = float(claims.get("exp") or time.time())
+    if _in_memory(claims):
+        _revoked[jti] = exp
+        JWT_BLOCKLIST_SIZE.set(len(_revoked))
+    try:
+        res = db[COLLECTION].update_one(
+            {"jti": jti},
+            {"$setOnInsert": {
+                "jti": jti,
+                "sub": claims.get("sub"),
+                "type": claims.get("type"),
+                "reason": reason or None,
+                "createdAt": datetime.now(timezone.utc),
+                "expiresAt": datetime.fromtimestamp(exp, tz=timezone.utc),
+            }},
+            upsert=True,
+        )
+    except DuplicateKeyError:
+        # paralleler Upsert hat gewonnen
+        return False
+    return res.upserted_id is not None
+
+
+def sync(db: Database) -> int:
+    """Holt neue Widerrufe aus Mongo und wirft abgelaufene lokal raus."""
+    global _last_sync
+    q = {"type": {"$ne": "refresh"}}
+    if _last_sync is not None:
+        # kleine Überlappung gegen Uhr-/Commit-Versatz; Duplikate sind harmlos
+        q["createdAt"] = {"$gt": _last_sync - timedelta(seconds=2)}
+    started = datetime.now(timezone.utc)
+
+    added = 0
+    for d in db[COLLECTION].find(q, {"_id": 0, "jti": 1, "expiresAt": 1}):
+        exp = d["expiresAt"]
+        if exp.tzinfo is None:
+            exp = exp.replace(tzinfo=timezone.utc)
+        if d["jti"] not in _revoked:
+            added += 1
+        _revoked[d["jti"]] = exp.timestamp()
+    _last_sync = started
+
+    now = time.time()
+    for jti in [j for j, exp in _revoked.items() if exp <= now]:
+        _revoked.pop(jti, None)
+    JWT_BLOCKLIST_SIZE.set(len(_revoked))
+    return added
+
+
+def start_sync(app, socketio) -> None:
+    """Startet den periodischen Abgleich als Hintergrund-Task."""
+    def _loop():
+        while True:
+            try:
+                with app.app_context():
+                    added = sync(app.config["MONGO_CLIENT"].get_default_database())
+                if added:
+                    log.info("🚫 token_blocklist: %d neue Widerrufe übernommen", added)
+            except Exception as e:
+                log.warning("token_blocklist sync fehlgeschlagen: %s", e)
+            socketio.sleep(SYNC_SECONDS)
+
+    socketio.start_background_task(_loop)
@@ -0,0 +1,302 @@
+# app/slowlog.py
+"""
+Slow-Query-Log auf Basis des pymongo-Command-Monitorings.
+
+- Jedes Kommando über SLOW_QUERY_MS wird mit Route, normalisierter
+  Query-Form ("Shape": Feldnamen/Operatoren, Werte → "?") und Dauer geloggt.
+- Ein Hintergrund-Task schreibt den Eintrag in die Capped Collection
+  `slow_queries` und holt – pro Shape höchstens alle
+  SLOW_QUERY_EXPLAIN_INTERVAL Sekunden – ein explain("executionStats").
+  Der Request wartet auf nichts davon; ist die Queue voll, wird verworfen.
+- Eigene Kommandos (Insert in slow_queries, explain) werden ignoriert.
+
+Gespeichert wird nur die Shape und eine Plan-Zusammenfassung, keine Werte.
+"""
+import hashlib
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+
+from pymongo import monitoring
+
+from .metrics import SLOW_QUERIES_TOTAL, route_template
+from .mongo_monitor import command_collection
+
+log = logging.getLogger(__name__)
+
+COLLECTION = "slow_queries"
+THRESHOLD_MS = float(os.environ.get("SLOW_QUERY_MS", 100))
+EXPLAIN_INTERVAL = float(os.environ.get("SLOW_QUERY_EXPLAIN_INTERVAL", 300))
+CAP_BYTES = int(os.environ.get("SLOW_QUERY_CAP_BYTES", 16 * 1024 * 1024))
+
+# Kommandos, die explain unterstützt – nur diese werden aufgezeichnet
+EXPLAINABLE = frozenset({"find", "aggregate", "count", "distinct", "update", "delete", "findAndModify"})
+
+# Felder, die explain nicht mag bzw. die nur Session/Transport betreffen
+_STRIP = frozenset({"lsid", "txnNumber", "autocommit", "startTransaction", "writeConcern", "readConcern"})
+
+# unter monkey_patch greenlet-lokal, sonst thread-lokal
+_local = threading.local()
+
+
+# ───────── Shape ─────────────────────────────────────────────────
+
+def _mask(v):
+    """Werte → "?", Struktur (Feldnamen, Operatoren, $or-Zweige) bleibt."""
+    if isinstance(v, dict):
+        return {k: _mask(x) for k, x in v.items()}
+    if isinstance(v, list) and v and all(isinstance(x, dict) for x in v):
+        return [_mask(x) for x in v]
+    return "?"
+
+
+def _pipeline_shape(pipeline) -> list:
+    out = []
+    for stage in pipeline or []:
+        name = next(iter(stage), "?") if isinstance(stage, dict) else "?"
+        if name == "$match":
+            out.append({name: _mask(stage[name])})
+        elif name == "$sort":
+            out.append({name: stage[name]})
+        else:
+            out.append(name)
+    return out
+
+
+def query_shape(command_name: str, command: dict) -> dict:
+    """Normalisierte Form eines Kommandos – gleiche Shape = gleicher Plan-Kandidat."""
+    shape = {"op": command_name, "coll": command_collection(command_name, command)}
+    if command_name == "find":
+        shape["filter"] = _mask(command.get("filter") or {})
+        if command.get("sort"):
+            shape["sort"] = dict(command["sort"])
+    elif command_name == "aggregate":
+        shape["pipeline"] = _pipeline_shape(command.get("pipeline"))
+    elif command_name == "count":
+        shape["filter"] = _mask(command.get("query") or {})
+    elif command_name == "distinct":
+        shape["key"] = command.get("key")
+        shape["filter"] = _mask(command.get("query") or {})
+    elif command_name == "update":
+        first = (command.get("updates") or [{}])[0]
+        shape["filter"] = _mask(first.get("q") or {})
+        u = first.get("u")
+        shape["update"] = sorted(u) if isinstance(u, dict) else "pipeline"
+    elif command_name == "delete":
+        first = (command.get("deletes") or [{}])[0]
+        shape["filter"] = _mask(first.get("q") or {})
+    elif command_name == "findAndModify":
+        shape["filter"] = _mask(command.get("query") or {})
+        if command.get("sort"):
+            shape["sort"] = dict(command["sort"])
+    return shape
+
+
+def shape_key(shape: dict) -> str:
+    raw = json.dumps(shape, sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def explain_command(command_name: str, command: dict) -> dict:
+    """Kopie des Kommandos, die sich als explain-Ziel eignet (ein Statement)."""
+    cmd = {k: v for k, v in command.items() if not k.startswith("$") and k not in _STRIP}
+    if command_name == "update":
+        cmd["updates"] = cmd.get("updates", [])[:1]
+    elif command_name == "delete":
+        cmd["deletes"] = cmd.get("deletes", [])[:1]
+    return cmd
+
+
+# ───────── Plan-Zusammenfassung ──────────────────────────────────
+
+def _plan_stages(plan: dict) -> list[str]:
+    """Stage-Kette des Gewinner-Plans, z.B. ['FETCH', 'IXSCAN(user_1)']."""
+    out = []
+    while isinstance(plan, dict):
+        if "queryPlan" in plan:          # SBE-Format (≥ 5.x/7.x)
+            plan = plan["queryPlan"]
+            continue
+        stage = plan.get("stage")
+        if stage:
+            out.append(f"{stage}({plan['indexName']})" if plan.get("indexName") else stage)
+        if "inputStage" in plan:
+            plan = plan["inputStage"]
+        elif plan.get("inputStages"):
+            plan = plan["inputStages"][0]
+            out.append("…")
+        else:
+            break
+    return out
+
+
+def summarize_explain(explain: dict) -> dict:
+    """Nur das Wesentliche aus explain(): Plan-Kette und Ausführungszahlen."""
+    root = explain
+    stages = explain.get("stages")
+    if isinstance(stages, list) and stages and "$cursor" in stages[0]:
+        root = stages[0]["$cursor"]
+    planner = root.get("queryPlanner") or {}
+    stats = root.get("executionStats") or {}
+    chain = _plan_stages(planner.get("winningPlan") or {})
+    return {
+        "plan": ">".join(chain) or "?",
+        "collscan": any(s.startswith("COLLSCAN") for s in chain),
+        "nReturned": stats.get("nReturned"),
+        "keysExamined": stats.get("totalKeysExamined"),
+        "docsExamined": stats.get("totalDocsExamined"),
+        "executionTimeMillis": stats.get("executionTimeMillis"),
+    }
+
+
+# ───────── Recorder ──────────────────────────────────────────────
+
+class SlowQueryRecorder(monitoring.CommandListener):
+    """
+    Command-Listener + Hintergrund-Worker. Ohne start() wird nur geloggt
+    und gezählt (z.B. in Tests oder CLI-Skripten).
+    """
+
+    def __init__(self, threshold_ms: float = THRESHOLD_MS, maxsize: int = 1000):
+        self.threshold_ms = threshold_ms
+        self.queue: queue.Queue = queue.Queue(maxsize)
+        self.dropped = 0
+        self._pending: dict[tuple, tuple] = {}
+        self._last_explain: dict[str, float] = {}
+        self._client = None
+
+    # --- Listener (läuft im aufrufenden Greenlet) ---
+
+    def _ignored(self, command_name: str, command: dict) -> bool:
+        return (
+            self.threshold_ms <= 0
+            or command_name not in EXPLAINABLE
+            or getattr(_local, "internal", False)
+            or command_collection(command_name, command) == COLLECTION
+        )
+
+    def started(self, event):
+        if self._ignored(event.command_name, event.command):
+            return
+        # nur Referenz merken – Shape wird erst berechnet, wenn es langsam war
+        self._pending[(event.connection_id, event.request_id)] = (event.command, route_template())
+
+    def succeeded(self, event):
+        self._finish(event, ok=True)
+
+    def failed(self, event):
+        self._finish(event, ok=False)
+
+    def _finish(self, event, ok: bool):
+        pending = self._pending.pop((event.connection_id, event.request_id), None)
+        if pending is None:
+            return
+        ms = event.duration_micros / 1000
+        if ms < self.threshold_ms:
+            return
+        command, route = pending
+        name = event.command_name
+        shape = query_shape(name, command)
+        key = shape_key(shape)
+        SLOW_QUERIES_TOTAL.labels(name, shape["coll"], route).inc()
+        log.warning(
+            "🐢 slow query %s.%s %.1f ms route=%s", shape["coll"], name, ms, route,
+            extra={"slow_ms": round(ms, 1), "route": route, "shape": shape, "shape_key": key},
+        )
+        item = {
+            "at": datetime.now(timezone.utc),
+            "db": event.database_name,
+            "command": name,
+            "collection": shape["coll"],
+            "route": route,
+            "durationMs": round(ms, 2),
+            "ok": ok,
+            "shapeKey": key,
+            "shape": json.dumps(shape, sort_keys=True, default=str),
+        }
+        try:
+            self.queue.put_nowait((item, command))
+        except queue.Full:
+            self.dropped += 1
+
+    # --- Worker ---
+
+    def start(self, app, socketio) -> None:
+        """Hintergrund-Task, der Einträge schreibt und explain einsammelt."""
+        self._client = app.config["MONGO_CLIENT"]
+
+        def _loop():
+            _local.internal = True
+            while True:
+                try:
+                    item, command = self.queue.get(timeout=1)
+                except queue.Empty:
+                    continue
+                try:
+                    self._store(item, command)
+                except Exception as e:
+                    log.warning("slow query speichern fehlgeschlagen: %s", e)
+
+        socketio.start_background_task(_loop)
+
+    def _store(self, item: dict, command: dict) -> None:
+        db = self._client[item["db"]]
+        now = time.monotonic()
+        last = self._last_explain.get(item["shapeKey"])
+        if item["ok"] and (last is None or now - last >= EXPLAIN_INTERVAL):
+            self._last_explain[item["shapeKey"]] = now
+            try:
+                raw = db.command(
+                    {"explain": explain_command(item["command"], command), "verbosity": "executionStats"}
+                )
+                item["explain"] = summarize_explain(raw)
+            except Exception as e:
+                item["explainError"] = str(e)[:200]
+        db[COLLECTION].insert_one(item)
+
+
+recorder = SlowQueryRecorder()
+
+
+def ensure_collection(db) -> None:
+    """Legt `slow_queries` als Capped Collection an (falls noch nicht da)."""
+    if COLLECTION in db.list_collection_names(filter={"name": COLLECTION}):
+        return
+    db.create_collection(COLLECTION, capped=True, size=CAP_BYTES)
+    log.info("🐢 Capped Collection %s angelegt (%d Bytes)", COLLECTION, CAP_BYTES)
+
+
+def summary(db, since: datetime, limit: int = 20) -> list[dict]:
+    """Query-Shapes nach Gesamtzeit absteigend, mit den beobachteten Plänen."""
+    pipeline = [
+        {"$match": {"at": {"$gte": since}}},
+        {"$sort": {"_id": 1}},
+        {"$group": {
+            "_id": "$shapeKey",
+            "shape": {"$last": "$shape"},
+            "command": {"$last": "$command"},
+            "collection": {"$last": "$collection"},
+            "routes": {"$addToSet": "$route"},
+            "count": {"$sum": 1},
+            "totalMs": {"$sum": "$durationMs"},
+            "maxMs": {"$max": "$durationMs"},
+            "plans": {"$addToSet": "$explain.plan"},
+            "collscan": {"$max": "$explain.collscan"},
+            "maxDocsExamined": {"$max": "$explain.docsExamined"},
+            "lastAt": {"$last": "$at"},
+        }},
+        {"$sort": {"totalMs": -1}},
+        {"$limit": limit},
+    ]
+    out = []
+    for r in db[COLLECTION].aggregate(pipeline):
+        r["shapeKey"] = r.pop("_id")
+        r["avgMs"] = round(r["totalMs"] / r["count"], 2)
+        r["totalMs"] = round(r["totalMs"], 2)
+        r["shape"] = json.loads(r["shape"])
+        r["lastAt"] = r["lastAt"].isoformat() if r.get("lastAt") else None
+        out.append(r)
+    return out
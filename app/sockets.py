@@ -1,44 +1,153 @@
 # app/sockets.py
+"""
+Socket.IO-Handler.
+
+Der Connect-Handshake verifiziert das Access-Token (Signatur, Ablauf,
+Blocklist) – aus `auth` ({"token": ...}), dem Authorization-Header oder
+?access= (siehe JWT_TOKEN_LOCATION). Ohne gültiges Token wird die
+Verbindung abgelehnt. Jeder Socket tritt dem Room <username> bei, ein
+emit(room=<username>) erreicht damit alle Geräte eines Users.
+"""
 import logging
+import os
+import time
+from functools import wraps
+from typing import Optional
+
 from bson.objectid import ObjectId
-from flask import request
+from flask import g, request
+from flask_jwt_extended import decode_token, verify_jwt_in_request, get_jwt_identity
+from flask_socketio import ConnectionRefusedError, join_room
+
+from . import chat, duels, gameplay, revocation
+from .extensions import socketio as _socketio
+from .metrics import (
+    SOCKET_CONNECTED, SOCKET_USERS, SOCKET_EVENTS_TOTAL,
+    SOCKET_HANDLER_SECONDS, SOCKET_EMITS_TOTAL, SOCKET_EMIT_FANOUT,
+)
+from .ratelimit import TokenBucketLimiter
 from .utils import _open_games_with_badge, _news_counts, get_db
 
 log = logging.getLogger(__name__)
 
-user_sid: dict[str, set[str]] = {}
-sid_user: dict[str, str]      = {}
+_CHAT_LIMIT = TokenBucketLimiter.from_spec(os.environ.get("CHAT_RATE_USER", "30/10"))
+
+sid_user: dict[str, str] = {}        # sid → username (für Events ohne Token)
+_user_sockets: dict[str, int] = {}  # username → Anzahl Sockets (nur für die Metrik)
+
+
+def _auth_token(auth) -> Optional[str]:
+    if isinstance(auth, dict):
+        tok = auth.get("token") or auth.get("access") or ""
+        return tok.removeprefix("Bearer ").strip() or None
+    return None
+
+
+def authenticate(auth=None) -> Optional[str]:
+    """Username aus einem gültigen Access-Token des Handshakes, sonst None."""
+    try:
+        tok = _auth_token(auth)
+        if tok:
+            claims = decode_token(tok)   # decode_token prüft die Blocklist nicht
+            if claims.get("type") != "access" or revocation.is_revoked(claims.get("jti")):
+                return None
+            name = claims.get("sub")
+        else:
+            verify_jwt_in_request()      # Header / ?access= inkl. Blocklist
+            name = get_jwt_identity()
+    except Exception as e:
+        log.debug("🔌  socket auth abgelehnt: %s", e)
+        return None
+    return (name or "").lower() or None
+
+
+def _fanout(room, namespace="/") -> int:
+    """Empfänger-Sockets eines Emits (O(1) aus dem Room-Manager)."""
+    server = _socketio.server
+    if server is None:
+        return 0
+    return len(server.manager.rooms.get(namespace, {}).get(room, ()))
+
+
+def emit(event, data, room=None, **kwargs):
+    """socketio.emit mit Metriken – alle Emits im Backend laufen hierüber."""
+    SOCKET_EMITS_TOTAL.labels(event=event).inc()
+    SOCKET_EMIT_FANOUT.labels(event=event).observe(_fanout(room, kwargs.get("namespace") or "/"))
+    _socketio.emit(event, data, room=room, **kwargs)
+
+
+def _instrumented(event):
+    """Zählt das Event, misst die Handler-Laufzeit und setzt das Metrik-Label für Mongo."""
+    def wrapper(fn):
+        @wraps(fn)
+        def handler(*args):
+            SOCKET_EVENTS_TOTAL.labels(event=event).inc()
+            g.metrics_route = f"socket:{event}"
+            t0 = time.perf_counter()
+            try:
+                return fn(*args)
+            finally:
+                SOCKET_HANDLER_SECONDS.labels(event=event).observe(time.perf_counter() - t0)
+        return handler
+    return wrapper
+
 
 def register_socketio_handlers(socketio):
 
     @socketio.on("connect")
-    def s_connect():
-        log.debug("🔌  client %s connected", request.sid)
+    @_instrumented("connect")
+    def s_connect(auth=None):
+        name = authenticate(auth)
+        if not name:
+            raise ConnectionRefusedError("unauthorized")
+        SOCKET_CONNECTED.inc()
+        sid_user[request.sid] = name
+        _user_sockets[name] = _user_sockets.get(name, 0) + 1
+        SOCKET_USERS.set(len(_user_sockets))
+        join_room(name)
+        emit("notification_reset", _news_counts(name), room=request.sid)
+        log.debug("🔌  client %s connected as %s", request.sid, name)
 
     @socketio.on("disconnect")
+    @_instrumented("disconnect")
     def s_disconnect():
         name = sid_user.pop(request.sid, None)
         if name:
-            user_sid[name].discard(request.sid)
-            if not user_sid[name]:
-                user_sid.pop(name)
+            SOCKET_CONNECTED.dec()
+            left = _user_sockets.get(name, 1) - 1
+            if left > 0:
+                _user_sockets[name] = left
+            else:
+                _user_sockets.pop(name, None)
+            SOCKET_USERS.set(len(_user_sockets))
         log.debug("🔌  client %s disconnected", request.sid)
 
-    @socketio.on("init_username")
-    def s_init(name):
-        name = (name or "").lower()
-        sid_user[request.sid] = name
-        user_sid.setdefault(name, set()).add(request.sid)
-        socketio.emit("notification_reset", _news_counts(name), room=request.sid)
-        log.debug("🔗  s_init: %s -> %s", request.sid, name)
-
     @socketio.on("refresh_notifications")
+    @_instrumented("refresh_notifications")
     def s_refresh(_):
         name = sid_user.get(request.sid)
         if name:
-            socketio.emit("notification_reset", _news_counts(name), room=request.sid)
+            emit("notification_reset", _news_counts(name), room=request.sid)
+
+    @socketio.on("submit_answers")
+    @_instrumented("submit_answers")
+    def s_submit_answers(data):
+        """
+        Antworten wie PATCH /games/<gid>/answer, aber über den bestehenden Socket:
+        speichert, benachrichtigt den Gegner und liefert die Zählerstände als Ack.
+        """
+        me = sid_user.get(request.sid)
+        data = data if isinstance(data, dict) else {}
+        if not me:
+            return {"ok": False, "error": "unauthorized", "status": 401}
+        try:
+            result = gameplay.submit_answers(get_db(), data.get("gameId") or "", me, data.get("answers"))
+        except gameplay.AnswerError as e:
+            return {"ok": False, "error": str(e), "status": e.status}
+        return {"ok": True, **result}
 
     @socketio.on("game_progress")
+    @_instrumented("game_progress")
     def s_game_progress(data):
         user = sid_user.get(request.sid)
         if not user:
@@ -60,7 +169,106 @@ def register_socketio_handlers(socketio):
 
         other = g["friendName"] if user == g["hostName"].lower() else g["hostName"]
         unseen_open = _open_games_with_badge(other.lower())[1]
-        socketio.emit("notification", {"openGames": unseen_open,
-                                       "progressUpdate":{"gameId":gid,"answered":ans,"from":user}},
-                      room=other.lower())
-        socketio.emit("game_progress", {"gameId": gid, "answered": ans}, room=other.lower(), include_self=False)
+        emit("notification", {"openGames": unseen_open,
+                               "progressUpdate":{"gameId":gid,"answered":ans,"from":user}},
+             room=other.lower())
+        emit("game_progress", {"gameId": gid, "answered": ans}, room=other.lower(), include_self=False)
+
+    # ───────── Chat ─────────────────────────────────────────────
+    # Antworten gehen als Ack an den Sender zurück: {"ok": True, ...} bzw. {"ok": False, "error": ...}
+
+    @socketio.on("chat_send")
+    @_instrumented("chat_send")
+    def s_chat_send(data):
+        me = sid_user.get(request.sid)
+        data = data if isinstance(data, dict) else {}
+        if not me:
+            return {"ok": False, "error": "unauthorized"}
+        if _CHAT_LIMIT.take(me) > 0:
+            return {"ok": False, "error": "too many messages"}
+        db = get_db()
+        try:
+            msg, new = chat.send(db, me, data.get("to"), data.get("text"), data.get("clientId"))
+        except chat.ChatError as e:
+            return {"ok": False, "error": str(e)}
+        to = msg["to"]
+        if new:
+            emit("chat_message", msg, room=to)
+            emit("chat_message", msg, room=me, skip_sid=request.sid)   # eigene andere Geräte
+            emit("notification", {"unreadMessages": chat.unread_total(db, to)}, room=to)
+        return {"ok": True, "message": msg}
+
+    @socketio.on("chat_read")
+    @_instrumented("chat_read")
+    def s_chat_read(data):
+        me = sid_user.get(request.sid)
+        data = data if isinstance(data, dict) else {}
+        peer = (data.get("with") or "").strip().lower()
+        up_to = data.get("upTo")
+        if not me or not peer or not isinstance(up_to, str) or not up_to:
+            return {"ok": False, "error": "with und upTo sind Pflicht"}
+        db = get_db()
+        try:
+            n = chat.mark_read(db, me, peer, up_to)
+        except chat.ChatError as e:
+            return {"ok": False, "error": str(e)}
+        if n:
+            emit("chat_read", {"with": me, "upTo": up_to}, room=peer)
+            emit("notification", {"unreadMessages": chat.unread_total(db, me)}, room=me)
+        return {"ok": True, "marked": n}
+
+    # ───────── Live-Duell (Zustand in app/duels.py) ─────────────
+
+    @socketio.on("duel_start")
+    @_instrumented("duel_start")
+    def s_duel_start(data):
+        me = sid_user.get(request.sid)
+        data = data if isinstance(data, dict) else {}
+        if not me:
+            return {"ok": False, "error": "unauthorized"}
+        try:
+            gid = duels.manager.create(get_db(), me, (data.get("friendName") or "").strip().lower(),
+                                       data.get("questions"), data.get("roundSeconds"))
+        except (duels.DuelError, TypeError, ValueError) as e:
+            return {"ok": False, "error": str(e)}
+        return {"ok": True, "gameId": gid}
+
+    @socketio.on("duel_join")
+    @_instrumented("duel_join")
+    def s_duel_join(data):
+        me = sid_user.get(request.sid)
+        data = data if isinstance(data, dict) else {}
+        if not me:
+            return {"ok": False, "error": "unauthorized"}
+        try:
+            duels.manager.join(get_db(), me, data.get("gameId") or "")
+        except duels.DuelError as e:
+            return {"ok": False, "error": str(e)}
+        return {"ok": True}
+
+    @socketio.on("duel_decline")
+    @_instrumented("duel_decline")
+    def s_duel_decline(data):
+        me = sid_user.get(request.sid)
+        data = data if isinstance(data, dict) else {}
+        if not me:
+            return {"ok": False, "error": "unauthorized"}
+        try:
+            duels.manager.decline(get_db(), me, data.get("gameId") or "")
+        except duels.DuelError as e:
+            return {"ok": False, "error": str(e)}
+        return {"ok": True}
+
+    @socketio.on("duel_answer")
+    @_instrumented("duel_answer")
+    def s_duel_answer(data):
+        me = sid_user.get(request.sid)
+        data = data if isinstance(data, dict) else {}
+        if not me:
+            return {"ok": False, "error": "unauthorized"}
+        try:
+            res = duels.manager.answer(me, data.get("gameId") or "", data.get("round", -1),
+                                       bool(data.get("isCorrect")), data.get("answer"))
+        except (duels.DuelError, TypeError, ValueError) as e:
+            return {"ok": False, "error": str(e)}
+        return {"ok": True, **res}
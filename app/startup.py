@@ -0,0 +1,45 @@
+# app/startup.py
+"""
+Startphasen messen.
+
+    startup = Startup()
+    with startup.phase("mongo"):
+        init_db(app)
+    ...
+    startup.report()
+
+Jede Phase landet als Gauge startup_phase_seconds{phase=...} und im
+abschließenden "startup-report"-Log (eine Zeile, Phasen als Feld).
+"""
+import logging
+import time
+from contextlib import contextmanager
+
+from .metrics import STARTUP_PHASE_SECONDS
+
+log = logging.getLogger(__name__)
+
+
+class Startup:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases: dict[str, float] = {}
+
+    @contextmanager
+    def phase(self, name: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            took = time.perf_counter() - t0
+            self.phases[name] = self.phases.get(name, 0.0) + took
+            STARTUP_PHASE_SECONDS.labels(phase=name).set(self.phases[name])
+
+    def report(self) -> dict[str, float]:
+        total = time.perf_counter() - self.started
+        STARTUP_PHASE_SECONDS.labels(phase="total").set(total)
+        ms = {k: round(v * 1000, 1) for k, v in self.phases.items()}
+        slowest = max(ms, key=ms.get) if ms else "-"
+        log.info("🚀 startup-report: %.0f ms (langsamste Phase: %s)", total * 1000, slowest,
+                 extra={"startup_ms": round(total * 1000, 1), "phases_ms": ms})
+        return ms
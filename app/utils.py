@@ -3,12 +3,25 @@ import datetime as dt
 import pymongo
 from flask import current_app
 
+from . import chat
+
 def _now():
     return dt.datetime.now(dt.timezone.utc).isoformat()
 
-def get_db():
-    """Convenience: hole die Default-DB aus dem globalen MongoClient."""
-    return current_app.config["MONGO_CLIENT"].get_default_database()
+def is_admin(user: str) -> bool:
+    """Admin-Whitelist aus FEEDBACK_ADMINS (kommagetrennt, case-insensitive)."""
+    admins = (current_app.config.get("FEEDBACK_ADMINS") or "")
+    wl = {u.strip().lower() for u in admins.split(",") if u.strip()}
+    return bool(user) and user.lower() in wl
+
+def get_db(workload: str = "default"):
+    """
+    Convenience: hole die Default-DB aus dem MongoClient des Workloads.
+    "analytics" → eigener Pool, liest von Secondaries (siehe init_db).
+    """
+    clients = current_app.config.get("MONGO_CLIENTS") or {}
+    client = clients.get(workload) or current_app.config["MONGO_CLIENT"]
+    return client.get_default_database()
 
 def expose_id(doc: dict) -> dict:
     if "_id" in doc:
@@ -26,11 +39,15 @@ def reduced_game_doc(g: dict) -> dict:
         "friendAnswered": len(g["friendAnswers"]),
     }
 
+# Live-Duelle laufen über Socket-Events (app/duels.py), nicht über die Async-Listen
+ASYNC_ONLY = {"mode": {"$ne": "duel"}}
+
 def _open_games_with_badge(user: str):
     db = get_db()
     cur = db["games"].find(
         {"finished": {"$ne": True},
-         "$or"     : [{"hostName": user}, {"friendName": user}]},
+         "$or"     : [{"hostName": user}, {"friendName": user}],
+         **ASYNC_ONLY},
         sort=[("createdAt", pymongo.ASCENDING)]
     )
     games, unseen = [], 0
@@ -50,13 +67,14 @@ def _open_games(user: str):
     db = get_db()
     cursor = db["games"].find(
         {"finished": {"$ne": True},
-         "$or"     : [{"hostName": user}, {"friendName": user}]},
+         "$or"     : [{"hostName": user}, {"friendName": user}],
+         **ASYNC_ONLY},
         sort=[("createdAt", pymongo.ASCENDING)]
     )
     return [reduced_game_doc(g) for g in cursor]
 
 def _unread_chat(name: str) -> int:
-    return get_db()["chat"].count_documents({"to": name, "read": {"$ne": True}})
+    return chat.unread_total(get_db(), name)
 
 def _pending_requests(name: str) -> int:
     return get_db()["friend_requests"].count_documents({"to_user": name, "status": "pending"})
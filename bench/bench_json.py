@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+JSON-Serialisierung: Flask-Standard-Provider vs. FastJSONProvider (orjson).
+
+Zwei typische Payloads:
+- ein großes Spiel-Dokument (GET /games/<gid>) mit --questions Fragen
+- eine Liste fertiger Spiele (GET /games/finished/<user>) mit --games Einträgen
+
+Gemessen wird app.json.response(...) im App-Kontext – also genau das, was
+jsonify() pro Request tut. Der Standard-Provider bekommt einen default-Hook
+für ObjectId/datetime, sonst könnte er die Dokumente gar nicht serialisieren.
+
+Aufruf:
+    python bench/bench_json.py --questions 200 --games 500 --rounds 200
+"""
+import argparse
+import datetime as dt
+import os
+import random
+import sys
+import time
+
+from bson import ObjectId
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from app import jsonprovider
+from app.jsonprovider import FastJSONProvider
+
+
+class StdProvider(DefaultJSONProvider):
+    # so hätte man es ohne eigenen Provider lösen müssen
+    @staticmethod
+    def default(o):
+        if isinstance(o, ObjectId):
+            return str(o)
+        if isinstance(o, dt.datetime):
+            return o.isoformat()
+        return DefaultJSONProvider.default(o)
+
+
+def game_doc(rng, n_questions):
+    now = dt.datetime.now(dt.timezone.utc)
+    qs = [{"questionId": f"q{rng.randrange(5000):04d}", "text": "Welche Waffe ist das? " * 3,
+           "options": [f"Antwort {i}" for i in range(4)], "correct": rng.randrange(4)}
+          for _ in range(n_questions)]
+
+    def answers():
+        return [{"questionId": q["questionId"], "isCorrect": rng.random() < 0.6,
+                 "answeredAt": now} for q in qs]
+
+    return {"_id": ObjectId(), "hostName": "max", "friendName": "eva", "questions": qs,
+            "hostAnswers": answers(), "friendAnswers": answers(), "createdAt": now,
+            "finished": True, "finishedAt": now, "hostCorrect": 7, "friendCorrect": 5}
+
+
+def finished_list(rng, n_games):
+    return {"finishedGames": [
+        {"id": str(ObjectId()), "hostName": "max", "friendName": f"user{i}", "totalQuestions": 10,
+         "hostCorrect": rng.randrange(11), "friendCorrect": rng.randrange(11),
+         "finishedAt": dt.datetime.now(dt.timezone.utc), "hostSeenResult": True, "friendSeenResult": False}
+        for i in range(n_games)
+    ]}
+
+
+def bench(provider_cls, payload, rounds):
+    app = Flask("bench")
+    app.json = provider_cls(app)
+    with app.app_context():
+        app.json.response(payload)  # warmup
+        t0 = time.perf_counter()
+        for _ in range(rounds):
+            resp = app.json.response(payload)
+        took = (time.perf_counter() - t0) / rounds
+    return took, len(resp.get_data())
+
+
+def main():
+    ap = argparse.ArgumentParser(description="JSON-Provider-Benchmark")
+    ap.add_argument("--questions", type=int, default=200)
+    ap.add_argument("--games", type=int, default=500)
+    ap.add_argument("--rounds", type=int, default=200)
+    args = ap.parse_args()
+
+    rng = random.Random(42)
+    payloads = {
+        f"game ({args.questions} Fragen)": game_doc(rng, args.questions),
+        f"finished ({args.games} Spiele)": finished_list(rng, args.games),
+    }
+    print(f"orjson: {'ja' if jsonprovider.orjson else 'nein (stdlib-Fallback)'}\n")
+    print(f"{'Payload':<28}{'Bytes':>9}{'stdlib µs':>12}{'fast µs':>10}{'Faktor':>8}")
+    for name, payload in payloads.items():
+        std, size = bench(StdProvider, payload, args.rounds)
+        fast, _ = bench(FastJSONProvider, payload, args.rounds)
+        print(f"{name:<28}{size:>9}{std * 1e6:>12.0f}{fast * 1e6:>10.0f}{std / fast:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+CPU-Kosten der JWT-Prüfung pro Request: alt vs. app.jwtctx.
+
+"alt"  = globaler Hook mit verify_jwt_in_request + @jwt_required aus
+         flask_jwt_extended + _debug_jwt_info (wie früher im feedback-Blueprint)
+"neu"  = Hook mit jwtctx.current_claims + jwtctx.jwt_required (ein Decode)
+
+Beide laufen ohne Mongo gegen eine Minimal-App im Flask-Test-Client.
+
+Aufruf:
+    python bench/bench_jwt_decode.py --requests 5000
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from flask import Flask, jsonify
+from flask_jwt_extended import (
+    JWTManager, create_access_token, get_jwt_identity,
+    jwt_required as fje_jwt_required, verify_jwt_in_request,
+)
+
+from app import jwtctx
+
+
+def _make_app(mode):
+    app = Flask(__name__)
+    app.config["JWT_SECRET_KEY"] = "bench-secret-" + "x" * 40
+    JWTManager(app)
+
+    if mode == "alt":
+        @app.before_request
+        def _hook():
+            try:
+                verify_jwt_in_request(optional=True)
+            except Exception:
+                pass
+
+        @app.get("/feedback")
+        @fje_jwt_required()
+        def view():
+            try:
+                verify_jwt_in_request()
+            except Exception:
+                pass
+            return jsonify(user=get_jwt_identity())
+    else:
+        @app.before_request
+        def _hook():
+            jwtctx.current_claims()
+
+        @app.get("/feedback")
+        @jwtctx.jwt_required()
+        def view():
+            jwtctx.current_claims()
+            return jsonify(user=get_jwt_identity())
+
+    @app.get("/health")
+    def health():
+        return jsonify(ok=True)
+
+    with app.app_context():
+        token = create_access_token(identity="bench")
+    return app, {"Authorization": f"Bearer {token}"}
+
+
+def _cpu_per_request(mode, path, n):
+    app, headers = _make_app(mode)
+    c = app.test_client()
+    for _ in range(200):  # Warm-up
+        c.get(path, headers=headers)
+    t0 = time.process_time()
+    for _ in range(n):
+        c.get(path, headers=headers)
+    return (time.process_time() - t0) / n * 1e6
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--requests", type=int, default=5000)
+    args = ap.parse_args()
+
+    print(f"{'Pfad':<12}{'alt µs':>10}{'neu µs':>10}{'gespart µs':>12}")
+    for path in ("/feedback", "/health"):
+        old = _cpu_per_request("alt", path, args.requests)
+        new = _cpu_per_request("neu", path, args.requests)
+        print(f"{path:<12}{old:>10.1f}{new:>10.1f}{old - new:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Login-Sturm vs. Ping-Latenz.
+
+Ein Echo-Server läuft als Greenlet im eventlet-Hub (wie der Socket.IO-
+Transport). Ein nativer Thread schickt alle --ping-ms einen Ping und misst
+die Round-Trip-Zeit. Parallel prüfen --logins Greenlets ein Passwort –
+einmal direkt im Hub ("inline"), einmal über app.pwpool ("pool").
+
+Aufruf:
+    python bench/bench_login_storm.py --logins 100
+"""
+import eventlet
+eventlet.monkey_patch()
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from eventlet import patcher
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from app import pwpool
+
+_socket = patcher.original("socket")
+_threading = patcher.original("threading")
+_time = patcher.original("time")
+
+
+def _echo_server():
+    srv = eventlet.listen(("127.0.0.1", 0))
+
+    def _serve(conn):
+        while True:
+            data = conn.recv(64)
+            if not data:
+                break
+            conn.sendall(data)
+
+    def _accept():
+        while True:
+            conn, _ = srv.accept()
+            eventlet.spawn(_serve, conn)
+
+    eventlet.spawn(_accept)
+    return srv.getsockname()[1]
+
+
+def _pinger(port, interval, stop, out):
+    # echter OS-Thread – wird vom blockierten Hub NICHT mit angehalten
+    s = _socket.create_connection(("127.0.0.1", port))
+    while not stop.is_set():
+        t0 = _time.perf_counter()
+        s.sendall(b"ping")
+        s.recv(64)
+        out.append((_time.perf_counter() - t0) * 1000)
+        _time.sleep(interval)
+    s.close()
+
+
+def _run(mode, port, pw_hash, logins, interval):
+    samples = []
+    stop = _threading.Event()
+    t = _threading.Thread(target=_pinger, args=(port, interval, stop, samples), daemon=True)
+    t.start()
+    eventlet.sleep(0.2)  # Baseline-Pings vor dem Sturm
+
+    def _login():
+        if mode == "pool":
+            return pwpool.run("verify", check_password_hash, pw_hash, "secret")
+        return check_password_hash(pw_hash, "secret")
+
+    t0 = time.perf_counter()
+    pool = eventlet.GreenPool(logins)
+    results = list(pool.imap(lambda _: _login(), range(logins)))
+    took = time.perf_counter() - t0
+
+    stop.set()
+    eventlet.sleep(interval * 2)
+    t.join(timeout=5)
+    assert all(results)
+    return took, samples
+
+
+def _pct(vals, p):
+    vals = sorted(vals)
+    return vals[min(len(vals) - 1, int(len(vals) * p))]
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--logins", type=int, default=100)
+    ap.add_argument("--method", default="pbkdf2:sha256:100000",
+                    help="werkzeug-Hashmethode (Default: billiger als Produktion)")
+    ap.add_argument("--ping-ms", type=float, default=10.0)
+    args = ap.parse_args()
+
+    port = _echo_server()
+    pw_hash = generate_password_hash("secret", method=args.method)
+    interval = args.ping_ms / 1000
+
+    print(f"{args.logins} Logins, method={args.method}, "
+          f"PW_HASH_WORKERS={pwpool.MAX_WORKERS}, ping alle {args.ping_ms:.0f} ms")
+    print(f"{'mode':<8}{'total s':>9}{'pings':>7}{'p50 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+    for mode in ("inline", "pool"):
+        took, samples = _run(mode, port, pw_hash, args.logins, interval)
+        print(f"{mode:<8}{took:>9.2f}{len(samples):>7}"
+              f"{statistics.median(samples):>9.2f}{_pct(samples, 0.99):>9.2f}{max(samples):>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
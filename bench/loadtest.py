@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Lasttest für den kompletten Spielablauf gegen eine lokale mongod.
+
+Seedet einen Datensatz (bench/seed.py), startet die App in-process und
+treibt mit --concurrency Greenlets gemischten Traffic über den Flask-Test-
+Client und Socket.IO-Test-Clients:
+
+    register → login → new game → get → answer (Host per submit_answers, Freund per PATCH)
+    → finished/open → stats
+
+Ausgabe: Durchsatz und p50/p95/p99 pro Route. Mit --baseline wird gegen
+eine gespeicherte Messung verglichen (Exit-Code 1 bei Regression über
+--tolerance), mit --save-baseline wird sie geschrieben.
+
+Aufruf:
+    python bench/loadtest.py --users 200 --sessions 50 --iterations 20
+    python bench/loadtest.py --save-baseline bench/baseline.json
+    python bench/loadtest.py --baseline bench/baseline.json --tolerance 0.25
+"""
+import eventlet
+eventlet.monkey_patch()
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+# Bench-Defaults VOR dem App-Import: Limits aus, feste Hash-Kosten (reproduzierbar)
+for _k in ("LOGIN_RATE_IP", "LOGIN_RATE_USER", "REGISTER_RATE_IP", "REGISTER_RATE_USER",
+           "FEEDBACK_RATE_IP", "FEEDBACK_RATE_USER"):
+    os.environ.setdefault(_k, "1000000/1")
+os.environ.setdefault("ARGON2_TIME_COST", "2")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+import pymongo
+from flask import Flask
+
+from bench import seed as seeding
+
+PERCENTILES = (0.50, 0.95, 0.99)
+
+
+class Recorder:
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def call(self, label, fn, *args, ok=(200, 201), **kwargs):
+        t0 = time.perf_counter()
+        resp = fn(*args, **kwargs)
+        self.samples[label].append(time.perf_counter() - t0)
+        status = getattr(resp, "status_code", 200)
+        if isinstance(resp, dict):   # Socket-Ack
+            status = 200 if resp.get("ok") else resp.get("status", 500)
+        if status not in ok:
+            self.errors[label] += 1
+        return resp
+
+    def report(self, wall: float) -> dict:
+        out = {"wall_seconds": round(wall, 3), "routes": {}}
+        total = 0
+        for label, vals in sorted(self.samples.items()):
+            vals = sorted(vals)
+            total += len(vals)
+            row = {"count": len(vals), "errors": self.errors.get(label, 0)}
+            for p in PERCENTILES:
+                row[f"p{int(p * 100)}_ms"] = round(vals[min(len(vals) - 1, int(len(vals) * p))] * 1000, 3)
+            out["routes"][label] = row
+        out["throughput_rps"] = round(total / wall, 1) if wall else 0.0
+        return out
+
+
+def _auth(tok):
+    return {"Authorization": f"Bearer {tok}"}
+
+
+def session(app, socketio, rec: Recorder, rng: random.Random, names, qn, iterations, sid):
+    c = app.test_client()
+
+    # neuer User pro Session
+    new_name = f"newbie{sid:05d}{rng.randrange(10**6):06d}"
+    rec.call("POST /auth/register", c.post, "/auth/register",
+             json={"username": new_name, "password": seeding.PASSWORD})
+
+    for _ in range(iterations):
+        host, friend = rng.sample(names, 2)
+        r = rec.call("POST /auth/login", c.post, "/auth/login",
+                     json={"username": host, "password": seeding.PASSWORD})
+        h_tok = (r.get_json() or {}).get("access")
+        r = rec.call("POST /auth/login", c.post, "/auth/login",
+                     json={"username": friend, "password": seeding.PASSWORD})
+        f_tok = (r.get_json() or {}).get("access")
+        if not h_tok or not f_tok:
+            continue
+
+        sock = socketio.test_client(app, flask_test_client=c, auth={"token": h_tok})
+
+        qs = seeding.questions(rng, qn)
+        r = rec.call("POST /games/new", c.post, "/games/new",
+                     json={"friendName": friend, "questions": qs}, headers=_auth(h_tok))
+        gid = (r.get_json() or {}).get("id")
+        if not gid:
+            sock.disconnect()
+            continue
+
+        rec.call("GET /games/<gid>", c.get, f"/games/{gid}", headers=_auth(h_tok))
+        rec.call("socket:submit_answers", sock.emit, "submit_answers",
+                 {"gameId": gid, "answers": seeding.answers(rng, qs)}, callback=True)
+        rec.call("PATCH /games/<gid>/answer", c.patch, f"/games/{gid}/answer",
+                 json={"answers": seeding.answers(rng, qs)}, headers=_auth(f_tok))
+
+        rec.call("GET /games/open/<username>", c.get, f"/games/open/{host}", headers=_auth(h_tok))
+        rec.call("GET /games/finished/<username>", c.get, f"/games/finished/{host}", headers=_auth(h_tok))
+        rec.call("GET /analytics/stats/mine", c.get, "/analytics/stats/mine", headers=_auth(h_tok))
+        sock.disconnect()
+        eventlet.sleep(0)
+
+
+def compare(result: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Regressionen (p95 und p99) gegenüber der Baseline."""
+    problems = []
+    for label, row in result["routes"].items():
+        base = baseline.get("routes", {}).get(label)
+        if not base:
+            continue
+        for key in ("p95_ms", "p99_ms"):
+            if base[key] > 0 and row[key] > base[key] * (1 + tolerance):
+                problems.append(f"{label}: {key} {row[key]:.1f} ms > {base[key]:.1f} ms (+{tolerance:.0%})")
+    base_rps = baseline.get("throughput_rps", 0)
+    if base_rps and result["throughput_rps"] < base_rps * (1 - tolerance):
+        problems.append(f"Durchsatz {result['throughput_rps']} rps < {base_rps} rps (-{tolerance:.0%})")
+    return problems
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Lasttest für den Spielablauf")
+    ap.add_argument("--mongo-uri", default="mongodb://localhost:27017/WaffenkundeBench")
+    ap.add_argument("--users", type=int, default=200)
+    ap.add_argument("--friends-per-user", type=int, default=5)
+    ap.add_argument("--games", type=int, default=2000)
+    ap.add_argument("--attempts", type=int, default=20000)
+    ap.add_argument("--questions", type=int, default=10, help="Fragen pro neuem Spiel")
+    ap.add_argument("--sessions", type=int, default=50)
+    ap.add_argument("--iterations", type=int, default=20, help="Spiele pro Session")
+    ap.add_argument("--concurrency", type=int, default=20)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--baseline", help="JSON-Baseline zum Vergleichen")
+    ap.add_argument("--tolerance", type=float, default=0.2)
+    ap.add_argument("--save-baseline", help="Ergebnis als Baseline speichern")
+    args = ap.parse_args()
+
+    os.environ["MONGO_URI"] = args.mongo_uri
+
+    from app import create_app, credentials
+    from app.extensions import socketio
+
+    # feste Hash-Parameter (ARGON2_TIME_COST) → Seed-Hash passt zur App
+    credentials.init_credentials(Flask("bench"))
+    db = pymongo.MongoClient(args.mongo_uri).get_default_database()
+    counts = seeding.seed(db, users=args.users, friends_per_user=args.friends_per_user,
+                          games=args.games, attempts=args.attempts, seed=args.seed,
+                          pw_hash=credentials.hash_password(seeding.PASSWORD))
+    print("Datensatz:", counts)
+
+    app = create_app()
+    app.config["TESTING"] = True
+
+    names = [seeding.user_name(i) for i in range(args.users)]
+    rec = Recorder()
+    pool = eventlet.GreenPool(args.concurrency)
+    t0 = time.perf_counter()
+    for sid in range(args.sessions):
+        rng = random.Random(args.seed * 100_003 + sid)
+        pool.spawn_n(session, app, socketio, rec, rng, names, args.questions, args.iterations, sid)
+    pool.waitall()
+    result = rec.report(time.perf_counter() - t0)
+
+    print(f"\n{'Route':<34}{'n':>7}{'err':>5}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for label, row in result["routes"].items():
+        print(f"{label:<34}{row['count']:>7}{row['errors']:>5}"
+              f"{row['p50_ms']:>9.1f}{row['p95_ms']:>9.1f}{row['p99_ms']:>9.1f}")
+    print(f"\nDurchsatz: {result['throughput_rps']} req/s in {result['wall_seconds']} s")
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2, sort_keys=True)
+        print("Baseline gespeichert:", args.save_baseline)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            problems = compare(result, json.load(f), args.tolerance)
+        if problems:
+            print("\n❌ Regressionen:")
+            for p in problems:
+                print("  -", p)
+            sys.exit(1)
+        print("\n✅ keine Regression gegenüber", args.baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Erzeugt einen reproduzierbaren Datensatz (Users, Freundschaften, Spiele,
+Attempts) in einer lokalen Bench-Datenbank.
+
+Aufruf:
+    python bench/seed.py --mongo-uri mongodb://localhost:27017/WaffenkundeBench --users 200
+
+Alle User bekommen das Passwort PASSWORD. Es wird EIN Hash berechnet und
+für alle wiederverwendet – sonst dauert das Seeden länger als der Lauf.
+"""
+import argparse
+import datetime as dt
+import os
+import random
+import sys
+
+import pymongo
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+PASSWORD = "bench-pass"
+
+
+def user_name(i: int) -> str:
+    return f"bench{i:05d}"
+
+
+def questions(rng: random.Random, n: int) -> list[dict]:
+    return [{"questionId": f"q{rng.randrange(5000):04d}", "text": "Frage?"} for _ in range(n)]
+
+
+def answers(rng: random.Random, qs: list[dict]) -> list[dict]:
+    return [{"questionId": q["questionId"], "isCorrect": rng.random() < 0.6} for q in qs]
+
+
+def check_bench_db(db) -> None:
+    # Schutz vor versehentlichem Löschen echter Daten
+    if "bench" not in db.name.lower():
+        raise SystemExit(f"Datenbankname {db.name!r} enthält nicht 'bench' – Abbruch.")
+
+
+def seed(db, *, users: int, friends_per_user: int, games: int, attempts: int,
+         questions_per_game: int = 10, seed: int = 42, pw_hash: str) -> dict:
+    """Löscht die Bench-DB und füllt sie neu. Gibt die Mengen zurück."""
+    check_bench_db(db)
+    rng = random.Random(seed)
+    db.client.drop_database(db.name)
+    now = dt.datetime.now(dt.timezone.utc)
+
+    names = [user_name(i) for i in range(users)]
+    db["users"].insert_many([
+        {"username": n, "email": None, "passwordHash": pw_hash, "createdAt": now.isoformat()}
+        for n in names
+    ])
+
+    pairs = set()
+    for a in names:
+        for b in rng.sample(names, min(friends_per_user, users - 1)):
+            if a != b:
+                pairs.add((a, b))
+    fr = []
+    for a, b in pairs:
+        fr.append({"requester": a, "target": b, "status": "accepted",
+                   "createdAt": now.isoformat(), "respondedAt": now.isoformat(), "responder": b})
+    if fr:
+        db["friend_requests"].insert_many(fr, ordered=False)
+
+    pair_list = sorted(pairs)
+    docs = []
+    for i in range(games):
+        host, friend = pair_list[rng.randrange(len(pair_list))]
+        qs = questions(rng, questions_per_game)
+        finished = rng.random() < 0.7
+        ha, fa = answers(rng, qs), (answers(rng, qs) if finished else [])
+        created = now - dt.timedelta(minutes=games - i)
+        docs.append({
+            "hostName": host, "friendName": friend, "questions": qs,
+            "hostAnswers": ha, "friendAnswers": fa,
+            "createdAt": created.isoformat(),
+            "finished": finished,
+            "finishedAt": created.isoformat() if finished else None,
+            "hostCorrect": sum(a["isCorrect"] for a in ha),
+            "friendCorrect": sum(a["isCorrect"] for a in fa),
+            "hostSeenResult": finished, "friendSeenResult": False,
+            "totalQuestions": len(qs),
+        })
+        if len(docs) >= 1000:
+            db["games"].insert_many(docs)
+            docs = []
+    if docs:
+        db["games"].insert_many(docs)
+
+    batch = []
+    for i in range(attempts):
+        batch.append({
+            "username": names[rng.randrange(users)],
+            "questionId": f"q{rng.randrange(5000):04d}",
+            "timestamp": (now - dt.timedelta(seconds=i)).isoformat(),
+            "isCorrect": rng.random() < 0.6,
+            "sessionId": f"s{i // 20}",
+            "chapterTitle": "", "subchapterId": "", "subchapterTitle": "",
+        })
+        if len(batch) >= 5000:
+            db["question_attempts"].insert_many(batch)
+            batch = []
+    if batch:
+        db["question_attempts"].insert_many(batch)
+
+    return {"users": users, "friendships": len(pairs), "games": games, "attempts": attempts}
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Bench-Datensatz erzeugen")
+    ap.add_argument("--mongo-uri", default="mongodb://localhost:27017/WaffenkundeBench")
+    ap.add_argument("--users", type=int, default=200)
+    ap.add_argument("--friends-per-user", type=int, default=5)
+    ap.add_argument("--games", type=int, default=2000)
+    ap.add_argument("--attempts", type=int, default=20000)
+    ap.add_argument("--seed", type=int, default=42)
+    args = ap.parse_args()
+
+    from flask import Flask
+    from app import credentials
+    credentials.init_credentials(Flask("seed"))
+    db = pymongo.MongoClient(args.mongo_uri).get_default_database()
+    counts = seed(db, users=args.users, friends_per_user=args.friends_per_user,
+                  games=args.games, attempts=args.attempts, seed=args.seed,
+                  pw_hash=credentials.hash_password(PASSWORD))
+    print("geseedet:", counts)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+from bson import ObjectId
+from flask import Flask
+from flask_jwt_extended import JWTManager, create_access_token
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from app import chat
+from app.blueprints.chat import chat_bp
+
+
+def test_conversation_id_is_symmetric_and_unambiguous():
+    assert chat.conversation_id("max", "anna") == chat.conversation_id("anna", "max")
+    assert chat.conversation_id("a|b", "c") != chat.conversation_id("a", "b|c")
+
+
+def test_send_validates_before_touching_db():
+    for to, text in (("", "hi"), ("anna", "  "), ("max", "hi"), ("anna", "x" * (chat.MAX_CHARS + 1)),
+                     (["anna"], "hi"), ("anna", {"t": 1}), (None, "hi"), ("anna", 5)):
+        with pytest.raises(chat.ChatError):
+            chat.send(None, "max", to, text)
+
+
+class _DB:
+    """Zeichnet Updates auf; update_many meldet 3 geänderte Nachrichten."""
+
+    def __init__(self, read_up_to=None):
+        self.calls = []
+        self.read_up_to = read_up_to
+
+    def __getitem__(self, name):
+        db = self
+
+        class _Coll:
+            def find_one(self, flt, projection=None):
+                return {"_id": flt["_id"], "members": [{"u": "max", "unread": 3, "readUpTo": db.read_up_to},
+                                                       {"u": "anna", "unread": 0, "readUpTo": None}]}
+
+            def update_many(self, flt, upd):
+                db.calls.append(("many", name, flt, upd))
+                return SimpleNamespace(modified_count=3)
+
+            def update_one(self, flt, upd):
+                db.calls.append(("one", name, flt, upd))
+        return _Coll()
+
+
+def test_mark_read_is_one_update_many_plus_counter():
+    db = _DB()
+    upto = ObjectId()
+    assert chat.mark_read(db, "max", "anna", str(upto)) == 3
+    (k1, c1, flt, _), (k2, c2, cflt, cupd) = db.calls
+    assert (k1, c1, k2, c2) == ("many", chat.MESSAGES, "one", chat.CONVERSATIONS)
+    assert flt["_id"] == {"$lte": upto} and flt["to"] == "max"
+    assert cflt == {"_id": chat.conversation_id("max", "anna"), "members.u": "max"}
+    assert cupd["$inc"] == {"members.$.unread": -3}
+
+
+def test_mark_read_scans_only_after_previous_read_marker():
+    prev, upto = ObjectId(), ObjectId()
+    db = _DB(read_up_to=prev)
+    chat.mark_read(db, "max", "anna", str(upto))
+    assert db.calls[0][2]["_id"] == {"$gt": prev, "$lte": upto}
+
+    db = _DB(read_up_to=upto)
+    assert chat.mark_read(db, "max", "anna", str(prev)) == 0    # älter als der Stand → nichts zu tun
+    assert db.calls == []
+
+
+def test_mark_read_rejects_missing_up_to():
+    for bad in (None, "", 42, "kein-objectid"):
+        with pytest.raises(chat.ChatError):
+            chat.mark_read(_DB(), "max", "anna", bad)
+
+
+def test_bad_limit_is_400_not_500():
+    app = Flask(__name__)
+    app.config["JWT_SECRET_KEY"] = "test-secret"
+    JWTManager(app)
+    app.register_blueprint(chat_bp)
+    with app.app_context():
+        token = create_access_token(identity="max")
+    client = app.test_client()
+    for path in ("/chat/conversations?limit=abc", "/chat/anna/messages?limit=1.5"):
+        r = client.get(path, headers={"Authorization": f"Bearer {token}"})
+        assert r.status_code == 400
@@ -0,0 +1,112 @@
+import os
+import sys
+import io
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from bson import ObjectId
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from app import columnar
+
+
+def test_select_columns_and_projection():
+    cols = columnar.select_columns("games", "id, hostAnswered,createdAt")
+    assert cols == ["id", "hostAnswered", "createdAt"]
+    assert columnar.projection("games", cols) == {"_id": 1, "hostAnswers": 1, "createdAt": 1, "finishedAt": 1}
+    with pytest.raises(columnar.ExportError):
+        columnar.select_columns("games", "id,passwordHash")
+    with pytest.raises(columnar.ExportError):
+        columnar.select_columns("users", None)
+
+
+def test_to_columns_types_values():
+    oid = ObjectId()
+    docs = [{"_id": oid, "hostAnswers": [{}, {}], "createdAt": "2024-05-01T10:00:00+00:00",
+             "questions": [{"questionId": "q1"}]},
+            {"_id": oid, "createdAt": None}]
+    out = columnar.to_columns("games", ["id", "hostAnswered", "createdAt", "questionIds"], docs)
+    assert out["id"] == [str(oid), str(oid)]
+    assert out["hostAnswered"] == [2, 0]
+    assert out["createdAt"] == [datetime(2024, 5, 1, 10, tzinfo=timezone.utc), None]
+    assert out["questionIds"] == [["q1"], []]
+
+
+@pytest.mark.skipif(columnar.available(), reason="pyarrow installiert")
+def test_export_without_pyarrow_is_reported():
+    with pytest.raises(columnar.ExportError):
+        columnar.Export(None, "games")
+
+
+def test_query_respects_watermark_and_safety_lag():
+    now = datetime(2024, 5, 1, 12, tzinfo=timezone.utc)
+    cutoff = now - timedelta(seconds=columnar.SAFETY_LAG)
+    last = ObjectId()
+    q = columnar.query("question_attempts", None, last, now=now)
+    assert q == {"_id": {"$gt": last, "$lt": ObjectId.from_datetime(cutoff)}}
+
+    q = columnar.query("games", "2024-05-01T10:00:00+00:00", last, now=now)
+    assert q["$and"][0] == {"finished": True}
+    assert q["$and"][1] == {"finishedAt": {"$lt": cutoff.isoformat()}}
+    assert {"finishedAt": "2024-05-01T10:00:00+00:00", "_id": {"$gt": last}} in q["$and"][2]["$or"]
+    assert columnar.sort_keys("games") == [("finishedAt", 1), ("_id", 1)]
+
+
+class _Cursor(list):
+    def sort(self, keys):
+        return self
+
+    def batch_size(self, n):
+        return self
+
+    def close(self):
+        pass
+
+
+class _Games:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def find(self, q, projection=None):
+        return _Cursor(self.docs)
+
+
+class _Watermarks:
+    def __init__(self):
+        self.doc = None
+
+    def find_one(self, flt, projection=None):
+        return self.doc
+
+    def update_one(self, flt, upd, upsert=False):
+        self.doc = dict(upd["$set"])
+
+
+@pytest.mark.parametrize("fmt", ["parquet", "arrow"])
+def test_export_roundtrip(fmt):
+    pa = pytest.importorskip("pyarrow")
+    import pyarrow.parquet as pq
+
+    docs = [{"_id": ObjectId(), "hostName": f"h{i}", "finished": True,
+             "finishedAt": f"2024-05-01T10:00:0{i}+00:00", "questions": [{"questionId": f"q{i}"}]}
+            for i in range(5)]
+    wm = _Watermarks()
+    db = {"games": _Games(docs), columnar.WATERMARKS: wm}
+    export = columnar.Export(db, "games", fmt=fmt, columns="id,hostName,finishedAt,questionIds",
+                             incremental="daily", row_group=2)
+    data = b"".join(export)
+    export.commit()
+
+    if fmt == "parquet":
+        f = pq.ParquetFile(io.BytesIO(data))
+        assert f.metadata.num_row_groups == 3
+        table = f.read()
+    else:
+        table = pa.ipc.open_stream(data).read_all()
+    assert table.column_names == ["id", "hostName", "finishedAt", "questionIds"]
+    assert table.column("hostName").to_pylist() == [d["hostName"] for d in docs]
+    assert table.column("questionIds").to_pylist()[4] == ["q4"]
+    assert wm.doc["lastId"] == docs[-1]["_id"] and wm.doc["lastKey"] == docs[-1]["finishedAt"]
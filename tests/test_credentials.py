@@ -0,0 +1,53 @@
+import os
+import sys
+
+from argon2 import PasswordHasher
+from argon2.low_level import Type
+from werkzeug.security import generate_password_hash
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from app import credentials
+
+
+def test_calibrate_respects_memory_floor():
+    ph = credentials.calibrate(target_ms=1, memory_kib=1024)
+    assert ph.memory_cost == credentials.MIN_MEMORY_KIB
+    assert ph.time_cost == 1
+
+
+def test_legacy_formats_verify_and_need_rehash():
+    """werkzeug-Hash und Klartext werden akzeptiert, aber zum Rehash markiert."""
+    werkzeug_doc = {"passwordHash": generate_password_hash("pw", method="pbkdf2:sha256:1000")}
+    assert credentials._check(werkzeug_doc, "pw") == (True, True)
+    assert credentials._check(werkzeug_doc, "nope") == (False, False)
+
+    plain_doc = {"password": "pw"}
+    assert credentials._check(plain_doc, "pw") == (True, True)
+    assert credentials._check(plain_doc, "nope") == (False, False)
+
+
+def test_current_argon2_hash_needs_no_rehash():
+    doc = {"passwordHash": credentials.hash_password("pw")}
+    assert credentials._check(doc, "pw") == (True, False)
+
+    # alter Argon2-Hash aus dem name/pwHash-Schema → Feld migrieren
+    old = {"pwHash": doc["passwordHash"]}
+    assert credentials._check(old, "pw") == (True, True)
+
+
+def test_rehash_only_when_parameters_increase(monkeypatch):
+    cur = credentials._hasher
+    kw = dict(memory_cost=cur.memory_cost, parallelism=cur.parallelism, type=Type.ID)
+    stronger = PasswordHasher(time_cost=cur.time_cost + 1, **kw).hash("pw")
+    assert credentials._check({"passwordHash": stronger}, "pw") == (True, False)
+
+    monkeypatch.setattr(credentials, "_hasher", PasswordHasher(time_cost=cur.time_cost + 2, **kw))
+    assert credentials._check({"passwordHash": stronger}, "pw") == (True, True)
+
+
+def test_public_user_strips_secrets():
+    doc = {"username": "max", "passwordHash": "x", "pwHash": "y", "password": "z"}
+    assert credentials.public_user(doc) == {"username": "max"}
@@ -0,0 +1,166 @@
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+import pytest
+from bson import ObjectId
+from pymongo.errors import AutoReconnect, BulkWriteError
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from app import duels
+
+
+@pytest.fixture
+def mgr(monkeypatch):
+    m = duels.DuelManager()
+    m.sent = []
+    monkeypatch.setattr(m, "_emit", lambda event, data, room: m.sent.append((event, room, data)))
+    return m
+
+
+def _duel(n=2):
+    qs = [{"questionId": f"q{i}"} for i in range(n)]
+    return duels.Duel(str(ObjectId()), "max", "anna", qs, round_seconds=10)
+
+
+def test_round_closes_early_when_both_answered(mgr):
+    d = _duel()
+    mgr._adopt(d)
+    mgr.tick()
+    assert [e for e, _, _ in mgr.sent] == ["duel_round", "duel_round"]
+
+    mgr.answer("max", d.gid, 0, True)
+    with pytest.raises(duels.DuelError):
+        mgr.answer("max", d.gid, 0, True)          # doppelt
+    mgr.answer("anna", d.gid, 0, False)
+    assert d.round == 1 and d.scores() == {"max": 1, "anna": 0}
+    assert len(mgr._pending) == 1                  # ein Checkpoint pro Runde, nicht pro Antwort
+
+
+def test_timeout_and_finish(mgr):
+    d = _duel(n=1)
+    mgr._adopt(d)
+    mgr.tick()
+    mgr.answer("anna", d.gid, 0, True)
+    mgr.tick(time.monotonic() + 60)                # Deadline verstrichen
+    assert d.gid not in mgr.duels
+    upd = mgr._pending[-1]._doc
+    assert upd["$push"]["hostAnswers"]["timeout"] is True
+    assert upd["$set"]["finished"] is True and upd["$set"]["friendCorrect"] == 1
+    assert ("duel_finished", "max", {"gameId": d.gid, "scores": {"max": 0, "anna": 1}}) in mgr.sent
+    with pytest.raises(duels.DuelError):
+        mgr.answer("anna", d.gid, 0, True)
+
+
+class _Games:
+    def __init__(self, error=None, owned=()):
+        self.error = error
+        self.owned = set(owned)
+        self.batches = []
+
+    def bulk_write(self, ops, ordered=True):
+        self.batches.append(list(ops))
+        if self.error is not None:
+            raise self.error
+
+    def update_many(self, flt, upd):
+        n = sum(1 for i in flt["_id"]["$in"] if str(i) in self.owned)
+        return SimpleNamespace(matched_count=n, modified_count=n)
+
+    def find(self, flt, projection=None):
+        return [{"_id": i} for i in flt["_id"]["$in"] if str(i) in self.owned]
+
+
+def test_checkpoint_filters_on_round_before_update(mgr):
+    d = _duel()
+    mgr._adopt(d)
+    mgr.tick()
+    mgr.answer("max", d.gid, 0, True)
+    mgr.answer("anna", d.gid, 0, True)
+    op = mgr._pending[0]
+    assert op._filter["duel.round"] == 0 and op._doc["$set"]["duel.round"] == 1
+
+
+def test_flush_requeues_only_unapplied_ops(mgr):
+    ops = [object(), object(), object()]
+    err = BulkWriteError({"writeErrors": [{"index": 1, "errmsg": "boom"}]})
+    mgr._db = SimpleNamespace(games=_Games(error=err))
+    mgr._pending = list(ops)
+    mgr.flush()
+    assert mgr._pending == ops[2:]                 # 0 geschrieben, 1 verworfen
+
+    mgr._db = SimpleNamespace(games=_Games(error=AutoReconnect("weg")))
+    mgr._pending = list(ops)
+    mgr.flush()
+    assert mgr._pending == ops                     # Ausgang unbekannt → alles nochmal
+
+
+def test_renew_leases_drops_lost_duels(mgr):
+    kept, lost = _duel(), _duel()
+    mgr._adopt(kept)
+    mgr._adopt(lost)
+    mgr._db = SimpleNamespace(games=_Games(owned={kept.gid}))
+    mgr.renew_leases()
+    assert set(mgr.duels) == {kept.gid}
+
+
+def test_create_validates_questions(mgr):
+    for qs in ([{"text": "ohne id"}], ["q1"], [None]):
+        with pytest.raises(duels.DuelError):
+            mgr.create(None, "max", "anna", qs)
+
+
+class _Invites:
+    """Wartende Duelle; find_one_and_delete wertet nur _id und den Teilnehmer-Filter aus."""
+
+    def __init__(self, *docs):
+        self.docs = {d["_id"]: d for d in docs}
+        self.filters = []
+
+    def find(self, flt, projection=None):
+        self.filters.append(flt)
+        return SimpleNamespace(limit=lambda n: [{"_id": i} for i in list(self.docs)[:n]])
+
+    def find_one_and_delete(self, flt, projection=None):
+        self.filters.append(flt)
+        doc = self.docs.get(flt["_id"])
+        users = [next(iter(c.values())) for c in flt.get("$or", [])]
+        if doc is None or (users and _not_in(doc, users)):
+            return None
+        return self.docs.pop(flt["_id"])
+
+
+def _not_in(doc, users):
+    return not {doc["hostName"], doc["friendName"]} & set(users)
+
+
+def _invite():
+    return {"_id": ObjectId(), "hostName": "max", "friendName": "anna"}
+
+
+def test_decline_removes_invite_and_notifies_both(mgr):
+    doc = _invite()
+    games = _Invites(doc)
+    with pytest.raises(duels.DuelError):
+        mgr.decline(SimpleNamespace(games=games), "tom", str(doc["_id"]))   # nicht beteiligt
+    mgr.decline(SimpleNamespace(games=games), "anna", str(doc["_id"]))
+    assert not games.docs and games.filters[-1]["duel.status"] == "waiting"
+    assert {room for e, room, _ in mgr.sent if e == "duel_cancelled"} == {"max", "anna"}
+    with pytest.raises(duels.DuelError):
+        mgr.decline(SimpleNamespace(games=games), "anna", str(doc["_id"]))  # schon weg
+
+
+def test_expire_invites_only_notifies_what_it_deleted(mgr):
+    a, b = _invite(), _invite()
+    games = _Invites(a, b)
+    mgr._db = SimpleNamespace(games=games)
+    real = games.find_one_and_delete
+    games.find_one_and_delete = lambda flt, projection=None: (
+        None if flt["_id"] == b["_id"] else real(flt, projection))        # b: duel_join war schneller
+    assert mgr.expire_invites() == 1
+    assert "$lt" in games.filters[0]["duel.inviteUntil"]
+    assert [d["gameId"] for e, _, d in mgr.sent if e == "duel_cancelled"] == [str(a["_id"])] * 2
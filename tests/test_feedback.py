@@ -0,0 +1,307 @@
+import csv
+import io
+import os
+import sys
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+from bson import ObjectId
+from flask import Flask
+from flask_jwt_extended import JWTManager
+from pymongo.errors import DuplicateKeyError
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from app import feedback_stats
+from app.blueprints import feedback
+
+
+def test_export_filter_dates_and_question():
+    q = feedback._export_filter({"from": "2024-03-01", "to": "2024-03-31", "questionId": " q7 ", "resolved": "false"})
+    assert q == {
+        "resolved": False,
+        "questionId": "q7",
+        "createdAt": {"$gte": "2024-03-01T00:00:00+00:00", "$lt": "2024-04-01T00:00:00+00:00"},
+    }
+    assert feedback._export_filter({"from": "2024-03-01T12:00:00+02:00"})["createdAt"] == {
+        "$gte": "2024-03-01T10:00:00+00:00"
+    }
+    with pytest.raises(ValueError):
+        feedback._export_filter({"to": "gestern"})
+
+
+def test_csv_export_is_lazy():
+    consumed = 0
+
+    def docs():
+        nonlocal consumed
+        for i in range(100_000):
+            consumed += 1
+            yield {"_id": i, "createdAt": "2024", "feedback": "Zeile\nzwei", "meta": {"v": i}}
+
+    chunks = feedback._chunked(feedback._csv_lines(docs()))
+    first = next(chunks)
+    # erster Block kommt, lange bevor alle Dokumente gelesen sind
+    assert consumed < 5_000
+    rows = list(csv.reader(io.StringIO(first)))
+    assert rows[0][0] == "id" and rows[1][5] == "Zeile zwei" and rows[1][9] == '{"v":0}'
+
+
+def test_cursor_roundtrip_builds_keyset_condition():
+    oid = ObjectId()
+    token = feedback._encode_cursor({"_id": oid, "createdAt": "2024-05-01T10:00:00+00:00"})
+    cond = feedback._decode_cursor(token)
+    assert cond == {"$or": [
+        {"createdAt": {"$lt": "2024-05-01T10:00:00+00:00"}},
+        {"createdAt": "2024-05-01T10:00:00+00:00", "_id": {"$lt": oid}},
+    ]}
+    with pytest.raises(ValueError):
+        feedback._decode_cursor("kaputt")
+
+
+def test_search_cursor_roundtrip():
+    oid = ObjectId()
+    token = feedback._encode_search_cursor({"_id": oid, "score": 1.5, "createdAt": "2024-05-01T10:00:00+00:00"})
+    cond = feedback._decode_search_cursor(token)
+    assert cond["$or"][0] == {"score": {"$lt": 1.5}}
+    assert cond["$or"][2]["_id"] == {"$lt": oid}
+    # normaler Listen-Cursor taugt nicht für die Suche
+    with pytest.raises(ValueError):
+        feedback._decode_search_cursor(feedback._encode_cursor({"_id": oid, "createdAt": "x"}))
+
+
+def test_build_doc_caps_meta_size():
+    app = Flask(__name__)
+    with app.test_request_context():
+        doc = feedback._build_doc({"questionId": "q1", "feedback": " ok ", "meta": {"v": 1}}, "max", "t")
+        assert doc["feedback"] == "ok" and doc["username"] == "max"
+        with pytest.raises(feedback._Invalid) as e:
+            feedback._build_doc({"questionId": "q1", "feedback": "x",
+                                 "meta": {"blob": "x" * feedback._META_MAX_BYTES}}, None, "t")
+        assert e.value.status == 413
+
+
+class _Recorder:
+    """Zeichnet Updates auf; find liefert `open_docs` (die offenen Meldungen)."""
+
+    def __init__(self, open_docs=()):
+        self.calls = []
+        self.open_docs = list(open_docs)
+
+    def __getitem__(self, name):
+        rec = self
+
+        class _Cursor(list):
+            def sort(self, keys):
+                return self
+
+            def limit(self, n):
+                return _Cursor(self[:n])
+
+        class _Coll:
+            def update_one(self, flt, upd, upsert=False):
+                rec.calls.append((name, flt, upd))
+
+            def find(self, flt, projection=None):
+                rec.calls.append((name, flt, None))
+                return _Cursor(rec.open_docs)
+        return _Coll()
+
+
+def test_question_aggregate_updates(monkeypatch):
+    monkeypatch.setattr(feedback_stats, "_migrated", True)
+    oid, other = ObjectId(), ObjectId()
+    db = _Recorder(open_docs=[{"_id": other, "feedback": "noch offen", "username": "anna", "createdAt": "2023"}])
+    feedback_stats.on_created(db, {"_id": oid, "questionId": "q7", "questionText": "Was?",
+                                   "feedback": "x" * 500, "username": "max", "createdAt": "2024"})
+    feedback_stats.on_resolved_changed(db, str(oid), "q7", True)
+
+    (c1, _, all_inc), (c2, q, created), (c3, _, all_dec), (c4, open_q, _), (c5, _, resolved) = db.calls
+    assert (c1, c2, c3, c4, c5) == ("feedback_counters", "feedback_questions", "feedback_counters",
+                                    "feedback", "feedback_questions")
+    assert q == {"_id": "q7"} and created["$max"] == {"lastReportAt": "2024"}
+    sample = created["$push"]["samples"]
+    assert sample["$slice"] == feedback_stats.SAMPLES and len(sample["$each"][0]["feedback"]) == feedback_stats.SAMPLE_CHARS
+    assert all_dec == {"$inc": {"open": -1}}
+    # erledigte Meldung fliegt raus, die nächste offene rückt nach
+    assert open_q == {"questionId": "q7", "resolved": {"$ne": True}}
+    assert resolved == {"$inc": {"openCount": -1}, "$set": {"samples": [
+        {"id": str(other), "feedback": "noch offen", "username": "anna", "createdAt": "2023"}]}}
+
+
+def test_reopened_feedback_returns_to_samples(monkeypatch):
+    monkeypatch.setattr(feedback_stats, "_migrated", True)
+    oid = ObjectId()
+    db = _Recorder(open_docs=[{"_id": oid, "feedback": "wieder offen", "username": "max", "createdAt": "2024"}])
+    feedback_stats.on_resolved_changed(db, str(oid), "q7", False)
+    _, _, reopened = db.calls[-1]
+    assert reopened["$inc"] == {"openCount": 1}
+    assert [s["id"] for s in reopened["$set"]["samples"]] == [str(oid)]
+
+
+def _matches(doc, flt):
+    for key, cond in flt.items():
+        if key == "$or":
+            if not any(_matches(doc, c) for c in cond):
+                return False
+            continue
+        value = doc.get(key)
+        if not isinstance(cond, dict):
+            if value != cond:
+                return False
+        elif "$exists" in cond and (key in doc) != cond["$exists"]:
+            return False
+        elif "$lt" in cond and not (value is not None and value < cond["$lt"]):
+            return False
+        elif "$size" in cond and len(value or []) != cond["$size"]:
+            return False
+    return True
+
+
+class _Counters:
+    """feedback_counters mit dem Upsert-/Filterverhalten, das Marker und Hooks brauchen."""
+
+    def __init__(self, docs=None):
+        self.docs = {k: dict(v) for k, v in (docs or {}).items()}
+        self.incs = []
+
+    def find_one(self, flt, projection=None):
+        return self.docs.get(flt["_id"])
+
+    def update_one(self, flt, upd, upsert=False):
+        doc = self.docs.get(flt["_id"])
+        if doc is None or not _matches(doc, flt):
+            if doc is not None and upsert:
+                raise DuplicateKeyError("E11000 _id")
+            if doc is None and upsert:
+                doc = self.docs[flt["_id"]] = {"_id": flt["_id"], **upd.get("$setOnInsert", {})}
+            else:
+                return SimpleNamespace(matched_count=0)
+        doc.update(upd.get("$set", {}))
+        for field, spec in upd.get("$addToSet", {}).items():
+            doc[field] = sorted(set(doc.get(field, [])) | set(spec["$each"]))
+        for field, spec in upd.get("$pull", {}).items():
+            doc[field] = [v for v in doc.get(field, []) if v not in spec["$in"]]
+        if "$inc" in upd:
+            self.incs.append((flt["_id"], upd["$inc"]))
+        return SimpleNamespace(matched_count=1)
+
+
+class _Questions:
+    def __init__(self):
+        self.writes = []
+
+    def update_one(self, flt, upd, upsert=False):
+        self.writes.append(flt["_id"])
+
+
+@pytest.fixture
+def pending(monkeypatch):
+    monkeypatch.setattr(feedback_stats, "_migrated", False)
+    built = []
+    monkeypatch.setattr(feedback_stats, "rebuild", lambda db, qids=None: built.append(qids))
+    db = {feedback_stats.COUNTERS: _Counters(), feedback_stats.QUESTIONS: _Questions()}
+    return db, built
+
+
+def _created(qid):
+    return {"_id": ObjectId(), "questionId": qid, "feedback": "x", "createdAt": "2024"}
+
+
+def test_hooks_defer_to_pending_migration(pending):
+    db, built = pending
+    counters, questions = db[feedback_stats.COUNTERS], db[feedback_stats.QUESTIONS]
+    # vor dem Index-Task: kein $inc, nur die Frage im Marker vermerkt
+    feedback_stats.on_created(db, _created("q1"))
+    feedback_stats.on_created_many(db, [_created("q2"), _created("q1")])
+    assert counters.incs == [] and questions.writes == []
+    assert counters.docs["migration"]["dirty"] == ["q1", "q2"]
+
+    assert feedback_stats.migrate(db) is True
+    assert built == [None, ["q1", "q2"]]            # voller Neuaufbau, dann dirty nachrechnen
+    assert counters.docs["migration"]["version"] == feedback_stats.VERSION
+    assert feedback_stats.migrate(db) is False
+
+    feedback_stats.on_created(db, _created("q3"))  # Marker gesetzt → Hooks schreiben wieder
+    assert feedback_stats._migrated and questions.writes == ["q3"]
+
+
+def test_migration_waits_for_late_dirty_questions(pending, monkeypatch):
+    db, built = pending
+    counters = db[feedback_stats.COUNTERS]
+    calls = []
+
+    def _rebuild(db_, qids=None):
+        calls.append(qids)
+        if qids is None:                            # Hook feuert mitten im Neuaufbau
+            feedback_stats.on_created(db, _created("q9"))
+        elif qids == ["q9"] and len(calls) == 2:    # … und noch einmal beim Nachrechnen
+            feedback_stats.on_created(db, _created("q8"))
+
+    monkeypatch.setattr(feedback_stats, "rebuild", _rebuild)
+    assert feedback_stats.migrate(db) is True
+    assert calls == [None, ["q9"], ["q8"]]
+    assert counters.docs["migration"]["dirty"] == []
+
+
+def test_migration_claimed_elsewhere_returns_immediately(pending):
+    db, built = pending
+    db[feedback_stats.COUNTERS].docs["migration"] = {"_id": "migration", "version": 0,
+                                                     "startedAt": datetime.now(timezone.utc)}
+    assert feedback_stats.migrate(db) is False and built == []
+
+
+class _BatchDB:
+    """Nimmt insert_many/Aggregat-Updates entgegen; keine Duplikate in der DB."""
+
+    def __init__(self):
+        self.inserted = []
+
+    def __getitem__(self, name):
+        db = self
+
+        class _Coll:
+            def insert_many(self, docs, ordered=True):
+                for d in docs:
+                    d["_id"] = ObjectId()
+                db.inserted.extend(docs)
+
+            def find(self, flt, projection=None):
+                return []
+
+            def update_one(self, flt, upd, upsert=False):
+                pass
+
+            def bulk_write(self, ops, ordered=True):
+                pass
+        return _Coll()
+
+
+@pytest.fixture
+def batch_client():
+    app = Flask(__name__)
+    app.config.update(JWT_SECRET_KEY="test-secret")
+    JWTManager(app)
+    db = _BatchDB()
+    app.config["MONGO_CLIENT"] = SimpleNamespace(get_default_database=lambda: db)
+    app.register_blueprint(feedback.feedback_bp, url_prefix="/feedback")
+    client = app.test_client()
+    client.db = db
+    return client
+
+
+def test_batch_rejects_non_object_body(batch_client):
+    assert batch_client.post("/feedback/batch", json=[{"clientId": "a"}]).status_code == 400
+
+
+def test_batch_accepts_corrected_retry_of_invalid_item(batch_client):
+    r = batch_client.post("/feedback/batch", json={"items": [
+        {"clientId": "a", "questionId": "q1"},                      # ohne feedback → invalid
+        {"clientId": "a", "questionId": "q1", "feedback": "jetzt richtig"},
+    ]})
+    assert r.status_code == 200
+    assert [i["status"] for i in r.get_json()["items"]] == ["invalid", "created"]
+    assert [d["feedback"] for d in batch_client.db.inserted] == ["jetzt richtig"]
@@ -0,0 +1,84 @@
+import copy
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+from bson import ObjectId
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from app import gameplay
+
+
+class _Games:
+    """Ein Spiel im Speicher; find_one_and_update wendet nur $set an."""
+
+    def __init__(self, doc):
+        self.doc = doc
+        self.finish_updates = []
+        self.before_write = None     # Hook: läuft zwischen Lesen und Schreiben
+
+    def find_one(self, flt, projection=None):
+        return copy.deepcopy(self.doc) if flt["_id"] == self.doc["_id"] else None
+
+    def find_one_and_update(self, flt, upd, projection=None, return_document=None):
+        hook, self.before_write = self.before_write, None
+        if hook:
+            hook()
+        if any(self.doc.get(k) != v for k, v in flt.items()):
+            return None
+        self.doc.update(upd["$set"])
+        return copy.deepcopy(self.doc)
+
+    def update_one(self, flt, upd):
+        self.finish_updates.append(upd["$set"])
+        self.doc.update(upd["$set"])
+        return SimpleNamespace(modified_count=1)
+
+
+@pytest.fixture
+def db(monkeypatch):
+    sent = []
+    monkeypatch.setattr(gameplay, "_emit", lambda event, data, room, **kw: sent.append((event, room, data)))
+    monkeypatch.setattr(gameplay, "_open_games_with_badge", lambda user: ([], 1))
+    doc = {"_id": ObjectId(), "hostName": "max", "friendName": "anna", "finished": False,
+           "questions": [{"questionId": "q1"}, {"questionId": "q2"}],
+           "hostAnswers": [{"questionId": "q1", "isCorrect": False}],
+           "friendAnswers": [{"questionId": "q1", "isCorrect": True}, {"questionId": "q2", "isCorrect": True}]}
+    return SimpleNamespace(games=_Games(doc), sent=sent, gid=str(doc["_id"]))
+
+
+def test_submit_merges_finishes_and_notifies(db):
+    res = gameplay.submit_answers(db, db.gid, "max", [{"questionId": "q1", "isCorrect": True},
+                                                      {"questionId": "q2", "isCorrect": True}])
+    assert res == {"gameId": db.gid, "hostAnswered": 2, "friendAnswered": 2, "totalQuestions": 2, "finished": True}
+    assert [a["questionId"] for a in db.games.doc["hostAnswers"]] == ["q1", "q2"]
+    assert db.games.finish_updates[0]["hostCorrect"] == 2
+    assert ("game_progress", "anna", {"gameId": db.gid, "answered": 2}) in db.sent
+
+
+def test_interleaved_submits_keep_both_batches(db):
+    db.games.doc["friendAnswers"] = []
+    first = [{"questionId": "q1", "isCorrect": True}]
+    second = [{"questionId": "q2", "isCorrect": False}]
+    # zweiter Batch schreibt, während der erste schon gelesen hat
+    db.games.before_write = lambda: gameplay.submit_answers(db, db.gid, "anna", second)
+    gameplay.submit_answers(db, db.gid, "anna", first)
+    assert sorted(a["questionId"] for a in db.games.doc["friendAnswers"]) == ["q1", "q2"]
+
+
+@pytest.mark.parametrize("gid,user,answers,status", [
+    (None, "max", [], 400),
+    (None, "max", [{"questionId": ["q1"]}], 400),
+    (None, "max", [{"questionId": {"id": "q1"}}], 400),
+    ("kaputt", "max", [{"questionId": "q1"}], 400),
+    (None, "eve", [{"questionId": "q1"}], 403),
+    (str(ObjectId()), "max", [{"questionId": "q1"}], 404),
+])
+def test_submit_errors(db, gid, user, answers, status):
+    with pytest.raises(gameplay.AnswerError) as e:
+        gameplay.submit_answers(db, gid or db.gid, user, answers)
+    assert e.value.status == status
@@ -0,0 +1,48 @@
+import datetime as dt
+import os
+import sys
+
+import pytest
+from bson import Decimal128, ObjectId
+from flask import Flask, jsonify
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from app import jsonprovider
+from app.jsonprovider import FastJSONProvider, SocketJSON
+
+OID = ObjectId("65a1b2c3d4e5f60718293a4b")
+DOC = {
+    "_id": OID,
+    "createdAt": dt.datetime(2024, 1, 2, 3, 4, 5),
+    "score": Decimal128("1.50"),
+    "answers": [{"questionId": "q1", "isCorrect": True}],
+}
+EXPECTED = {
+    "_id": str(OID),
+    "createdAt": "2024-01-02T03:04:05+00:00",
+    "score": "1.50",
+    "answers": [{"questionId": "q1", "isCorrect": True}],
+}
+
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_bson_types_in_responses_and_socket_payloads(monkeypatch, use_orjson):
+    if not use_orjson:
+        monkeypatch.setattr(jsonprovider, "orjson", None)
+    elif jsonprovider.orjson is None:
+        pytest.skip("orjson nicht installiert")
+
+    app = Flask(__name__)
+    app.json = FastJSONProvider(app)
+
+    @app.get("/doc")
+    def doc():
+        return jsonify(DOC)
+
+    r = app.test_client().get("/doc")
+    assert r.status_code == 200 and r.mimetype == "application/json"
+    assert r.get_json() == EXPECTED
+    assert SocketJSON.loads(SocketJSON.dumps(DOC, separators=(",", ":"))) == EXPECTED
@@ -0,0 +1,91 @@
+import os
+import sys
+
+import pytest
+from flask import Flask, jsonify
+from flask_jwt_extended import JWTManager, create_access_token, create_refresh_token, get_jwt_identity
+import flask_jwt_extended.view_decorators as vd
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from app.jwtctx import jwt_required, current_claims
+
+
+@pytest.fixture
+def app(monkeypatch):
+    """Minimal-App ohne Mongo: globaler Hook + geschützte Routen."""
+    app = Flask(__name__)
+    app.config["JWT_SECRET_KEY"] = "test-secret"
+    JWTManager(app)
+
+    calls = {"decode": 0}
+    orig = vd.decode_token
+
+    def _counting_decode(*a, **kw):
+        calls["decode"] += 1
+        return orig(*a, **kw)
+
+    monkeypatch.setattr(vd, "decode_token", _counting_decode)
+    app.decode_calls = calls
+
+    @app.before_request
+    def _hook():
+        current_claims()
+
+    @app.get("/me")
+    @jwt_required()
+    def me():
+        return jsonify(user=get_jwt_identity())
+
+    @app.post("/refresh")
+    @jwt_required(refresh=True)
+    def refresh():
+        return jsonify(user=get_jwt_identity())
+
+    @app.get("/maybe")
+    @jwt_required(optional=True)
+    def maybe():
+        return jsonify(user=get_jwt_identity())
+
+    @app.get("/health")
+    def health():
+        return jsonify(ok=True)
+
+    return app
+
+
+def _bearer(tok):
+    return {"Authorization": f"Bearer {tok}"}
+
+
+def test_token_is_decoded_once_per_request(app):
+    with app.app_context():
+        tok = create_access_token(identity="max")
+    r = app.test_client().get("/me", headers=_bearer(tok))
+    assert r.status_code == 200 and r.get_json() == {"user": "max"}
+    assert app.decode_calls["decode"] == 1
+
+
+def test_token_type_is_still_enforced(app):
+    with app.app_context():
+        access = create_access_token(identity="max")
+        refresh = create_refresh_token(identity="max")
+    c = app.test_client()
+    assert c.get("/me", headers=_bearer(refresh)).status_code == 422
+    assert c.post("/refresh", headers=_bearer(access)).status_code == 422
+    assert c.post("/refresh", headers=_bearer(refresh)).status_code == 200
+
+
+def test_missing_and_optional_token(app):
+    c = app.test_client()
+    assert c.get("/me").status_code == 401
+    r = c.get("/maybe")
+    assert r.status_code == 200 and r.get_json() == {"user": None}
+
+
+def test_skip_paths_do_no_jwt_work(app):
+    r = app.test_client().get("/health", headers=_bearer("garbage"))
+    assert r.status_code == 200
+    assert app.decode_calls["decode"] == 0
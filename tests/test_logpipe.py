@@ -0,0 +1,47 @@
+import json
+import logging
+import os
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from app.logpipe import AsyncLogHandler, JsonFormatter, parse_sample_rates
+
+
+class ListSink(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.lines = []
+
+    def emit(self, record):
+        self.lines.append(self.format(record))
+
+
+def test_parse_sample_rates():
+    rates = parse_sample_rates("default=0.5, /health=0, /games/<gid>=2")
+    assert rates == {"default": 0.5, "/health": 0.0, "/games/<gid>": 1.0}
+
+
+def test_records_are_written_as_json_lines():
+    sink = ListSink()
+    sink.setFormatter(JsonFormatter())
+    h = AsyncLogHandler([sink], maxsize=10)
+    lg = logging.getLogger("test_logpipe.json")
+    lg.addHandler(h)
+    lg.propagate = False
+    lg.warning("hallo %s", "welt", extra={"route": "/games/<gid>", "latency_ms": 1.5})
+    h.close()
+
+    rec = json.loads(sink.lines[0])
+    assert rec["msg"] == "hallo welt"
+    assert rec["route"] == "/games/<gid>" and rec["latency_ms"] == 1.5
+
+
+def test_low_priority_records_are_dropped_under_pressure():
+    h = AsyncLogHandler([], maxsize=10, high_water=0.0)
+    h.emit(logging.LogRecord("x", logging.INFO, __file__, 0, "info", None, None))
+    h.emit(logging.LogRecord("x", logging.ERROR, __file__, 0, "error", None, None))
+    assert h.dropped == 1
+    h.close()
@@ -0,0 +1,42 @@
+import os
+import sys
+
+from flask import Flask
+from pymongo.read_preferences import ReadPreference
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from app.extensions import available_compressors, init_db
+
+
+def test_compressors_filtered_by_installed_modules(monkeypatch):
+    import importlib.util
+    real = importlib.util.find_spec
+    monkeypatch.setattr(importlib.util, "find_spec", lambda name: None if name == "zstandard" else real(name))
+    assert available_compressors("zstd, zlib, bogus") == ["zlib"]
+
+
+def test_clients_per_workload_without_connection(monkeypatch):
+    monkeypatch.setenv("MONGO_MAX_POOL_SIZE", "40")
+    monkeypatch.setenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "250")
+    monkeypatch.setenv("MONGO_COMPRESSORS", "zlib")
+    monkeypatch.delenv("MONGO_ANALYTICS_READ_PREFERENCE", raising=False)
+    app = Flask(__name__)
+    app.config["MONGO_URI"] = "mongodb://127.0.0.1:1/NoDb"
+
+    init_db(app)   # connect=False → kein Netzwerk
+
+    default = app.config["MONGO_CLIENTS"]["default"]
+    analytics = app.config["MONGO_CLIENTS"]["analytics"]
+    assert app.config["MONGO_CLIENT"] is default
+    assert default.options.pool_options.max_pool_size == 40
+    assert default.options.pool_options.wait_queue_timeout == 0.25
+    assert default.read_preference == ReadPreference.PRIMARY
+    # eigener, kleinerer Pool; Timeouts geerbt
+    assert analytics.options.pool_options.max_pool_size == 20
+    assert analytics.options.pool_options.wait_queue_timeout == 0.25
+    assert analytics.read_preference == ReadPreference.SECONDARY_PREFERRED
+    assert analytics.get_default_database().name == "NoDb"
+    assert "zlib" in default.options.pool_options._compression_settings.compressors
@@ -0,0 +1,65 @@
+import os
+import sys
+from types import SimpleNamespace
+
+from flask import Flask, g
+from prometheus_client import REGISTRY
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from app.metrics import route_template
+from app.mongo_monitor import CommandMetricsListener, command_collection
+
+
+def _value(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def _event(name, command=None, request_id=1, **extra):
+    return SimpleNamespace(command_name=name, command=command or {}, connection_id=("db", 27017),
+                           request_id=request_id, duration_micros=2500, **extra)
+
+
+def _app():
+    app = Flask(__name__)
+    app.get("/games/<gid>")(lambda gid: "")
+    return app
+
+
+def test_command_collection():
+    assert command_collection("find", {"find": "games", "filter": {}}) == "games"
+    assert command_collection("getMore", {"getMore": 123, "collection": "chat"}) == "chat"
+    assert command_collection("ping", {"ping": 1}) == "-"
+
+
+def test_listener_labels_by_collection_and_route():
+    labels = {"command": "find", "collection": "games", "route": "/games/<gid>"}
+    count0 = _value("mongo_command_duration_seconds_count", **labels)
+    docs0 = _value("mongo_docs_returned_total", **labels)
+    errors0 = _value("mongo_command_errors_total", **labels)
+
+    listener = CommandMetricsListener()
+    with _app().test_request_context("/games/abc"):
+        listener.started(_event("find", {"find": "games"}, request_id=1))
+        listener.started(_event("find", {"find": "games"}, request_id=2))
+    # succeeded/failed kommen ggf. außerhalb des Requests – Labels stammen vom Start
+    listener.succeeded(_event("find", request_id=1, reply={"cursor": {"firstBatch": [{}, {}, {}]}}))
+    listener.failed(_event("find", request_id=2, failure="boom"))
+
+    assert _value("mongo_command_duration_seconds_count", **labels) == count0 + 2
+    assert _value("mongo_docs_returned_total", **labels) == docs0 + 3
+    assert _value("mongo_command_errors_total", **labels) == errors0 + 1
+    assert listener._pending == {}
+
+
+def test_route_template_fallbacks():
+    assert route_template() == "<background>"
+    app = _app()
+    with app.test_request_context("/games/abc"):
+        assert route_template() == "/games/<gid>"
+        g.metrics_route = "socket:chat_send"
+        assert route_template() == "socket:chat_send"
+    with app.test_request_context("/gibt-es-nicht"):
+        assert route_template() == "<unmatched>"
@@ -0,0 +1,51 @@
+import os
+import sys
+from collections import Counter
+
+from flask import Flask
+from flask_jwt_extended import JWTManager, create_access_token
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from app import profiler
+from app.blueprints.admin import admin_bp
+
+
+def _view():
+    return _inner()
+
+
+def _inner():
+    return sys._getframe()
+
+
+def test_collapse_orders_route_who_and_frames():
+    frame = _view()
+    line = profiler.collapse(frame, {_view.__code__: "/games/<gid>"}, "hub")
+    parts = line.split(";")
+    assert parts[:2] == ["/games/<gid>", "hub"]
+    assert parts[-2].startswith("_view (tests/test_profiler.py:")
+    assert parts[-1].startswith("_inner (tests/test_profiler.py:")
+    assert profiler.collapse(frame, {}, "thread:x").startswith("<no-route>;thread:x;")
+
+
+def test_format_collapsed_most_common_first():
+    out = profiler.format_collapsed(Counter({"a;b": 2, "a;c": 5}))
+    assert out == "a;c 5\na;b 2\n"
+
+
+def test_profile_endpoint_is_admin_only(monkeypatch):
+    def _must_not_run(*args, **kwargs):
+        raise AssertionError("Profiler darf für Nicht-Admins nicht starten")
+
+    monkeypatch.setattr(profiler, "profile", _must_not_run)
+    app = Flask(__name__)
+    app.config.update(JWT_SECRET_KEY="test-secret", FEEDBACK_ADMINS="boss")
+    JWTManager(app)
+    app.register_blueprint(admin_bp)
+    with app.app_context():
+        token = create_access_token(identity="max")
+    r = app.test_client().get("/admin/profile?seconds=1", headers={"Authorization": f"Bearer {token}"})
+    assert r.status_code == 403
@@ -0,0 +1,94 @@
+import os
+import sys
+
+from flask import Flask, jsonify
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from app.ratelimit import TokenBucketLimiter, charge, client_ip, init_proxy_fix, parse_rate, throttle
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_parse_rate():
+    assert parse_rate("10/60") == (10 / 60, 10.0)
+
+
+def test_bucket_refills_over_time():
+    clock = FakeClock()
+    lim = TokenBucketLimiter(rate=1.0, burst=2, clock=clock)
+    assert lim.take("a") == 0.0
+    assert lim.take("a") == 0.0
+    assert lim.take("a") == 1.0      # leer → 1 s warten
+    clock.now = 1.0
+    assert lim.take("a") == 0.0
+    assert lim.take("b") == 0.0      # eigener Bucket pro Key
+
+
+def test_lru_eviction_bounds_size():
+    lim = TokenBucketLimiter(rate=1.0, burst=1, max_keys=3, clock=FakeClock())
+    for k in "abcd":
+        lim.take(k)
+    assert len(lim) == 3
+    assert lim.take("a") == 0.0      # a wurde verdrängt → frischer Bucket
+    assert lim.take("d") > 0
+
+
+def test_throttle_returns_429_before_view_runs():
+    app = Flask(__name__)
+    calls = []
+    lim = TokenBucketLimiter(rate=0.5, burst=1, clock=FakeClock())
+
+    @app.post("/login")
+    @throttle("login", [("ip", lim, lambda: "1.2.3.4")])
+    def login():
+        calls.append(1)
+        return jsonify(ok=True)
+
+    c = app.test_client()
+    assert c.post("/login").status_code == 200
+    r = c.post("/login")
+    assert r.status_code == 429
+    assert r.headers["Retry-After"] == "2"
+    assert calls == [1]
+
+
+def test_charge_uses_cost_and_skips_missing_keys():
+    app = Flask(__name__)
+    lim = TokenBucketLimiter(rate=1.0, burst=10, clock=FakeClock())
+    limits = [("user", lim, lambda: None), ("ip", lim, lambda: "1.2.3.4")]
+    with app.test_request_context():
+        assert charge("batch", limits, cost=8) is None
+        resp = charge("batch", limits, cost=5)
+        assert resp.status_code == 429
+        assert resp.headers["Retry-After"] == "3"
+
+
+def _ip_app():
+    app = Flask(__name__)
+    app.get("/ip")(lambda: jsonify(ip=client_ip()))
+    return app
+
+
+def test_client_ip_behind_proxy(monkeypatch):
+    headers = {"X-Forwarded-For": "203.0.113.9, 198.51.100.7"}
+    env = {"REMOTE_ADDR": "10.0.0.2"}
+
+    monkeypatch.delenv("PROXY_FIX_X_FOR", raising=False)
+    app = _ip_app()
+    assert init_proxy_fix(app) == 0
+    assert app.test_client().get("/ip", headers=headers, environ_base=env).get_json()["ip"] == "10.0.0.2"
+
+    monkeypatch.setenv("PROXY_FIX_X_FOR", "1")
+    app = _ip_app()
+    assert init_proxy_fix(app) == 1
+    # nur der vom (einen) Proxy angehängte Eintrag zählt, nicht der vom Client gesetzte
+    assert app.test_client().get("/ip", headers=headers, environ_base=env).get_json()["ip"] == "198.51.100.7"
@@ -0,0 +1,52 @@
+import os
+import sys
+from types import SimpleNamespace
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from app import readiness
+from app.mongo_monitor import PoolListener
+
+
+def _checks(**over):
+    checks = {
+        "mongo": {"ok": True, "latency_ms": 1.0},
+        "pool": {"checkedOut": 1, "waiting": 0, "maxPoolSize": 10, "saturation": 0.1},
+        "hub": {"lag_ms": 2.0},
+        "queues": {"pw_hash": 0, "log": {"depth": 0, "fill": 0.0, "dropped": 0}, "slow_query": 0},
+    }
+    checks.update(over)
+    return checks
+
+
+def test_evaluate_reports_each_degraded_dependency():
+    assert readiness.evaluate(_checks()) == []
+    reasons = readiness.evaluate(_checks(
+        mongo={"ok": False, "error": "timeout"},
+        hub={"lag_ms": 900.0},
+    ))
+    assert reasons == ["mongo unreachable", "hub lag 900 ms"]
+
+
+def test_pool_listener_tracks_saturation():
+    pool = PoolListener()
+    addr = ("db", 27017)
+    pool.pool_created(SimpleNamespace(address=addr, options={"maxPoolSize": 4}))
+    ev = SimpleNamespace(address=addr)
+    for _ in range(3):
+        pool.connection_check_out_started(ev)
+        pool.connection_checked_out(ev)
+    pool.connection_check_out_started(ev)   # wartet noch
+    pool.connection_checked_in(ev)
+
+    snap = pool.snapshot()
+    assert snap["checkedOut"] == 2 and snap["waiting"] == 1
+    assert snap["saturation"] == 0.5
+
+
+def test_snapshot_is_503_until_first_check(monkeypatch):
+    monkeypatch.setattr(readiness, "_snapshot", {})
+    body, status = readiness.snapshot()
+    assert status == 503 and body["reasons"] == ["starting"]
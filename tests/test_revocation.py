@@ -0,0 +1,109 @@
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+from flask import Flask
+from flask_jwt_extended import JWTManager, create_access_token, create_refresh_token, decode_token
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from app import revocation
+from app.blueprints.auth import auth_bp
+
+
+class _Blocklist:
+    """token_blocklist im Speicher (Upsert per jti, find mit type/createdAt)."""
+
+    def __init__(self):
+        self.docs = {}
+
+    def update_one(self, flt, upd, upsert=False):
+        if flt["jti"] in self.docs:
+            return SimpleNamespace(upserted_id=None)
+        self.docs[flt["jti"]] = dict(upd["$setOnInsert"])
+        return SimpleNamespace(upserted_id=flt["jti"])
+
+    def find_one(self, flt, projection=None):
+        return self.docs.get(flt["jti"])
+
+    def find(self, q, projection=None):
+        since = q.get("createdAt", {}).get("$gt")
+        return [d for d in self.docs.values()
+                if d["type"] != q["type"]["$ne"] and (since is None or d["createdAt"] > since)]
+
+
+@pytest.fixture
+def db(monkeypatch):
+    monkeypatch.setattr(revocation, "_revoked", {})
+    monkeypatch.setattr(revocation, "_last_sync", None)
+    col = _Blocklist()
+    return {revocation.COLLECTION: col}
+
+
+@pytest.fixture
+def client(db):
+    app = Flask(__name__)
+    app.config.update(JWT_SECRET_KEY="test-secret",
+                      MONGO_CLIENT=SimpleNamespace(get_default_database=lambda: db))
+    jwt = JWTManager(app)
+    jwt.token_in_blocklist_loader(lambda header, payload: revocation.in_blocklist(db, payload))
+    app.register_blueprint(auth_bp)
+    with app.app_context():
+        app.tokens = (create_access_token(identity="max"), create_refresh_token(identity="max"))
+    c = app.test_client()
+    c.application = app
+    return c
+
+
+def _bearer(tok):
+    return {"Authorization": f"Bearer {tok}"}
+
+
+def test_refresh_rotation_is_single_use(client, db):
+    _, refresh = client.application.tokens
+    first = client.post("/auth/refresh", headers=_bearer(refresh))
+    assert first.status_code == 200 and first.get_json()["refresh"] != refresh
+    assert client.post("/auth/refresh", headers=_bearer(refresh)).status_code == 401
+    # Refresh-jtis bleiben aus dem Speicher draußen
+    assert revocation._revoked == {}
+
+
+def test_revoke_reports_whether_it_inserted(client, db):
+    with client.application.app_context():
+        claims = decode_token(client.application.tokens[1])
+    assert revocation.revoke(db, claims) is True
+    assert revocation.revoke(db, claims) is False    # z.B. paralleler Refresh: verliert
+
+
+def test_logout_revokes_access_and_refresh(client, db):
+    access, refresh = client.application.tokens
+    r = client.post("/auth/logout", headers=_bearer(access), json={"refresh": refresh})
+    assert r.status_code == 200
+    with client.application.app_context():
+        jti = decode_token(access)["jti"]
+    assert revocation.is_revoked(jti)
+    assert client.post("/auth/refresh", headers=_bearer(refresh)).status_code == 401
+
+
+def test_sync_mirrors_access_tokens_and_prunes_expired(db):
+    now = datetime.now(timezone.utc)
+    col = db[revocation.COLLECTION]
+    col.docs = {
+        "live": {"jti": "live", "type": "access", "createdAt": now, "expiresAt": now + timedelta(minutes=5)},
+        "gone": {"jti": "gone", "type": "access", "createdAt": now, "expiresAt": now - timedelta(seconds=1)},
+        "refr": {"jti": "refr", "type": "refresh", "createdAt": now, "expiresAt": now + timedelta(days=30)},
+    }
+    revocation.sync(db)
+    assert set(revocation._revoked) == {"live"}
+    assert revocation.is_revoked("live") and not revocation.is_revoked("refr")
+
+    revocation._revoked["live"] = time.time() - 1      # inzwischen abgelaufen …
+    del col.docs["live"]                               # … und vom TTL-Index entfernt
+    assert not revocation.is_revoked("live")
+    revocation.sync(db)
+    assert "live" not in revocation._revoked
@@ -0,0 +1,58 @@
+import os
+import sys
+from types import SimpleNamespace
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from app import slowlog
+
+
+def _events(name, command, micros, rid=1):
+    start = SimpleNamespace(command_name=name, command=command, connection_id=("h", 1), request_id=rid)
+    done = SimpleNamespace(command_name=name, connection_id=("h", 1), request_id=rid,
+                           duration_micros=micros, database_name="Test")
+    return start, done
+
+
+def test_shape_masks_values_but_keeps_or_branches():
+    a = {"find": "games", "filter": {"finished": {"$ne": True}, "$or": [{"hostName": "max"}, {"friendName": "max"}]},
+         "sort": {"createdAt": 1}}
+    b = {"find": "games", "filter": {"finished": {"$ne": True}, "$or": [{"hostName": "eva"}, {"friendName": "eva"}]},
+         "sort": {"createdAt": 1}}
+    shape = slowlog.query_shape("find", a)
+    assert shape["filter"] == {"finished": {"$ne": "?"}, "$or": [{"hostName": "?"}, {"friendName": "?"}]}
+    assert slowlog.shape_key(shape) == slowlog.shape_key(slowlog.query_shape("find", b))
+
+
+def test_only_slow_commands_are_queued_and_own_collection_ignored():
+    rec = slowlog.SlowQueryRecorder(threshold_ms=50)
+    for rid, (name, cmd, micros) in enumerate([
+        ("find", {"find": "games", "filter": {"x": 1}}, 10_000),           # schnell
+        ("find", {"find": "games", "filter": {"x": 1}}, 80_000),           # langsam
+        ("insert", {"insert": "games", "documents": []}, 90_000),          # nicht explainbar
+        ("aggregate", {"aggregate": "slow_queries", "pipeline": []}, 90_000),  # eigene Collection
+    ]):
+        start, done = _events(name, cmd, micros, rid)
+        rec.started(start)
+        rec.succeeded(done)
+
+    assert rec.queue.qsize() == 1
+    item, command = rec.queue.get_nowait()
+    assert item["collection"] == "games" and item["durationMs"] == 80.0
+    assert item["route"] == "<background>"
+    assert command == {"find": "games", "filter": {"x": 1}}
+    assert not rec._pending
+
+
+def test_summarize_explain_flags_collscan():
+    explain = {
+        "queryPlanner": {"winningPlan": {"stage": "SORT", "inputStage": {"stage": "COLLSCAN"}}},
+        "executionStats": {"nReturned": 3, "totalKeysExamined": 0, "totalDocsExamined": 5000,
+                           "executionTimeMillis": 42},
+    }
+    s = slowlog.summarize_explain(explain)
+    assert s["plan"] == "SORT>COLLSCAN"
+    assert s["collscan"] is True
+    assert s["docsExamined"] == 5000
@@ -0,0 +1,102 @@
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+from flask import Flask, g
+from flask_jwt_extended import JWTManager, create_access_token, create_refresh_token, decode_token
+from prometheus_client import REGISTRY
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from app import revocation, sockets
+from app.sockets import authenticate
+
+
+def _app():
+    app = Flask(__name__)
+    app.config.update(JWT_SECRET_KEY="test-secret",
+                      JWT_TOKEN_LOCATION=["headers", "query_string"], JWT_QUERY_STRING_NAME="access")
+    JWTManager(app)
+    return app
+
+
+def test_socket_auth_sources_and_rejections():
+    app = _app()
+    with app.app_context():
+        access = create_access_token(identity="Max")
+        refresh = create_refresh_token(identity="Max")
+
+    with app.test_request_context("/socket.io/"):
+        assert authenticate({"token": access}) == "max"
+        assert authenticate({"token": f"Bearer {access}"}) == "max"
+        assert authenticate({"token": refresh}) is None
+        assert authenticate({"token": "kaputt"}) is None
+        assert authenticate(None) is None
+    with app.test_request_context(f"/socket.io/?access={access}"):
+        assert authenticate() == "max"
+    with app.test_request_context("/socket.io/", headers={"Authorization": f"Bearer {access}"}):
+        assert authenticate() == "max"
+
+    with app.app_context():
+        jti = decode_token(access)["jti"]
+    revocation._revoked[jti] = 4_000_000_000
+    try:
+        with app.test_request_context("/socket.io/"):
+            assert authenticate({"token": access}) is None
+    finally:
+        revocation._revoked.pop(jti, None)
+
+
+def _value(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+class _FakeSocketIO:
+    """Room-Manager mit festen Rooms; emit zeichnet nur auf."""
+
+    def __init__(self, rooms):
+        self.server = SimpleNamespace(manager=SimpleNamespace(rooms=rooms))
+        self.sent = []
+
+    def emit(self, event, data, room=None, **kwargs):
+        self.sent.append((event, room, kwargs))
+
+
+def test_emit_counts_event_and_fanout(monkeypatch):
+    fake = _FakeSocketIO({"/": {"max": {"sid1": True, "sid2": True}}, "/admin": {"max": {"sid3": True}}})
+    monkeypatch.setattr(sockets, "_socketio", fake)
+    emits0 = _value("socketio_emits_total", event="test_fanout")
+    sum0 = _value("socketio_emit_fanout_sum", event="test_fanout")
+
+    sockets.emit("test_fanout", {"x": 1}, room="max")             # zwei Geräte
+    sockets.emit("test_fanout", {"x": 2}, room="niemand")         # offline → 0
+    sockets.emit("test_fanout", {"x": 3}, room="max", namespace="/admin")
+
+    assert _value("socketio_emits_total", event="test_fanout") == emits0 + 3
+    assert _value("socketio_emit_fanout_sum", event="test_fanout") == sum0 + 2 + 0 + 1
+    assert [room for _, room, _ in fake.sent] == ["max", "niemand", "max"]
+
+    monkeypatch.setattr(sockets, "_socketio", SimpleNamespace(server=None))
+    assert sockets._fanout("max") == 0                             # vor init_app
+
+
+def test_instrumented_counts_times_and_labels_route():
+    events0 = _value("socketio_events_received_total", event="test_event")
+    timed0 = _value("socketio_handler_duration_seconds_count", event="test_event")
+
+    @sockets._instrumented("test_event")
+    def handler(data):
+        if data == "boom":
+            raise RuntimeError(data)
+        return g.metrics_route
+
+    with Flask(__name__).test_request_context("/socket.io/"):
+        assert handler("ok") == "socket:test_event"
+        with pytest.raises(RuntimeError):
+            handler("boom")                                        # auch Fehler werden gemessen
+
+    assert _value("socketio_events_received_total", event="test_event") == events0 + 2
+    assert _value("socketio_handler_duration_seconds_count", event="test_event") == timed0 + 2
@@ -0,0 +1,50 @@
+import os
+import subprocess
+import sys
+from types import SimpleNamespace
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from config import Config
+from app import create_app, indexes
+
+
+def test_create_app_without_database(monkeypatch):
+    """Kein mongod erreichbar: create_app darf trotzdem nicht blockieren oder scheitern."""
+    monkeypatch.setattr(Config, "MONGO_URI", "mongodb://127.0.0.1:1/NoDb?serverSelectionTimeoutMS=100")
+    monkeypatch.setenv("STARTUP_INDEXES", "off")
+    monkeypatch.setenv("ARGON2_TIME_COST", "1")
+    monkeypatch.setenv("ARGON2_MEMORY_KIB", str(19 * 1024))
+    secret_file = os.path.join(ROOT_DIR, ".jwt_secret")
+    existed = os.path.exists(secret_file)
+
+    app = create_app()
+
+    assert "MONGO_CLIENT" in app.config
+    assert "ensure-indexes" in app.cli.commands
+    assert app.test_client().get("/health").status_code == 200
+    assert os.path.exists(secret_file) == existed
+
+
+def test_import_is_cheap():
+    """`import app` lädt weder Blueprints, Socket-Handler, Hintergrund-Module noch eventlet."""
+    heavy = ("app.blueprints", "app.sockets", "app.credentials", "app.pwpool", "app.columnar",
+             "app.duels", "app.indexes", "app.readiness", "app.revocation", "app.slowlog", "eventlet")
+    code = f"import sys, app; print(sorted(m for m in sys.modules if m.startswith({heavy!r})))"
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT_DIR, capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == "[]"
+
+
+def test_background_indexes_do_not_touch_mongo_at_start(monkeypatch):
+    """STARTUP_INDEXES=background: auch die Feedback-Migration läuft erst im Hintergrund-Task."""
+    class _NoMongo:
+        def get_default_database(self):
+            raise AssertionError("Mongo-Zugriff beim Start")
+
+    tasks = []
+    monkeypatch.setenv("STARTUP_INDEXES", "background")
+    app = SimpleNamespace(config={"MONGO_CLIENT": _NoMongo()})
+    indexes.start(app, SimpleNamespace(start_background_task=tasks.append))
+    assert len(tasks) == 1